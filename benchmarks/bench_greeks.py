@@ -0,0 +1,47 @@
+"""Benchmark: fused all_greeks vs. the five individual Greek functions.
+
+Run from the repo root:
+    python benchmarks/bench_greeks.py
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quant import greeks  # noqa: E402
+
+ARGS = (100.0, 105.0, 0.75, 0.03, 0.25)
+N = 20000
+
+
+def separate():
+    return (greeks.delta(*ARGS), greeks.gamma(*ARGS), greeks.vega(*ARGS),
+            greeks.theta(*ARGS), greeks.rho(*ARGS))
+
+
+def fused():
+    return greeks.all_greeks(*ARGS)
+
+
+def per_call_us(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+if __name__ == "__main__":
+    sep = per_call_us(separate, N)
+    fus = per_call_us(fused, N)
+    print(f"per request, separate calls: {sep:8.2f} us")
+    print(f"per request, all_greeks:     {fus:8.2f} us  ({sep / fus:.1f}x faster)")
+
+    chain = 5000
+    rng = np.random.default_rng(0)
+    K = rng.uniform(50, 150, chain)
+    loop = min(timeit.repeat(lambda: [greeks.all_greeks(100.0, k, 0.75, 0.03, 0.25) for k in K],
+                             number=1, repeat=3))
+    vec = min(timeit.repeat(lambda: greeks.all_greeks(100.0, K, 0.75, 0.03, 0.25),
+                            number=10, repeat=3)) / 10
+    print(f"{chain}-option chain, scalar loop: {loop * 1e3:8.2f} ms")
+    print(f"{chain}-option chain, vectorized:  {vec * 1e3:8.2f} ms  ({loop / vec:.0f}x faster)")
@@ -0,0 +1,81 @@
+"""Load test for login under a burst of concurrent bcrypt checks.
+
+Runs against a throwaway SQLite database and reports how many logins
+succeeded, were shed with 503 by the hashing executor, timed out with 504
+or failed otherwise, with latency percentiles over all requests and over
+successes only. The executor keeps the service's default in-flight limit
+unless --max-inflight is given:
+    python benchmarks/bench_login.py --logins 200 --concurrency 200 --rounds 12
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--max-inflight", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ["ATHENAA_BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["ATHENAA_BCRYPT_THREADS"] = str(args.threads)
+    if args.max_inflight:
+        os.environ["ATHENAA_BCRYPT_MAX_INFLIGHT"] = str(args.max_inflight)
+    os.environ.setdefault("ATHENAA_TICK_ARCHIVE", "0")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from server.main import app
+    from server.models import database
+    from server.routers import auth
+    from server.services import passwords
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_login.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    database.Base.metadata.create_all(bind=engine)
+    auth.SessionLocal = sessionmaker(bind=engine)
+
+    client = TestClient(app)
+    credentials = {"username": "bench", "password": "correct horse battery staple"}
+    client.post("/auth/register", json={**credentials, "email": "bench@example.com"}).raise_for_status()
+
+    def login(_):
+        start = time.perf_counter()
+        response = client.post("/auth/login", json=credentials)
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(login, range(args.logins)))
+    elapsed = time.perf_counter() - start
+
+    codes = np.array([code for _, code in results])
+    latencies = np.array([t for t, _ in results])
+    ok, shed, timed_out = (codes == 200).sum(), (codes == 503).sum(), (codes == 504).sum()
+    print(f"{args.logins} logins, concurrency {args.concurrency}, bcrypt cost {args.rounds}, "
+          f"{args.threads} hashing threads, max in flight {passwords.hashing_executor.max_inflight}")
+    print(f"throughput: {ok / elapsed:8.1f} successful logins/s")
+    print(f"responses:  {ok} ok, {shed} shed (503), {timed_out} timed out (504), "
+          f"{len(codes) - ok - shed - timed_out} other failures")
+    for label, sample in (("all", latencies), ("ok only", latencies[codes == 200])):
+        if sample.size:
+            cells = "  ".join(f"p{q} {np.percentile(sample, q) * 1e3:8.2f} ms" for q in (50, 90, 99))
+            print(f"latency ({label}): {cells}")
+    print(f"executor:   {passwords.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Load test for the market quote path using the offline LocalProvider.
+
+Measures server throughput and latency without touching the network:
+    python benchmarks/bench_market.py --requests 2000 --concurrency 50 --latency-ms 20
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from server.main import app  # noqa: E402
+from server.services import providers  # noqa: E402
+
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "META", "TSLA", "JPM"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--path", default="/market/price/{symbol}")
+    args = parser.parse_args()
+
+    providers.set_provider(providers.LocalProvider(latency_ms=args.latency_ms))
+    client = TestClient(app)
+
+    def hit(i):
+        start = time.perf_counter()
+        response = client.get(args.path.format(symbol=SYMBOLS[i % len(SYMBOLS)]))
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    hit(0)  # warm provider frames
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        latencies = np.array(list(pool.map(hit, range(args.requests))))
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"provider latency {args.latency_ms} ms")
+    print(f"throughput: {args.requests / elapsed:8.1f} req/s")
+    for q in (50, 90, 99):
+        print(f"p{q}:        {np.percentile(latencies, q) * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
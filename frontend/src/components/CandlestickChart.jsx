@@ -1,7 +1,6 @@
 import React, {useEffect, useRef, useState} from 'react'
 import Plotly from 'plotly.js-basic-dist'
 import axios from 'axios'
-import { sma, ema, rsi, macd } from '../utils/indicators'
 
 const PERIOD_MAP = {
   '1m': '1mo',
@@ -69,7 +68,17 @@ export default function CandlestickChart({symbol='AAPL', timeframe='1D', indicat
     setLoading(true)
     try{
       const period = PERIOD_MAP[timeframe] || '1y'
-      const resp = await axios.get(`/market/history/${symbol}?period=${period}`)
+      // indicators are computed (and cached) server-side over the same history
+      const params = {period}
+      if(indicators.sma) params.sma = indicators.sma
+      if(indicators.ema) params.ema = indicators.ema
+      if(indicators.rsi) params.rsi = indicators.rsi || 14
+      if(indicators.macd) params.macd = [indicators.macd.fast || 12, indicators.macd.slow || 26, indicators.macd.signal || 9].join(',')
+      const wantsIndicators = Object.keys(params).length > 1
+      const [resp, ind] = await Promise.all([
+        axios.get(`/market/history/${symbol}?period=${period}`),
+        wantsIndicators ? axios.get(`/market/indicators/${symbol}`, {params}).then(r=>r.data) : Promise.resolve({}),
+      ])
       const data = resp.data && resp.data.data ? resp.data.data : resp.data
       // handle both lowercase and capitalized keys
       const dates = data.map(d=>d.Date || d.date)
@@ -103,10 +112,10 @@ export default function CandlestickChart({symbol='AAPL', timeframe='1D', indicat
 
       // overlays
       if(indicators.sma){
-        traces.push({x:dates, y: sma(close, indicators.sma), mode:'lines', name:`SMA(${indicators.sma})`, line:{color:'#8892A6', width:1}})
+        traces.push({x:dates, y: ind.sma, mode:'lines', name:`SMA(${indicators.sma})`, line:{color:'#8892A6', width:1}})
       }
       if(indicators.ema){
-        traces.push({x:dates, y: ema(close, indicators.ema), mode:'lines', name:`EMA(${indicators.ema})`, line:{color:'#00B4D8', width:1}})
+        traces.push({x:dates, y: ind.ema, mode:'lines', name:`EMA(${indicators.ema})`, line:{color:'#00B4D8', width:1}})
       }
 
       // volume as separate bar trace on secondary y-axis
@@ -127,17 +136,15 @@ export default function CandlestickChart({symbol='AAPL', timeframe='1D', indicat
 
       // add RSI if requested
       if(indicators.rsi){
-        const rsiVals = rsi(close, indicators.rsi || 14)
-        traces.push({x:dates, y:rsiVals, mode:'lines', name:`RSI(${indicators.rsi || 14})`, yaxis:'y3', line:{color: '#F59E0B', width:2}})
+        traces.push({x:dates, y:ind.rsi, mode:'lines', name:`RSI(${indicators.rsi || 14})`, yaxis:'y3', line:{color: '#F59E0B', width:2}})
         layout.yaxis3 = {title:'RSI', domain:[0, 0.15], anchor:'x'}
       }
 
       // add MACD if requested
       if(indicators.macd){
-        const m = macd(close, indicators.macd.fast || 12, indicators.macd.slow || 26, indicators.macd.signal || 9)
-        traces.push({x:dates, y:m.macd, mode:'lines', name:'MACD', yaxis:indicators.rsi?'y4':'y3', line:{color:'#60A5FA', width:2}})
-        traces.push({x:dates, y:m.signal, mode:'lines', name:'Signal', yaxis:indicators.rsi?'y4':'y3', line:{color:'#F59E0B', width:2}})
-        traces.push({x:dates, y:m.hist, type:'bar', name:'MACD Hist', yaxis:indicators.rsi?'y4':'y3', marker:{color:'rgba(255,255,255,0.08)'}})
+        traces.push({x:dates, y:ind.macd, mode:'lines', name:'MACD', yaxis:indicators.rsi?'y4':'y3', line:{color:'#60A5FA', width:2}})
+        traces.push({x:dates, y:ind.macd_signal, mode:'lines', name:'Signal', yaxis:indicators.rsi?'y4':'y3', line:{color:'#F59E0B', width:2}})
+        traces.push({x:dates, y:ind.macd_hist, type:'bar', name:'MACD Hist', yaxis:indicators.rsi?'y4':'y3', marker:{color:'rgba(255,255,255,0.08)'}})
         const yaxisLabel = indicators.rsi ? 'y4' : 'y3'
         layout[`yaxis${indicators.rsi?'4':'3'}`] = {title:'MACD', domain:[0, 0.15], anchor:'x'}
       }
@@ -1,5 +1,6 @@
 import math
-from scipy.stats import norm
+import numpy as np
+from quant import normal
 
 
 def call_price(S, K, T, r, sigma):
@@ -26,4 +27,34 @@ def call_price(S, K, T, r, sigma):
 
     d1 = (math.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * math.sqrt(T))
     d2 = d1 - sigma * math.sqrt(T)
-    return S * norm.cdf(d1) - K * math.exp(-r * T) * norm.cdf(d2)
+    return S * normal.cdf(d1) - K * math.exp(-r * T) * normal.cdf(d2)
+
+
+def call_price_batch(S, K, T, r, sigma):
+    """Vectorized Black-Scholes call prices over NumPy arrays.
+
+    Inputs may be arrays or scalars and are broadcast against each other.
+    The `T == 0` and `sigma == 0` cases are resolved with masks so a whole
+    option chain is priced in a single pass. Returns a float64 array.
+    """
+    S, K, T, r, sigma = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (S, K, T, r, sigma))
+    )
+    if np.any(T < 0) or np.any(np.isnan(T)):
+        raise ValueError("T (time to expiry) must be >= 0")
+    if np.any(sigma < 0) or np.any(np.isnan(sigma)):
+        raise ValueError("sigma (volatility) must be >= 0")
+
+    discount = np.exp(-r * T)
+    # T == 0 -> intrinsic, sigma == 0 -> discounted intrinsic (same formula when T == 0)
+    # np.array: all-scalar inputs give a 0-d result that must still be assignable
+    prices = np.array(np.maximum(S - K * discount, 0.0))
+
+    live = (T > 0) & (sigma > 0)
+    if np.any(live):
+        s, k, t, v, df = S[live], K[live], T[live], sigma[live], discount[live]
+        vol_sqrt_t = v * np.sqrt(t)
+        d1 = (np.log(s / k) + (r[live] + 0.5 * v**2) * t) / vol_sqrt_t
+        d2 = d1 - vol_sqrt_t
+        prices[live] = s * normal.cdf_array(d1) - k * df * normal.cdf_array(d2)
+    return prices
@@ -1,5 +1,6 @@
 import math
-from scipy.stats import norm
+import numpy as np
+from quant import normal
 
 
 def d1_d2(S, K, T, r, sigma):
@@ -18,7 +19,7 @@ def delta(S, K, T, r, sigma):
     if sigma == 0:
         return 1.0 if S > K * math.exp(-r * T) else 0.0
     d1, _ = d1_d2(S, K, T, r, sigma)
-    return norm.cdf(d1)
+    return normal.cdf(d1)
 
 
 def gamma(S, K, T, r, sigma):
@@ -26,7 +27,7 @@ def gamma(S, K, T, r, sigma):
     if T == 0 or sigma == 0:
         return 0.0
     d1, _ = d1_d2(S, K, T, r, sigma)
-    return norm.pdf(d1) / (S * sigma * math.sqrt(T))
+    return normal.pdf(d1) / (S * sigma * math.sqrt(T))
 
 
 def vega(S, K, T, r, sigma):
@@ -34,7 +35,7 @@ def vega(S, K, T, r, sigma):
     if T == 0 or sigma == 0:
         return 0.0
     d1, _ = d1_d2(S, K, T, r, sigma)
-    return S * norm.pdf(d1) * math.sqrt(T) / 100.0
+    return S * normal.pdf(d1) * math.sqrt(T) / 100.0
 
 
 def theta(S, K, T, r, sigma):
@@ -42,8 +43,8 @@ def theta(S, K, T, r, sigma):
     if T == 0 or sigma == 0:
         return 0.0
     d1, d2 = d1_d2(S, K, T, r, sigma)
-    term1 = -S * norm.pdf(d1) * sigma / (2 * math.sqrt(T))
-    term2 = -r * K * math.exp(-r * T) * norm.cdf(d2)
+    term1 = -S * normal.pdf(d1) * sigma / (2 * math.sqrt(T))
+    term2 = -r * K * math.exp(-r * T) * normal.cdf(d2)
     return (term1 + term2) / 365.0
 
 
@@ -52,4 +53,68 @@ def rho(S, K, T, r, sigma):
     if T == 0 or sigma == 0:
         return 0.0
     _, d2 = d1_d2(S, K, T, r, sigma)
-    return K * T * math.exp(-r * T) * norm.cdf(d2) / 100.0
+    return K * T * math.exp(-r * T) * normal.cdf(d2) / 100.0
+
+
+def all_greeks(S, K, T, r, sigma):
+    """All Greeks in one pass: d1/d2, pdf and cdf are computed once per option.
+
+    Python/NumPy float inputs return a dict of floats; array (or
+    broadcastable) inputs return a dict of NumPy arrays. Units match the individual functions
+    (vega and rho per 1%, theta per day).
+    """
+    if all(isinstance(x, (int, float)) for x in (S, K, T, r, sigma)):
+        return _all_greeks_scalar(S, K, T, r, sigma)
+    return _all_greeks_array(S, K, T, r, sigma)
+
+
+def _all_greeks_scalar(S, K, T, r, sigma):
+    if T == 0 or sigma == 0:
+        threshold = K if T == 0 else K * math.exp(-r * T)
+        return {"delta": 1.0 if S > threshold else 0.0,
+                "gamma": 0.0, "vega": 0.0, "theta": 0.0, "rho": 0.0}
+    sqrt_t = math.sqrt(T)
+    vol_sqrt_t = sigma * sqrt_t
+    d1 = (math.log(S / K) + (r + 0.5 * sigma**2) * T) / vol_sqrt_t
+    d2 = d1 - vol_sqrt_t
+    pdf_d1 = normal.pdf(d1)
+    cdf_d1 = normal.cdf(d1)
+    cdf_d2 = normal.cdf(d2)
+    k_disc = K * math.exp(-r * T)
+    return {
+        "delta": cdf_d1,
+        "gamma": pdf_d1 / (S * vol_sqrt_t),
+        "vega": S * pdf_d1 * sqrt_t / 100.0,
+        "theta": (-S * pdf_d1 * sigma / (2 * sqrt_t) - r * k_disc * cdf_d2) / 365.0,
+        "rho": T * k_disc * cdf_d2 / 100.0,
+    }
+
+
+def _all_greeks_array(S, K, T, r, sigma):
+    S, K, T, r, sigma = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (S, K, T, r, sigma))
+    )
+    k_disc = K * np.exp(-r * T)
+    # degenerate options: delta is a step on the (discounted) strike, the rest are zero
+    out = {
+        "delta": np.where(S > np.where(T == 0, K, k_disc), 1.0, 0.0),
+        "gamma": np.zeros(S.shape),
+        "vega": np.zeros(S.shape),
+        "theta": np.zeros(S.shape),
+        "rho": np.zeros(S.shape),
+    }
+    live = (T != 0) & (sigma != 0)
+    if np.any(live):
+        s, t, v, kd = S[live], T[live], sigma[live], k_disc[live]
+        sqrt_t = np.sqrt(t)
+        vol_sqrt_t = v * sqrt_t
+        d1 = (np.log(s / K[live]) + (r[live] + 0.5 * v**2) * t) / vol_sqrt_t
+        d2 = d1 - vol_sqrt_t
+        pdf_d1 = normal.pdf_array(d1)
+        cdf_d2 = normal.cdf_array(d2)
+        out["delta"][live] = normal.cdf_array(d1)
+        out["gamma"][live] = pdf_d1 / (s * vol_sqrt_t)
+        out["vega"][live] = s * pdf_d1 * sqrt_t / 100.0
+        out["theta"][live] = (-s * pdf_d1 * v / (2 * sqrt_t) - r[live] * kd * cdf_d2) / 365.0
+        out["rho"][live] = t * kd * cdf_d2 / 100.0
+    return out
@@ -0,0 +1,102 @@
+import math
+import numpy as np
+from quant import normal
+
+# Volatility search interval for the bracketed fallback
+SIGMA_LOW = 1e-6
+SIGMA_HIGH = 10.0
+
+
+def implied_vol(price, S, K, T, r, tol=1e-10, max_iter=100):
+    """Implied volatility of a single European call.
+
+    Returns NaN when the price is outside the no-arbitrage bounds.
+    """
+    return float(implied_vol_batch(price, S, K, T, r, tol=tol, max_iter=max_iter))
+
+
+def implied_vol_batch(price, S, K, T, r, tol=1e-10, max_iter=100):
+    """Vectorized implied volatility for European calls.
+
+    Starts from the Corrado-Miller rational approximation, then takes
+    Newton steps on vega. Each element keeps a [low, high] bracket that
+    tightens every iteration; whenever a Newton step would leave it (or
+    vega is too small to trust) the element falls back to bisection.
+    An element has converged once the repricing error is within `tol` of
+    its time value, or its bracket has shrunk to `tol` of sigma.
+    Converged elements are masked out so later iterations only touch
+    the options still being solved.
+
+    Inputs are broadcast against each other. Prices outside
+    (max(S - K*exp(-rT), 0), S) or with `T <= 0` give NaN.
+    """
+    price, S, K, T, r = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (price, S, K, T, r))
+    )
+    disc_k = K * np.exp(-r * T)
+    out = np.full(price.shape, np.nan)
+
+    valid = (T > 0) & (price > np.maximum(S - disc_k, 0.0)) & (price < S)
+    idx = np.flatnonzero(valid)
+    if idx.size == 0:
+        return out
+
+    c, s, k, t = (a.ravel()[idx] for a in (price, S, disc_k, T))
+    sqrt_t = np.sqrt(t)
+    # converge on the part of the price that depends on sigma; for deep
+    # in-the-money calls it is a tiny fraction of the price
+    time_value = c - np.maximum(s - k, 0.0)
+    lo = np.full(idx.size, SIGMA_LOW)
+    hi = np.full(idx.size, SIGMA_HIGH)
+    sigma = np.clip(_initial_guess(c, s, k, sqrt_t), SIGMA_LOW, SIGMA_HIGH)
+    solved = np.full(idx.size, np.nan)
+
+    active = np.arange(idx.size)
+    for _ in range(max_iter):
+        a_s, a_k, a_t, a_sqrt_t = s[active], k[active], t[active], sqrt_t[active]
+        a_sigma = sigma[active]
+        model, vega = _price_and_vega(a_s, a_k, a_t, a_sigma, a_sqrt_t)
+        diff = model - c[active]
+
+        done = np.abs(diff) <= tol * time_value[active]
+        solved[active[done]] = a_sigma[done]
+
+        # price is increasing in sigma, so the sign of diff tightens the bracket
+        a_lo = np.where(diff < 0, a_sigma, lo[active])
+        a_hi = np.where(diff > 0, a_sigma, hi[active])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = a_sigma - diff / vega
+        bisect = ~np.isfinite(step) | (step <= a_lo) | (step >= a_hi)
+        step = np.where(bisect, 0.5 * (a_lo + a_hi), step)
+        converged_width = (a_hi - a_lo) <= tol * a_sigma
+        solved[active[converged_width & ~done]] = step[converged_width & ~done]
+
+        keep = ~(done | converged_width)
+        active = active[keep]
+        if active.size == 0:
+            break
+        lo[active], hi[active], sigma[active] = a_lo[keep], a_hi[keep], step[keep]
+
+    out.ravel()[idx] = solved
+    return out
+
+
+def _initial_guess(c, s, k, sqrt_t):
+    """Corrado-Miller approximation, with Brenner-Subrahmanyam as backup."""
+    half_moneyness = 0.5 * (s - k)
+    a = c - half_moneyness
+    disc = np.maximum(a * a - (s - k) ** 2 / math.pi, 0.0)
+    guess = math.sqrt(2.0 * math.pi) / (s + k) * (a + np.sqrt(disc)) / sqrt_t
+    fallback = math.sqrt(2.0 * math.pi) * c / s / sqrt_t
+    return np.where(np.isfinite(guess) & (guess > 0), guess, fallback)
+
+
+def _price_and_vega(S, disc_k, T, sigma, sqrt_t):
+    """Call price and raw vega (per unit sigma) from shared d1/d2."""
+    vol_sqrt_t = sigma * sqrt_t
+    d1 = (np.log(S / disc_k) + 0.5 * sigma * sigma * T) / vol_sqrt_t
+    d2 = d1 - vol_sqrt_t
+    price = S * normal.cdf_array(d1) - disc_k * normal.cdf_array(d2)
+    # same as greeks.vega without the per-1% scaling
+    vega = S * normal.pdf_array(d1) * sqrt_t
+    return price, vega
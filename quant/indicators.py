@@ -0,0 +1,114 @@
+"""Technical indicators over NumPy price arrays, all O(n).
+
+Moving sums come from one cumulative sum and exponential smoothing runs
+as a first-order IIR filter (`scipy.signal.lfilter`), so no indicator
+loops over the window in Python. Outputs have the input's length; the
+warm-up bars before an indicator is defined are NaN. Exponential averages
+(EMA, Wilder's RSI and ATR) are seeded with the simple average of their
+first window, as most charting packages do.
+"""
+import numpy as np
+from scipy.signal import lfilter
+
+
+def _check_period(period):
+    if period < 1:
+        raise ValueError("period must be >= 1")
+
+
+def sma(values, period):
+    """Simple moving average."""
+    _check_period(period)
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if values.size < period:
+        return out
+    csum = np.cumsum(np.r_[0.0, values])
+    out[period - 1:] = (csum[period:] - csum[:-period]) / period
+    return out
+
+
+def _smooth(values, alpha, period):
+    """Exponential smoothing seeded with the mean of the first `period` values."""
+    out = np.full(values.shape, np.nan)
+    if values.size < period:
+        return out
+    seed = values[:period].mean()
+    out[period - 1] = seed
+    if values.size > period:
+        # y[t] = alpha * x[t] + (1 - alpha) * y[t-1], starting from y[period-1] = seed
+        out[period:], _ = lfilter([alpha], [1.0, alpha - 1.0], values[period:], zi=[(1.0 - alpha) * seed])
+    return out
+
+
+def ema(values, period):
+    """Exponential moving average with smoothing 2 / (period + 1)."""
+    _check_period(period)
+    return _smooth(np.asarray(values, dtype=np.float64), 2.0 / (period + 1), period)
+
+
+def rsi(values, period=14):
+    """Wilder's relative strength index (0-100)."""
+    _check_period(period)
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if values.size <= period:
+        return out
+    change = np.diff(values)
+    gains = _smooth(np.maximum(change, 0.0), 1.0 / period, period)
+    losses = _smooth(np.maximum(-change, 0.0), 1.0 / period, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = 100.0 - 100.0 / (1.0 + gains / losses)
+    # a flat window has no losses: 100 if it rose, 50 if it did not move at all
+    value = np.where(losses == 0, np.where(gains == 0, 50.0, 100.0), value)
+    out[1:] = np.where(np.isnan(gains), np.nan, value)
+    return out
+
+
+def macd(values, fast=12, slow=26, signal=9):
+    """MACD line (fast EMA - slow EMA), its signal EMA and the histogram."""
+    if fast >= slow:
+        raise ValueError("fast period must be shorter than slow period")
+    line = ema(values, fast) - ema(values, slow)
+    signal_line = np.full(line.shape, np.nan)
+    start = slow - 1
+    if line.size > start:
+        signal_line[start:] = ema(line[start:], signal)
+    return {"macd": line, "signal": signal_line, "hist": line - signal_line}
+
+
+def bollinger(values, period=20, width=2.0):
+    """Bollinger bands: SMA +/- `width` population standard deviations."""
+    _check_period(period)
+    values = np.asarray(values, dtype=np.float64)
+    middle = sma(values, period)
+    upper = np.full(values.shape, np.nan)
+    lower = np.full(values.shape, np.nan)
+    if values.size >= period:
+        # shift by the first value so the running sum of squares does not lose precision
+        shifted = values - values[0]
+        csum = np.cumsum(np.r_[0.0, shifted])
+        csq = np.cumsum(np.r_[0.0, shifted * shifted])
+        mean = (csum[period:] - csum[:-period]) / period
+        var = (csq[period:] - csq[:-period]) / period - mean * mean
+        std = np.sqrt(np.maximum(var, 0.0))
+        upper[period - 1:] = middle[period - 1:] + width * std
+        lower[period - 1:] = middle[period - 1:] - width * std
+    return {"middle": middle, "upper": upper, "lower": lower}
+
+
+def true_range(high, low, close):
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    prev_close = np.r_[close[:1], close[:-1]]
+    tr = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+    if tr.size:
+        tr[0] = high[0] - low[0]
+    return tr
+
+
+def atr(high, low, close, period=14):
+    """Wilder's average true range."""
+    _check_period(period)
+    return _smooth(true_range(high, low, close), 1.0 / period, period)
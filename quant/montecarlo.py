@@ -1,5 +1,107 @@
+import math
 import numpy as np
+from quant.blackscholes import call_price
 
-def simulate_price(S, T, r, sigma, n=10000):
-    Z = np.random.normal(0, 1, n)
+
+def standard_normals(n, seed=None, antithetic=False, moment_matching=False):
+    """Draw `n` standard normals from a `numpy.random.Generator`.
+
+    `seed` may be an int, a `SeedSequence` or an existing `Generator`.
+    With `antithetic`, draws come in adjacent mirrored pairs
+    (z0, -z0, z1, -z1, ...); for odd `n` the last draw is unpaired. With
+    `moment_matching`, the draws are shifted and scaled to have exactly
+    zero mean and unit standard deviation.
+    """
+    rng = np.random.default_rng(seed)
+    if antithetic:
+        half = rng.standard_normal((n + 1) // 2)
+        Z = np.column_stack([half, -half]).ravel()[:n]
+    else:
+        Z = rng.standard_normal(n)
+    if moment_matching and n > 1:
+        Z = (Z - Z.mean()) / Z.std()
+    return Z
+
+
+def terminal_prices(S, T, r, sigma, Z):
+    """Risk-neutral GBM terminal prices for a vector of standard normals."""
     return S * np.exp((r - 0.5 * sigma**2) * T + sigma * np.sqrt(T) * Z)
+
+
+def simulate_price(S, T, r, sigma, n=10000, seed=None, antithetic=False, moment_matching=False):
+    Z = standard_normals(n, seed, antithetic, moment_matching)
+    return terminal_prices(S, T, r, sigma, Z)
+
+
+def price_option(payoff, S, T, r, sigma, n=10000, seed=None, antithetic=False,
+                 moment_matching=False, control_strike=None):
+    """Monte Carlo price of a European payoff with optional variance reduction.
+
+    `payoff` maps an array of terminal prices to an array of payoffs.
+    If `control_strike` is given, the discounted call payoff at that
+    strike is used as a control variate, with its exact mean taken from
+    `quant.blackscholes.call_price`.
+
+    Returns a dict with the discounted `price`, its `std_error` and the
+    number of paths `n`.
+    """
+    if antithetic:
+        n += n % 2
+    Z = standard_normals(n, seed, antithetic, moment_matching)
+    ST = terminal_prices(S, T, r, sigma, Z)
+    discount = math.exp(-r * T)
+    Y = _independent(discount * np.asarray(payoff(ST), dtype=np.float64), antithetic)
+
+    if control_strike is not None:
+        C = _independent(discount * np.maximum(ST - control_strike, 0.0), antithetic)
+        c_var = C.var()
+        if c_var > 0:
+            beta = np.cov(Y, C, bias=True)[0, 1] / c_var
+            Y = Y - beta * (C - call_price(S, control_strike, T, r, sigma))
+
+    return {"price": float(Y.mean()), "std_error": _std_error(Y), "n": n}
+
+
+def standard_error(values, antithetic=False):
+    """Standard error of the mean of simulated values.
+
+    Set `antithetic` when `values` came from antithetic draws so the
+    adjacent (z, -z) pairs are treated as single independent samples; an
+    unpaired last value is left out.
+    """
+    return _std_error(_independent(np.asarray(values, dtype=np.float64), antithetic))
+
+
+def _std_error(samples):
+    m = len(samples)
+    return float(samples.std(ddof=1) / math.sqrt(m)) if m > 1 else 0.0
+
+
+def _independent(values, antithetic):
+    """Collapse adjacent antithetic pairs, which are the independent samples, into their means."""
+    if not antithetic:
+        return values
+    paired = len(values) - len(values) % 2
+    return 0.5 * (values[0:paired:2] + values[1:paired:2])
+
+
+def moments(values):
+    """(count, mean, sum of squared deviations) of an array, for merge_moments."""
+    n = len(values)
+    if n == 0:
+        return 0, 0.0, 0.0
+    mean = float(values.mean())
+    dev = values - mean
+    return n, mean, float(np.dot(dev, dev))
+
+
+def merge_moments(a, b):
+    """Combine two (count, mean, M2) triples (Chan et al. parallel update)."""
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    if n == 0:
+        return 0, 0.0, 0.0
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / n
+    return n, mean, m2_a + m2_b + delta * delta * n_a * n_b / n
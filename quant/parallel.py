@@ -0,0 +1,105 @@
+"""Parallel Monte Carlo over independent `SeedSequence` streams.
+
+The path count is split into one shard per worker, and each shard draws
+from its own child of `SeedSequence(seed)`. Shards are always merged in
+shard order, so results are bit-identical for a given seed and worker
+count no matter which worker finishes first or whether threads or
+processes are used. NumPy's generators and ufuncs release the GIL, so
+threads scale for this workload without the cost of pickling the samples
+back from child processes.
+"""
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from quant.montecarlo import simulate_price, moments, merge_moments
+from quant.sketch import TDigest
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def shard_sizes(n, workers):
+    """Split `n` paths into `workers` shards whose sizes differ by at most one."""
+    base, extra = divmod(n, workers)
+    return [base + (1 if i < extra else 0) for i in range(workers)]
+
+
+def parallel_simulate(S, T, r, sigma, n=10000, seed=None, workers=None, executor="thread",
+                      antithetic=False, moment_matching=False, keep_samples=True, compression=500):
+    """Terminal GBM prices simulated across `workers` independent streams.
+
+    Returns a dict with the merged `mean`, `std` (population) and
+    `std_error`, plus either the concatenated `samples` (shard order) or,
+    with `keep_samples=False`, a merged `digest` (`quant.sketch.TDigest`)
+    of the prices so quantiles/ES need no O(n) array in the parent.
+    `moment_matching` is applied per shard. With `antithetic`, shards get
+    whole (z, -z) pairs (only the last may hold an extra unpaired draw),
+    so the concatenated samples keep the serial pair layout that
+    `quant.montecarlo.standard_error` expects.
+    """
+    workers = workers or os.cpu_count() or 1
+    children = np.random.SeedSequence(seed).spawn(workers)
+    if antithetic:
+        sizes = [2 * pairs for pairs in shard_sizes(n // 2, workers)]
+        sizes[-1] += n % 2
+    else:
+        sizes = shard_sizes(n, workers)
+    jobs = [(S, T, r, sigma, size, child, antithetic, moment_matching,
+             None if keep_samples else compression)
+            for size, child in zip(sizes, children) if size > 0]
+    shards = list(_get_pool(executor, workers).map(_simulate_shard, jobs))
+
+    stats = (0, 0.0, 0.0)
+    for _, shard_stats in shards:
+        stats = merge_moments(stats, shard_stats)
+    count, mean, m2 = stats
+    result = {
+        "mean": mean,
+        "std": math.sqrt(m2 / count) if count else 0.0,
+        "std_error": math.sqrt(m2 / (count - 1) / count) if count > 1 else 0.0,
+    }
+    if keep_samples:
+        result["samples"] = np.concatenate([shard for shard, _ in shards]) if shards else np.empty(0)
+    else:
+        digest = TDigest(compression)
+        for shard_digest, _ in shards:
+            digest.merge(shard_digest)
+        result["digest"] = digest
+    return result
+
+
+def _simulate_shard(job):
+    S, T, r, sigma, size, seed_seq, antithetic, moment_matching, compression = job
+    samples = simulate_price(S, T, r, sigma, size, seed=seed_seq, antithetic=antithetic,
+                             moment_matching=moment_matching)
+    stats = moments(samples)
+    if compression is not None:
+        return TDigest(compression).update(samples), stats
+    return samples, stats
+
+
+def _get_pool(kind, workers):
+    if kind not in ("thread", "process"):
+        raise ValueError("executor must be 'thread' or 'process'")
+    with _pools_lock:
+        pool = _pools.get((kind, workers))
+        if pool is None:
+            if kind == "process":
+                pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                pool = ThreadPoolExecutor(workers, thread_name_prefix="athenaa-mc")
+            _pools[(kind, workers)] = pool
+        return pool
+
+
+def shutdown():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,75 @@
+"""Multi-step GBM path simulation, generated in bounded-memory chunks.
+
+`generate_paths` yields (chunk, n_steps) blocks so 1M paths x 252 steps is
+never held at once; consumers reduce each block (payoffs, drawdowns,
+terminal prices) before the next one is drawn. Paths exclude the spot at
+t=0; column j is the price after step j + 1.
+"""
+import math
+import numpy as np
+from quant.montecarlo import moments, merge_moments
+
+DEFAULT_CHUNK_SIZE = 16384
+
+
+def generate_paths(S, T, r, sigma, n_paths, n_steps, chunk_size=DEFAULT_CHUNK_SIZE,
+                   seed=None, dtype=np.float64):
+    """Yield risk-neutral GBM paths in blocks of at most `chunk_size` rows.
+
+    `dtype` may be float32 to halve memory and bandwidth; the normals are
+    then drawn in float32 directly. Peak memory is one block of
+    `chunk_size * n_steps` values.
+    """
+    if n_steps < 1:
+        raise ValueError("n_steps must be >= 1")
+    dtype = np.dtype(dtype)
+    rng = np.random.default_rng(seed)
+    dt = T / n_steps
+    drift = dtype.type((r - 0.5 * sigma**2) * dt)
+    vol = dtype.type(sigma * math.sqrt(dt))
+    log_s = dtype.type(math.log(S))
+
+    remaining = n_paths
+    while remaining > 0:
+        m = min(chunk_size, remaining)
+        block = rng.standard_normal((m, n_steps), dtype=dtype)
+        # everything below runs in place on the one block
+        block *= vol
+        block += drift
+        np.cumsum(block, axis=1, out=block)
+        block += log_s
+        np.exp(block, out=block)
+        yield block
+        remaining -= m
+
+
+def price_path_payoff(payoff, S, T, r, sigma, n_paths, n_steps, chunk_size=DEFAULT_CHUNK_SIZE,
+                      seed=None, dtype=np.float64):
+    """Monte Carlo price of a path-dependent payoff, reduced chunk by chunk.
+
+    `payoff` maps a (chunk, n_steps) block to one payoff per row. Only the
+    running count, mean and M2 are kept between chunks.
+    """
+    stats = (0, 0.0, 0.0)
+    for block in generate_paths(S, T, r, sigma, n_paths, n_steps, chunk_size, seed, dtype):
+        stats = merge_moments(stats, moments(np.asarray(payoff(block), dtype=np.float64)))
+    n, mean, m2 = stats
+    discount = math.exp(-r * T)
+    std_error = math.sqrt(m2 / (n - 1) / n) if n > 1 else 0.0
+    return {"price": discount * mean, "std_error": discount * std_error, "n": n}
+
+
+def asian_call(paths, K):
+    """Arithmetic-average-price call."""
+    return np.maximum(paths.mean(axis=1) - K, 0.0)
+
+
+def up_and_out_call(paths, K, barrier):
+    """Call that is knocked out if the price ever reaches `barrier` (discretely monitored)."""
+    alive = paths.max(axis=1) < barrier
+    return np.where(alive, np.maximum(paths[:, -1] - K, 0.0), 0.0)
+
+
+def lookback_call(paths, S):
+    """Floating-strike lookback call: terminal price minus the path minimum (including spot)."""
+    return paths[:, -1] - np.minimum(paths.min(axis=1), S)
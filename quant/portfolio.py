@@ -0,0 +1,81 @@
+"""Portfolio valuation over columnar position arrays.
+
+A book is stored column-wise: the distinct symbols, and per lot an index
+into them, a qty and an avg_price (NaN when the cost basis is unknown).
+`encode` builds that layout once with a single `np.unique`. Valuation
+then joins the symbols against a price vector, and every total, P&L
+figure and weight comes from `np.bincount` and elementwise arithmetic,
+so there is no per-lot Python.
+"""
+import numpy as np
+
+
+def encode(symbols, qty, avg_price):
+    """Columnar book from parallel per-lot arrays: (names, index, qty, avg_price)."""
+    symbols = np.asarray(symbols, dtype=str)
+    qty = np.asarray(qty, dtype=np.float64)
+    avg_price = np.asarray(avg_price, dtype=np.float64)
+    if not (symbols.shape == qty.shape == avg_price.shape) or symbols.ndim != 1:
+        raise ValueError("symbols, qty and avg_price must be 1-D arrays of the same length")
+    names, index = np.unique(symbols, return_inverse=True)
+    return names, index, qty, avg_price
+
+
+def analytics(names, index, qty, avg_price, prices, sectors=None):
+    """Value an `encode`d book of lots against current prices.
+
+    `prices` maps symbol -> price (None when unavailable) and `sectors`
+    maps symbol -> sector. Lots of the same symbol are combined; their
+    avg_price becomes the qty-weighted average. Symbols without a price
+    are left out of every total, as they cannot be valued.
+
+    Returns per-symbol arrays ("symbol", "qty", "avg_price", "price",
+    "cost", "value", "gain_loss", "gain_loss_pct", "weight", weights in
+    percent of total value) plus "total_cost", "total_value" and
+    "sector_exposure" ({sector: percent of total value}).
+    """
+    groups = names.size
+    known = ~np.isnan(avg_price)
+    lots = np.bincount(index, minlength=groups)
+    group_qty = np.bincount(index, qty, minlength=groups)
+    group_cost = np.bincount(index, qty * np.where(known, avg_price, 0.0), minlength=groups)
+    has_cost = np.bincount(index, known, minlength=groups) > 0
+
+    # a single lot reports its own avg_price; merged lots the weighted average
+    first = np.empty(groups, dtype=np.int64)
+    first[index[::-1]] = np.arange(index.size)[::-1]
+    merged = np.divide(group_cost, group_qty, out=np.full(groups, np.nan), where=group_qty != 0)
+    group_avg = np.where(lots == 1, avg_price[first], merged)
+    group_avg[~has_cost] = np.nan
+
+    price = np.array(list(map(prices.get, names.tolist())), dtype=np.float64)
+    priced = ~np.isnan(price)
+    names, price = names[priced], price[priced]
+    group_qty, group_cost, group_avg = group_qty[priced], group_cost[priced], group_avg[priced]
+
+    value = price * group_qty
+    gain_loss = value - group_cost
+    gain_loss_pct = np.divide(gain_loss, group_cost, out=np.zeros_like(value), where=group_cost > 0) * 100
+    total_cost = float(group_cost.sum())
+    total_value = float(value.sum())
+    weight = value / total_value * 100 if total_value > 0 else np.zeros_like(value)
+
+    sectors = sectors or {}
+    labels = np.array([sector or "Unknown" for sector in map(sectors.get, names.tolist())], dtype=str)
+    sector_names, sector_index = np.unique(labels, return_inverse=True)
+    sector_weight = np.bincount(sector_index, weight, minlength=sector_names.size)
+
+    return {
+        "symbol": names,
+        "qty": group_qty,
+        "avg_price": group_avg,
+        "price": price,
+        "cost": group_cost,
+        "value": value,
+        "gain_loss": gain_loss,
+        "gain_loss_pct": gain_loss_pct,
+        "weight": weight,
+        "total_cost": total_cost,
+        "total_value": total_value,
+        "sector_exposure": dict(zip(sector_names.tolist(), sector_weight.tolist())),
+    }
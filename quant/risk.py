@@ -1,15 +1,55 @@
 import numpy as np
+from quant.sketch import TDigest
 
 
 def var_percentile(returns, confidence=0.95):
     """Value at Risk using percentile method."""
-    return np.percentile(returns, (1 - confidence) * 100)
+    return var_es(returns, [confidence])[confidence][0]
 
 
 def expected_shortfall(returns, confidence=0.95):
     """Expected Shortfall (CVaR): average of worst-case losses."""
-    var = var_percentile(returns, confidence)
-    return returns[returns <= var].mean()
+    return var_es(returns, [confidence])[confidence][1]
+
+
+def var_es(returns, confidences=(0.95, 0.99)):
+    """VaR and expected shortfall at several confidence levels from one partition.
+
+    Returns {confidence: (var, es)}. VaR matches `np.percentile` (linear
+    interpolation), but all order statistics come from a single
+    `np.partition` instead of a full sort per level, and ES is the mean
+    of the partitioned prefix, so no boolean-mask copy is made.
+    """
+    returns = np.asarray(returns, dtype=np.float64).ravel()
+    n = returns.size
+    if n == 0:
+        raise ValueError("returns must not be empty")
+    positions = {}
+    for c in confidences:
+        h = (n - 1) * (1 - c)
+        lo = int(np.floor(h))
+        positions[c] = (h, lo, min(lo + 1, n - 1))
+    kth = sorted({k for _, lo, hi in positions.values() for k in (lo, hi)})
+    part = np.partition(returns, kth)
+
+    out = {}
+    for c, (h, lo, hi) in positions.items():
+        var = part[lo] + (h - lo) * (part[hi] - part[lo])
+        # part[:lo + 1] holds the lo + 1 smallest returns, all <= var
+        tail_sum = part[:lo + 1].sum()
+        tail_n = lo + 1
+        if hi > lo and part[hi] <= var:
+            # ties at the VaR level also belong to the tail
+            ties = np.count_nonzero(part[hi:] == var)
+            tail_sum += ties * var
+            tail_n += ties
+        out[c] = (float(var), float(tail_sum / tail_n))
+    return out
+
+
+def var_es_sketch(digest, confidences=(0.95, 0.99)):
+    """VaR and expected shortfall read from a `quant.sketch.TDigest` of returns."""
+    return {c: (digest.quantile(1 - c), digest.tail_mean(1 - c)) for c in confidences}
 
 
 def correlation_matrix(price_arrays):
@@ -17,3 +57,39 @@ def correlation_matrix(price_arrays):
     stack = np.column_stack(price_arrays)
     returns = np.diff(stack, axis=0) / stack[:-1]
     return np.corrcoef(returns.T)
+
+
+def max_drawdown(paths, start=None):
+    """Maximum drawdown of each path (rows of a 2-D array), as a positive fraction.
+
+    `start` is the price before the first column, so a drop straight
+    from spot counts as a drawdown.
+    """
+    peaks = np.maximum.accumulate(paths, axis=-1)
+    if start is not None:
+        np.maximum(peaks, start, out=peaks)
+    return ((peaks - paths) / peaks).max(axis=-1)
+
+
+def path_risk(chunks, S, confidence=0.95, compression=500):
+    """VaR/ES of terminal returns and max-drawdown stats from a stream of path blocks.
+
+    Each block is folded into t-digests of terminal returns and per-path
+    drawdowns before the next one is drawn, so memory stays constant
+    regardless of n_paths and n_steps.
+    """
+    returns = TDigest(compression)
+    drawdowns = TDigest(compression)
+    dd_sum = 0.0
+    for block in chunks:
+        returns.update((block[:, -1].astype(np.float64) - S) / S)
+        dd = max_drawdown(block, start=S).astype(np.float64)
+        drawdowns.update(dd)
+        dd_sum += dd.sum()
+    var, es = var_es_sketch(returns, [confidence])[confidence]
+    return {
+        "var": var,
+        "expected_shortfall": es,
+        "mean_max_drawdown": dd_sum / drawdowns.count if drawdowns.count else 0.0,
+        "max_drawdown_quantile": drawdowns.quantile(confidence),
+    }
@@ -1,14 +1,34 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
+from server.models import database
 from server.routers import algorithms, portfolio, market, auth
+from server.services import compute, market_client, passwords, quote_hub, tick_archive
+from server.utils import cache
+from quant import parallel
 import os
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    database.migrate()
+    yield
+    await quote_hub.shutdown()
+    tick_archive.shutdown()
+    compute.shutdown()
+    passwords.shutdown()
+    market_client.shutdown()
+    parallel.shutdown()
+    cache.shutdown()
+
+
 app = FastAPI(
     title="Athenaa MiniBloomberg API",
     description="Stock trading algorithms, portfolio management, and market data",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS for frontend
@@ -25,6 +45,18 @@ app.include_router(algorithms.router, prefix="/algorithms", tags=["algorithms"])
 app.include_router(portfolio.router, prefix="/portfolio", tags=["portfolio"])
 app.include_router(market.router, prefix="/market", tags=["market"])
 
+@app.exception_handler(compute.ComputeBusy)
+async def compute_busy_handler(request: Request, exc: compute.ComputeBusy):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(compute.ComputeTimeout)
+async def compute_timeout_handler(request: Request, exc: compute.ComputeTimeout):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.exception_handler(market_client.MarketTimeout)
+async def market_timeout_handler(request: Request, exc: market_client.MarketTimeout):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
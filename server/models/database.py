@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, String, Float, DateTime, Integer, ForeignKey, Boolean
+from sqlalchemy import create_engine, Column, String, Float, DateTime, Integer, ForeignKey, Boolean, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -47,7 +47,7 @@ class Position(Base):
     __tablename__ = "positions"
     
     id = Column(Integer, primary_key=True)
-    portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"))
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), index=True)
     symbol = Column(String, index=True)
     qty = Column(Float)
     avg_price = Column(Float, nullable=True)
@@ -59,15 +59,36 @@ class Position(Base):
 
 class StockSnapshot(Base):
     __tablename__ = "stock_snapshots"
+    # Range reads filter on symbol and scan by time; retention jobs scan by time alone
+    __table_args__ = (Index("ix_stock_snapshots_symbol_timestamp", "symbol", "timestamp"),)
     
     id = Column(Integer, primary_key=True)
-    symbol = Column(String, index=True)
+    symbol = Column(String)
     price = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
 
 
 Base.metadata.create_all(bind=engine)
 
+# Indexes replaced by newer ones, dropped by `migrate`
+RETIRED_INDEXES = ("ix_stock_snapshots_symbol",)
+
+
+def migrate(bind=None):
+    """Bring the indexes of an existing database in line with the models.
+
+    `create_all` skips indexes on tables that already exist, so new ones
+    are created here and the ones they replace are dropped. Runs at server
+    startup, not on import, so tests never touch the repository database.
+    """
+    bind = bind or engine
+    with bind.begin() as conn:
+        for name in RETIRED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    for table in (Position.__table__, StockSnapshot.__table__):
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
 
 def get_db():
     db = SessionLocal()
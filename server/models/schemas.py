@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Literal, Optional, Union
 
 # Auth Schemas
 class UserRegister(BaseModel):
@@ -47,6 +47,28 @@ class OptionRequest(BaseModel):
 class OptionResponse(BaseModel):
     price: float
 
+class OptionBatchRequest(BaseModel):
+    # each field is a list (one entry per option) or a scalar broadcast to all
+    S: Union[float, List[float]]
+    K: Union[float, List[float]]
+    T: Union[float, List[float]]
+    r: Union[float, List[float]]
+    sigma: Union[float, List[float]]
+
+class OptionBatchResponse(BaseModel):
+    prices: List[float]
+
+class ImpliedVolBatchRequest(BaseModel):
+    price: Union[float, List[float]]
+    S: Union[float, List[float]]
+    K: Union[float, List[float]]
+    T: Union[float, List[float]]
+    r: Union[float, List[float]]
+
+class ImpliedVolBatchResponse(BaseModel):
+    # None where the price is outside the no-arbitrage bounds
+    implied_vols: List[Optional[float]]
+
 class GreeksRequest(BaseModel):
     S: float
     K: float
@@ -67,12 +89,51 @@ class MonteCarloRequest(BaseModel):
     r: float
     sigma: float
     n: int = 10000
+    seed: Optional[int] = None
+    antithetic: bool = False
+    moment_matching: bool = False
+    # shard count for parallel runs; fix it to reproduce seeded results across hosts
+    workers: Optional[int] = Field(None, ge=1, le=64)
 
 class MonteCarloResponse(BaseModel):
     mean: float
     std: float
+    std_error: float
     sample: List[float]
 
+class MonteCarloPriceRequest(MonteCarloRequest):
+    K: float
+    payoff: Literal["call", "put", "digital"] = "call"
+    control_variate: bool = True
+
+class MonteCarloPriceResponse(BaseModel):
+    price: float
+    std_error: float
+    n: int
+    bs_call_price: float
+
+# Paths are generated in chunks, but run time still grows with n_paths * n_steps
+MAX_PATHS = 1_000_000
+MAX_STEPS = 2520  # ten years of daily steps
+
+class PathRequest(BaseModel):
+    S: float
+    T: float
+    r: float
+    sigma: float
+    n_paths: int = Field(10000, gt=0, le=MAX_PATHS)
+    n_steps: int = Field(252, gt=0, le=MAX_STEPS)
+    seed: Optional[int] = None
+    float32: bool = False
+
+class PathPriceRequest(PathRequest):
+    K: float
+    payoff: Literal["asian", "up_and_out", "lookback"] = "asian"
+    barrier: Optional[float] = None
+
+class PathRiskRequest(PathRequest):
+    confidence: float = Field(0.95, gt=0, lt=1)
+
 class RiskRequest(BaseModel):
     returns: List[float]
     confidence: float = 0.95
@@ -86,6 +147,10 @@ class Position(BaseModel):
     qty: float
     avg_price: Optional[float] = None
 
+class PositionUpdate(BaseModel):
+    qty: float  # 0 removes the position
+    avg_price: Optional[float] = None
+
 class PortfolioCreateRequest(BaseModel):
     user_id: str
     positions: List[Position]
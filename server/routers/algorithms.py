@@ -1,12 +1,17 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
 from server.models.schemas import (
-    OptionRequest, OptionResponse, MonteCarloRequest, MonteCarloResponse,
+    OptionRequest, OptionResponse, OptionBatchRequest, OptionBatchResponse,
+    ImpliedVolBatchRequest, ImpliedVolBatchResponse,
+    MonteCarloRequest, MonteCarloResponse, MonteCarloPriceRequest, MonteCarloPriceResponse,
+    PathPriceRequest, PathRiskRequest,
     GreeksRequest, GreeksResponse, RiskRequest, RiskResponse, StockPriceRequest
 )
 from server.services import algorithms as algo_svc
-from server.utils.plotting import timeseries_plotly, distribution_histogram
-from quant import greeks, risk
-import numpy as np
+from server.services import compute
+from server.utils import responses
+from quant import greeks
+from quant.montecarlo import standard_error
 
 router = APIRouter()
 
@@ -15,46 +20,118 @@ async def black_scholes(req: OptionRequest):
     price = algo_svc.black_scholes_price(req.S, req.K, req.T, req.r, req.sigma)
     return OptionResponse(price=price)
 
+@router.post("/black_scholes/batch", response_model=OptionBatchResponse)
+async def black_scholes_batch(req: OptionBatchRequest):
+    try:
+        prices = await compute.run_numpy(algo_svc.black_scholes_batch,
+                                         req.S, req.K, req.T, req.r, req.sigma)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return OptionBatchResponse(prices=prices.tolist())
+
+@router.post("/implied_vol/batch", response_model=ImpliedVolBatchResponse)
+async def implied_vol_batch(req: ImpliedVolBatchRequest):
+    try:
+        vols = await compute.run_numpy(algo_svc.implied_vol, req.price, req.S, req.K, req.T, req.r)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ImpliedVolBatchResponse(implied_vols=vols)
+
 @router.post("/greeks", response_model=GreeksResponse)
 async def calculate_greeks(req: GreeksRequest):
-    delta = greeks.delta(req.S, req.K, req.T, req.r, req.sigma)
-    gamma = greeks.gamma(req.S, req.K, req.T, req.r, req.sigma)
-    vega = greeks.vega(req.S, req.K, req.T, req.r, req.sigma)
-    theta = greeks.theta(req.S, req.K, req.T, req.r, req.sigma)
-    rho = greeks.rho(req.S, req.K, req.T, req.r, req.sigma)
-    return GreeksResponse(delta=delta, gamma=gamma, vega=vega, theta=theta, rho=rho)
+    return GreeksResponse(**greeks.all_greeks(req.S, req.K, req.T, req.r, req.sigma))
+
+def _simulate(req: MonteCarloRequest):
+    return algo_svc.montecarlo_simulate(req.S, req.T, req.r, req.sigma, req.n, seed=req.seed,
+                                        antithetic=req.antithetic,
+                                        moment_matching=req.moment_matching,
+                                        workers=req.workers)
+
+def _summary(req: MonteCarloRequest):
+    samples = _simulate(req)
+    # return summary and a small sample
+    return MonteCarloResponse(mean=float(samples.mean()), std=float(samples.std()),
+                              std_error=standard_error(samples, req.antithetic),
+                              sample=samples[:min(20, len(samples))].tolist())
 
 @router.post("/monte_carlo/simulate", response_model=MonteCarloResponse)
 async def montecarlo(req: MonteCarloRequest):
-    samples = algo_svc.montecarlo_simulate(req.S, req.T, req.r, req.sigma, req.n)
-    # return summary and a small sample
-    return MonteCarloResponse(mean=float(samples.mean()), std=float(samples.std()), sample=samples[:min(20, len(samples))].tolist())
+    return await compute.run_numpy(_summary, req)
+
+@router.post("/monte_carlo/price", response_model=MonteCarloPriceResponse)
+async def montecarlo_price(req: MonteCarloPriceRequest):
+    result = await compute.run_numpy(
+        algo_svc.montecarlo_price,
+        req.payoff, req.S, req.K, req.T, req.r, req.sigma, req.n, seed=req.seed,
+        antithetic=req.antithetic, moment_matching=req.moment_matching,
+        control_variate=req.control_variate,
+    )
+    bs = algo_svc.black_scholes_price(req.S, req.K, req.T, req.r, req.sigma)
+    return MonteCarloPriceResponse(bs_call_price=bs, **result)
+
+def _chart(kind, req: MonteCarloRequest, output="records"):
+    return algo_svc.montecarlo_chart(kind, req.S, req.T, req.r, req.sigma, req.n, seed=req.seed,
+                                     antithetic=req.antithetic, moment_matching=req.moment_matching,
+                                     workers=req.workers, output=output)
+
+async def _chart_response(kind, req: MonteCarloRequest, request: Request, output=None):
+    """Chart in the negotiated format (`?format=` or Accept), compressed when accepted."""
+    output = responses.wants(request, output)
+    body = await compute.run_numpy(_chart, kind, req, output)
+    media_type = responses.ARROW_MEDIA_TYPE if output == "arrow" else "application/json"
+    return responses.encoded_response(request, body, media_type)
 
 @router.post("/monte_carlo/plot")
-async def montecarlo_plot(req: MonteCarloRequest):
-    samples = algo_svc.montecarlo_simulate(req.S, req.T, req.r, req.sigma, req.n)
-    fig = timeseries_plotly(samples)
-    return fig.to_dict()
+async def montecarlo_plot(req: MonteCarloRequest, request: Request,
+                          output: Optional[str] = Query(None, alias="format")):
+    """Simulated prices as a Plotly line chart, downsampled to at most 2,000 points.
+
+    `format=columns` (or `arrow`, also via Accept) returns only the x/y arrays.
+    """
+    return await _chart_response("timeseries", req, request, output)
 
 @router.post("/monte_carlo/var")
 async def monte_carlo_var(req: MonteCarloRequest):
-    samples = algo_svc.montecarlo_simulate(req.S, req.T, req.r, req.sigma, req.n)
-    returns = (samples - req.S) / req.S
-    var_95 = risk.var_percentile(returns, confidence=0.95)
-    var_99 = risk.var_percentile(returns, confidence=0.99)
-    es_95 = risk.expected_shortfall(returns, confidence=0.95)
-    es_99 = risk.expected_shortfall(returns, confidence=0.99)
-    return {
-        "var_95": float(var_95),
-        "var_99": float(var_99),
-        "expected_shortfall_95": float(es_95),
-        "expected_shortfall_99": float(es_99),
-        "mean_return": float(returns.mean()),
-        "std_return": float(returns.std())
-    }
+    samples = await compute.run_numpy(_simulate, req)
+    return await compute.run_numpy(algo_svc.montecarlo_var, samples, req.S)
+
+@router.post("/monte_carlo/paths/price")
+async def monte_carlo_path_price(req: PathPriceRequest):
+    """Asian, up-and-out barrier or lookback call priced over chunked GBM paths."""
+    try:
+        return await compute.run_numpy(
+            algo_svc.path_price, req.payoff, req.S, req.K, req.T, req.r, req.sigma,
+            req.n_paths, req.n_steps, barrier=req.barrier, seed=req.seed, float32=req.float32,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/monte_carlo/paths/risk")
+async def monte_carlo_path_risk(req: PathRiskRequest):
+    """Terminal VaR/ES and pathwise max drawdowns over chunked GBM paths."""
+    try:
+        return await compute.run_numpy(
+            algo_svc.path_risk, req.S, req.T, req.r, req.sigma, req.n_paths, req.n_steps,
+            confidence=req.confidence, seed=req.seed, float32=req.float32,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/monte_carlo/cache")
+async def monte_carlo_cache_stats():
+    """Hit/miss counters and memory use of the shared simulation cache."""
+    return algo_svc.simulation_cache.stats()
 
 @router.post("/monte_carlo/distribution")
-async def monte_carlo_distribution(req: MonteCarloRequest):
-    samples = algo_svc.montecarlo_simulate(req.S, req.T, req.r, req.sigma, req.n)
-    fig = distribution_histogram(samples)
-    return fig.to_dict()
+async def monte_carlo_distribution(req: MonteCarloRequest, request: Request,
+                                   output: Optional[str] = Query(None, alias="format")):
+    """Simulated price distribution as a Plotly bar chart of 50 server-side bins.
+
+    `format=columns` (or `arrow`, also via Accept) returns only the x/y/width arrays.
+    """
+    return await _chart_response("distribution", req, request, output)
+
+@router.get("/compute")
+async def compute_stats():
+    """In-flight, completed, rejected and timed-out counts for the compute executors."""
+    return compute.stats()
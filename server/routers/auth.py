@@ -1,21 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
 import jwt
-from passlib.context import CryptContext
 import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
 
 from server.models.database import SessionLocal, User
 from server.models.schemas import UserRegister, UserLogin, TokenResponse, UserResponse, UserUpdate
+from server.services import passwords
+from server.utils.cache import LRUCache
 
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "athenaa-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30 days
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Resolved callers are reused for this many seconds before the user row is re-read
+PRINCIPAL_TTL = float(os.getenv("ATHENAA_PRINCIPAL_TTL", 60))
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -26,12 +32,6 @@ def get_db():
     finally:
         db.close()
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -42,50 +42,123 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_user_from_token(token: str, db: Session) -> User:
-    """Helper function to extract user from token string"""
-    credentials_exception = HTTPException(
+class Principal(NamedTuple):
+    """The authenticated caller, as much as most routes need to know."""
+    id: int
+    username: str
+    is_active: bool
+
+
+# (user id or username, generation, jti) -> Principal
+principal_cache = LRUCache(4 * 1024 * 1024, ttl=PRINCIPAL_TTL)
+# identity -> (generation, forget_at), oldest first. Only invalidated users
+# have an entry, so no one else's cached principal is disturbed. Generations
+# come from one increasing counter and an entry is kept for PRINCIPAL_TTL,
+# by which time every principal cached under the old generation has expired.
+_generations = OrderedDict()
+_epoch = 0
+_generations_lock = threading.Lock()
+
+
+def _generation(identity):
+    with _generations_lock:
+        entry = _generations.get(identity)
+    return entry[0] if entry else 0
+
+
+def invalidate_user(user):
+    """Drop every cached principal for `user` (profile change, deactivation)."""
+    global _epoch
+    now = time.monotonic()
+    with _generations_lock:
+        while _generations and next(iter(_generations.values()))[1] <= now:
+            _generations.popitem(last=False)
+        _epoch += 1
+        for identity in (user.id, user.username):
+            _generations.pop(identity, None)
+            _generations[identity] = (_epoch, now + PRINCIPAL_TTL)
+
+
+def create_user_token(user) -> str:
+    """Access token whose signed claims carry the user id, active flag and a unique jti."""
+    return create_access_token(
+        data={"sub": user.username, "uid": user.id, "active": bool(user.is_active), "jti": uuid.uuid4().hex},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+
+def _decode_token(token: str) -> dict:
     if not token:
-        raise credentials_exception
-    
+        raise _credentials_exception()
     try:
         # Handle "Bearer {token}" format
         if token.startswith("Bearer "):
             token = token[7:]
-        
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except jwt.InvalidTokenError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+
+def get_principal(token: str, db: Session) -> Principal:
+    """Resolve the caller from a token, usually without touching the database.
+
+    Principals are cached per token (`jti`) for PRINCIPAL_TTL seconds and
+    dropped early by `invalidate_user`. Tokens issued before the `uid`
+    claim existed are resolved by username.
+    """
+    payload = _decode_token(token)
+    if payload.get("active") is False:
+        raise HTTPException(status_code=400, detail="User is not active")
+    uid = payload.get("uid")
+    identity = uid if uid is not None else payload["sub"]
+    key = (identity, _generation(identity), payload.get("jti") or token)
+    principal = principal_cache.get(key)
+    if principal is not None:
+        return principal
+
+    if uid is not None:
+        user = db.get(User, uid)
+    else:
+        user = db.query(User).filter(User.username == payload["sub"]).first()
+    if user is None or user.username != payload["sub"]:
+        raise _credentials_exception()
     if not user.is_active:
         raise HTTPException(status_code=400, detail="User is not active")
+    principal = Principal(user.id, user.username, user.is_active)
+    principal_cache.set(key, principal)
+    return principal
+
+
+def get_user_from_token(token: str, db: Session) -> Principal:
+    """Helper function to extract the caller from token string"""
+    return get_principal(token, db)
+
+
+def _load_user(principal: Principal, db: Session) -> User:
+    """The caller's full row, for routes that return or change the profile."""
+    user = db.get(User, principal.id)
+    if user is None:
+        raise _credentials_exception()
     return user
 
-def get_current_user(authorization: str = Header(None), db: Session = Depends(get_db)) -> User:
-    """Extract and verify JWT token from Authorization header, return current user (FastAPI dependency)"""
+def get_current_user(authorization: str = Header(None), db: Session = Depends(get_db)) -> Principal:
+    """Extract and verify JWT token from Authorization header, return current caller (FastAPI dependency)"""
     if not authorization:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_exception()
     return get_user_from_token(authorization, db)
 
-@router.post("/register", response_model=TokenResponse)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
-    """Register a new user"""
-    # Check if user exists
+def _check_available(db: Session, user_data: UserRegister):
     existing_user = db.query(User).filter(
         (User.username == user_data.username) | (User.email == user_data.email)
     ).first()
@@ -95,25 +168,52 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username or email already registered"
         )
-    
-    # Create new user
+    # Hand the pooled connection back while bcrypt runs
+    db.rollback()
+
+
+def _create_user(db: Session, user_data: UserRegister, password_hash: str) -> User:
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        password_hash=hash_password(user_data.password),
+        password_hash=password_hash,
         full_name=user_data.full_name
     )
-    
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    return new_user
+
+
+def _find_user(db: Session, username: str):
+    user = db.query(User).filter(User.username == username).first()
+    if user:
+        # Keep the loaded row but hand the pooled connection back while bcrypt runs
+        db.expunge(user)
+    db.rollback()
+    return user
+
+
+def _store_hash(db: Session, user_id: int, new_hash: str):
+    db.query(User).filter(User.id == user_id).update({"password_hash": new_hash})
+    db.commit()
+
+
+# register and login are async only so they can await the hashing executor;
+# their database work still runs on the threadpool, off the event loop.
+
+@router.post("/register", response_model=TokenResponse)
+async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+    """Register a new user"""
+    # Check if user exists
+    await run_in_threadpool(_check_available, db, user_data)
+    
+    # Create new user
+    password_hash = await passwords.hash_password_async(user_data.password)
+    new_user = await run_in_threadpool(_create_user, db, user_data, password_hash)
     
     # Create token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": new_user.username},
-        expires_delta=access_token_expires
-    )
+    access_token = create_user_token(new_user)
     
     return TokenResponse(
         access_token=access_token,
@@ -122,11 +222,14 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=TokenResponse)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     """Login user and return access token"""
-    user = db.query(User).filter(User.username == credentials.username).first()
+    user = await run_in_threadpool(_find_user, db, credentials.username)
     
-    if not user or not verify_password(credentials.password, user.password_hash):
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await passwords.verify_and_update_async(credentials.password, user.password_hash)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password"
@@ -135,12 +238,12 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
     if not user.is_active:
         raise HTTPException(status_code=400, detail="User account is disabled")
     
+    # Upgrade hashes made with an old cost factor
+    if new_hash:
+        await run_in_threadpool(_store_hash, db, user.id, new_hash)
+    
     # Create token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username},
-        expires_delta=access_token_expires
-    )
+    access_token = create_user_token(user)
     
     return TokenResponse(
         access_token=access_token,
@@ -154,7 +257,7 @@ def get_current_user_endpoint(
     db: Session = Depends(get_db)
 ):
     """Get current authenticated user"""
-    user = get_user_from_token(token, db)
+    user = _load_user(get_user_from_token(token, db), db)
     return UserResponse.from_orm(user)
 
 @router.put("/profile", response_model=UserResponse)
@@ -164,7 +267,7 @@ def update_profile(
     db: Session = Depends(get_db)
 ):
     """Update user profile information"""
-    user = get_user_from_token(token, db)
+    user = _load_user(get_user_from_token(token, db), db)
     
     if update_data.full_name:
         user.full_name = update_data.full_name
@@ -178,9 +281,28 @@ def update_profile(
     user.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(user)
+    invalidate_user(user)
     
     return UserResponse.from_orm(user)
 
+@router.post("/deactivate")
+def deactivate_account(
+    token: str,
+    db: Session = Depends(get_db)
+):
+    """Deactivate the authenticated user's account; its tokens stop working immediately"""
+    user = _load_user(get_user_from_token(token, db), db)
+    user.is_active = False
+    user.updated_at = datetime.utcnow()
+    db.commit()
+    invalidate_user(user)
+    return {"message": "Account deactivated"}
+
+@router.get("/hashing")
+def hashing_stats():
+    """Cost factor and queue depth of the password hashing executor"""
+    return passwords.stats()
+
 @router.post("/logout")
 def logout():
     """Logout user (client-side token deletion)"""
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Request
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
-from server.services import market_data
+from sqlalchemy.orm import Session
+from server.models import database
+from server.services import compute, indicators, market_client, market_data, quote_hub, tick_archive
+from server.utils import plotting, responses
 import asyncio
 import json
+import numpy as np
 
 router = APIRouter()
 
@@ -10,7 +16,7 @@ router = APIRouter()
 @router.get("/price/{symbol}")
 async def get_stock_price(symbol: str):
     """Get current stock price."""
-    price = market_data.fetch_stock_price(symbol.upper())
+    price = await market_client.price(symbol.upper())
     if price is None:
         return {"error": f"Could not fetch price for {symbol}"}
     return {"symbol": symbol.upper(), "price": price}
@@ -19,52 +25,158 @@ async def get_stock_price(symbol: str):
 @router.get("/info/{symbol}")
 async def get_stock_info(symbol: str):
     """Get stock info: sector, market cap, P/E, 52-week range."""
-    info = market_data.fetch_stock_info(symbol.upper())
+    info = await market_client.info(symbol.upper())
     if info is None:
         return {"error": f"Could not fetch info for {symbol}"}
     return info
 
 
 @router.get("/history/{symbol}")
-async def get_stock_history(symbol: str, period: str = "1y"):
-    """Get OHLC history. Period: 1mo, 3mo, 6mo, 1y, 5y, max."""
-    data = market_data.fetch_historical_ohlc(symbol.upper(), period)
-    if data is None:
+async def get_stock_history(request: Request, symbol: str, period: str = "1y",
+                            output: Optional[str] = Query(None, alias="format")):
+    """Get OHLC history. Period: 1mo, 3mo, 6mo, 1y, 5y, max.
+
+    `format` (or the Accept header) selects the shape: `records` (one object
+    per bar, the default), `columns` (one array per field) or `arrow`
+    (Arrow IPC stream). Responses are gzip/brotli-compressed when accepted.
+    """
+    fmt = responses.wants(request, output)
+    if fmt == "records":
+        data = await market_client.history(symbol.upper(), period)
+        if data is None:
+            return {"error": f"Could not fetch history for {symbol}"}
+        return responses.json_response(request, {"symbol": symbol.upper(), "period": period, "data": data})
+    columns = await market_client.history_columns(symbol.upper(), period)
+    if columns is None:
         return {"error": f"Could not fetch history for {symbol}"}
-    return {"symbol": symbol.upper(), "period": period, "data": data}
+    if fmt == "arrow":
+        return responses.encoded_response(request, responses.arrow_ipc(columns), responses.ARROW_MEDIA_TYPE)
+    data = dict(columns, date=np.datetime_as_string(columns["date"], unit="D"))
+    return responses.json_response(request, {"symbol": symbol.upper(), "period": period, "data": data})
+
+
+def _chart_body(columns, symbol, output):
+    """Candlestick chart encoded as Plotly JSON, its trace columns as JSON, or Arrow."""
+    payload = plotting.candlestick_payload(columns, symbol)
+    if output == "records":
+        return responses.dumps(payload)
+    trace = plotting.trace_columns(payload)
+    return responses.arrow_ipc(trace) if output == "arrow" else responses.dumps(trace)
 
 
 @router.get("/history/{symbol}/chart")
-async def get_stock_chart(symbol: str, period: str = "1y"):
-    """Get candlestick chart (Plotly JSON)."""
-    from server.utils.plotting import candlestick_chart
-    data = market_data.fetch_historical_ohlc(symbol.upper(), period)
-    if data is None:
+async def get_stock_chart(request: Request, symbol: str, period: str = "1y",
+                          output: Optional[str] = Query(None, alias="format")):
+    """Get candlestick chart (Plotly JSON), thinned to at most 2,000 bars.
+
+    `format=columns` (or `arrow`, also via Accept) returns only the x/OHLC
+    arrays. Responses are gzip/brotli-compressed when accepted.
+    """
+    fmt = responses.wants(request, output)
+    columns = await market_client.history_columns(symbol.upper(), period)
+    if columns is None:
+        return {"error": f"Could not fetch history for {symbol}"}
+    body = await compute.run_numpy(_chart_body, columns, symbol.upper(), fmt)
+    media_type = responses.ARROW_MEDIA_TYPE if fmt == "arrow" else "application/json"
+    return responses.encoded_response(request, body, media_type)
+
+
+def _numbers(value, name, count):
+    try:
+        numbers = [float(part) for part in value.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be {count} comma-separated numbers")
+    if len(numbers) != count:
+        raise HTTPException(status_code=400, detail=f"{name} must be {count} comma-separated numbers")
+    return numbers
+
+
+@router.get("/indicators/{symbol}")
+async def get_indicators(
+    request: Request,
+    symbol: str,
+    period: str = "1y",
+    sma: Optional[int] = Query(None, ge=1, le=1000),
+    ema: Optional[int] = Query(None, ge=1, le=1000),
+    rsi: Optional[int] = Query(None, ge=1, le=1000),
+    macd: Optional[str] = Query(None, description="fast,slow,signal e.g. 12,26,9"),
+    bollinger: Optional[str] = Query(None, description="period,width e.g. 20,2"),
+    atr: Optional[int] = Query(None, ge=1, le=1000),
+):
+    """Technical indicators computed server-side over the symbol's OHLC history.
+
+    Each series is aligned with `date`; bars before an indicator is defined
+    are null. Without any indicator parameters, SMA 20, EMA 50, RSI 14 and
+    MACD 12/26/9 are returned (the chart defaults).
+    """
+    if not any((sma, ema, rsi, macd, bollinger, atr)):
+        sma, ema, rsi, macd = 20, 50, 14, "12,26,9"
+    macd_params = tuple(int(p) for p in _numbers(macd, "macd", 3)) if macd else None
+    bollinger_params = tuple(_numbers(bollinger, "bollinger", 2)) if bollinger else None
+    if macd_params and not (0 < macd_params[0] < macd_params[1] and macd_params[2] >= 1):
+        raise HTTPException(status_code=400, detail="macd needs 0 < fast < slow and signal >= 1")
+    if bollinger_params and bollinger_params[0] < 1:
+        raise HTTPException(status_code=400, detail="bollinger period must be >= 1")
+    payload = await indicators.symbol_indicators(
+        symbol.upper(), period,
+        sma=sma, ema=ema, rsi=rsi, macd=macd_params, bollinger=bollinger_params, atr=atr,
+    )
+    if payload is None:
         return {"error": f"Could not fetch history for {symbol}"}
-    
-    fig = candlestick_chart(data, symbol.upper())
-    return fig.to_dict()
+    return responses.json_response(request, {"symbol": symbol.upper(), "period": period, **payload})
 
 
 @router.get('/stream')
 async def stream_prices(request: Request, symbols: str = 'AAPL'):
     """Server-Sent Events stream of latest prices for given comma-separated symbols.
     Example: /market/stream?symbols=AAPL,MSFT
+
+    All clients share one quote hub, so each symbol is fetched upstream once
+    per interval no matter how many streams are open.
     """
     symbols_list = [s.strip().upper() for s in symbols.split(',') if s.strip()]
+    hub = quote_hub.get_hub()
 
     async def event_generator():
-        while True:
-            if await request.is_disconnected():
-                break
-            payload = {}
-            for s in symbols_list:
+        sub = hub.subscribe(symbols_list)
+        try:
+            while True:
+                if await request.is_disconnected():
+                    break
                 try:
-                    price = market_data.fetch_stock_price(s)
-                except Exception:
-                    price = None
-                payload[s] = price
-            yield f"data: {json.dumps(payload)}\n\n"
-            await asyncio.sleep(2)
+                    payload = await sub.get(timeout=hub.interval)
+                except asyncio.TimeoutError:
+                    continue
+                yield f"data: {json.dumps(payload)}\n\n"
+        finally:
+            hub.unsubscribe(sub)
 
     return StreamingResponse(event_generator(), media_type='text/event-stream')
+
+
+@router.get('/stream/stats')
+async def stream_stats():
+    """Subscribers, polled symbols and upstream fetch counts for the quote hub."""
+    return quote_hub.get_hub().stats()
+
+
+@router.get('/ticks/{symbol}')
+def get_ticks(
+    symbol: str,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    limit: int = Query(5000, ge=1, le=100000),
+    db: Session = Depends(database.get_db),
+):
+    """Archived quote ticks for a symbol between `from` and `to` (UTC, ISO 8601)."""
+    rows = tick_archive.query_ticks(db, symbol.upper(), start, end, limit)
+    return {
+        "symbol": symbol.upper(),
+        "ticks": [{"timestamp": ts.isoformat(), "price": price} for ts, price in rows],
+    }
+
+
+@router.get('/cache')
+async def market_cache_stats():
+    """Hit ratios and sizes of the quote, info, dividend and history caches."""
+    return market_data.cache_stats()
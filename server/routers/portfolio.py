@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from server.models.schemas import (
-    PortfolioCreateRequest, PortfolioResponse, Position as PositionSchema
+    PortfolioCreateRequest, PortfolioResponse, Position as PositionSchema, PositionUpdate
 )
 from server.models import database
-from server.models.database import User
-from server.routers.auth import get_user_from_token
-from server.services import market_data
-import numpy as np
+from server.routers.auth import get_principal
+from server.services import compute, market_client
+from server.services import portfolio as portfolio_store
+from quant import portfolio as portfolio_engine
+import asyncio
 
 router = APIRouter()
 
@@ -19,6 +20,16 @@ def get_db():
         db.close()
 
 
+def _response(user_id, snapshot):
+    positions = [PositionSchema(symbol=symbol, qty=qty, avg_price=avg_price)
+                 for symbol, qty, avg_price in snapshot["positions"]]
+    return PortfolioResponse(user_id=str(user_id), positions=positions)
+
+
+def _rows(req):
+    return [(pos.symbol, pos.qty, pos.avg_price) for pos in req.positions]
+
+
 @router.post("/create", response_model=PortfolioResponse)
 async def create_portfolio(
     req: PortfolioCreateRequest,
@@ -26,49 +37,26 @@ async def create_portfolio(
     db: Session = Depends(get_db)
 ):
     """Create a new portfolio for the authenticated user"""
-    user = get_user_from_token(token, db)
+    user = get_principal(token, db)
     
     # Check if portfolio exists
-    existing = db.query(database.Portfolio).filter(database.Portfolio.user_id == user.id).first()
-    if existing:
+    if portfolio_store.load(db, user.id) is not None:
         raise HTTPException(status_code=400, detail="Portfolio already exists")
     
-    portfolio = database.Portfolio(user_id=user.id)
-    db.add(portfolio)
-    db.commit()
-    db.refresh(portfolio)
-    
-    # Add positions
-    for pos in req.positions:
-        position = database.Position(
-            portfolio_id=portfolio.id,
-            symbol=pos.symbol,
-            qty=pos.qty,
-            avg_price=pos.avg_price
-        )
-        db.add(position)
-    db.commit()
-    
-    return await get_user_portfolio(token, db)
+    return _response(user.id, portfolio_store.save(db, user.id, _rows(req)))
 
 
 @router.get("", response_model=PortfolioResponse)
 async def get_user_portfolio(token: str, db: Session = Depends(get_db)):
     """Get the authenticated user's portfolio"""
-    user = get_user_from_token(token, db)
+    user = get_principal(token, db)
     
-    portfolio = db.query(database.Portfolio).filter(database.Portfolio.user_id == user.id).first()
-    if not portfolio:
+    snapshot = portfolio_store.load(db, user.id)
+    if snapshot is None:
         # Create empty portfolio if doesn't exist
-        portfolio = database.Portfolio(user_id=user.id)
-        db.add(portfolio)
-        db.commit()
-        db.refresh(portfolio)
+        snapshot = portfolio_store.save(db, user.id, [])
     
-    positions_db = db.query(database.Position).filter(database.Position.portfolio_id == portfolio.id).all()
-    positions = [PositionSchema(symbol=p.symbol, qty=p.qty, avg_price=p.avg_price) for p in positions_db]
-    
-    return PortfolioResponse(user_id=str(user.id), positions=positions)
+    return _response(user.id, snapshot)
 
 
 @router.put("", response_model=PortfolioResponse)
@@ -78,73 +66,77 @@ async def update_portfolio(
     db: Session = Depends(get_db)
 ):
     """Update the authenticated user's portfolio"""
-    user = get_user_from_token(token, db)
+    user = get_principal(token, db)
     
-    portfolio = db.query(database.Portfolio).filter(database.Portfolio.user_id == user.id).first()
-    if not portfolio:
+    snapshot = portfolio_store.load(db, user.id)
+    if snapshot is None:
         raise HTTPException(status_code=404, detail="Portfolio not found")
     
-    # Delete old positions
-    db.query(database.Position).filter(database.Position.portfolio_id == portfolio.id).delete()
-    
-    # Add new positions
-    for pos in req.positions:
-        position = database.Position(
-            portfolio_id=portfolio.id,
-            symbol=pos.symbol,
-            qty=pos.qty,
-            avg_price=pos.avg_price
-        )
-        db.add(position)
-    db.commit()
-    
-    return await get_user_portfolio(token, db)
+    return _response(user.id, portfolio_store.save(db, user.id, _rows(req), portfolio_id=snapshot["id"]))
 
 
-@router.get("/analytics")
-async def portfolio_analytics(token: str, db: Session = Depends(get_db)):
-    """Get portfolio analytics: total value, P&L, allocation."""
-    user = get_user_from_token(token, db)
+@router.patch("/positions/{symbol}", response_model=PortfolioResponse)
+async def update_position(
+    symbol: str,
+    req: PositionUpdate,
+    token: str,
+    db: Session = Depends(get_db)
+):
+    """Set, change or (qty 0) remove a single position without resending the portfolio"""
+    user = get_principal(token, db)
     
-    portfolio = db.query(database.Portfolio).filter(database.Portfolio.user_id == user.id).first()
-    if not portfolio:
+    snapshot = portfolio_store.load(db, user.id)
+    if snapshot is None:
         raise HTTPException(status_code=404, detail="Portfolio not found")
+    if req.qty == 0 and not any(p[0] == symbol for p in snapshot["positions"]):
+        raise HTTPException(status_code=404, detail="Position not found")
     
-    positions_db = db.query(database.Position).filter(database.Position.portfolio_id == portfolio.id).all()
-    
-    total_cost = 0.0
-    holdings = {}
-    allocation = {}
-    
-    for pos in positions_db:
-        current_price = market_data.fetch_stock_price(pos.symbol)
-        if current_price is None:
-            continue
-        
-        cost = (pos.avg_price or 0) * pos.qty
-        current_value = current_price * pos.qty
-        total_cost += cost
-        
-        holdings[pos.symbol] = {
-            "qty": pos.qty,
-            "avg_price": pos.avg_price,
-            "current_price": current_price,
+    return _response(user.id, portfolio_store.set_position(db, user.id, snapshot, symbol, req.qty, req.avg_price))
+
+
+def _number(value):
+    return None if value != value else value
+
+
+def _analytics(user_id, snapshot, prices, sectors):
+    """Value the book with `quant.portfolio.analytics` and shape it as the analytics response."""
+    result = portfolio_engine.analytics(*portfolio_store.columns(snapshot), prices, sectors)
+    fields = ("qty", "avg_price", "price", "cost", "value", "gain_loss", "gain_loss_pct")
+    rows = zip(result["symbol"].tolist(), *(result[field].tolist() for field in fields))
+    holdings = {
+        symbol: {
+            "qty": qty,
+            "avg_price": _number(avg_price),
+            "current_price": price,
             "cost": cost,
-            "value": current_value,
-            "gain_loss": current_value - cost,
-            "gain_loss_pct": ((current_value - cost) / cost * 100) if cost > 0 else 0
+            "value": value,
+            "gain_loss": gain_loss,
+            "gain_loss_pct": gain_loss_pct,
         }
-    
-    total_value = sum(h["value"] for h in holdings.values())
-    for symbol, h in holdings.items():
-        allocation[symbol] = (h["value"] / total_value * 100) if total_value > 0 else 0
-    
+        for symbol, qty, avg_price, price, cost, value, gain_loss, gain_loss_pct in rows
+    }
+    total_cost, total_value = result["total_cost"], result["total_value"]
     return {
-        "user_id": str(user.id),
+        "user_id": str(user_id),
         "total_cost": total_cost,
         "total_value": total_value,
         "total_gain_loss": total_value - total_cost,
         "total_gain_loss_pct": ((total_value - total_cost) / total_cost * 100) if total_cost > 0 else 0,
         "holdings": holdings,
-        "allocation": allocation
+        "allocation": dict(zip(result["symbol"].tolist(), result["weight"].tolist())),
+        "sector_exposure": result["sector_exposure"],
     }
+
+
+@router.get("/analytics")
+async def portfolio_analytics(token: str, db: Session = Depends(get_db)):
+    """Get portfolio analytics: total value, P&L, allocation and sector exposure."""
+    user = get_principal(token, db)
+    
+    snapshot = portfolio_store.load(db, user.id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    
+    symbols = list(dict.fromkeys(symbol for symbol, _, _ in snapshot["positions"]))
+    prices, sectors = await asyncio.gather(market_client.prices(symbols), market_client.sectors(symbols))
+    return await compute.run_numpy(_analytics, user.id, snapshot, prices, sectors)
@@ -1,10 +1,131 @@
-from quant.blackscholes import call_price
-from quant.montecarlo import simulate_price
+from quant.blackscholes import call_price, call_price_batch
+from quant.impliedvol import implied_vol_batch
+from quant.montecarlo import simulate_price, price_option
+from quant.parallel import parallel_simulate
+from server.utils.cache import LRUCache
+from server.utils import plotting
+from server.utils.responses import arrow_ipc, dumps
+from quant import paths, risk
+from functools import partial
 import numpy as np
+import os
+
+# One simulation serves /simulate, /var, /distribution and /plot for the same request
+simulation_cache = LRUCache(
+    max_bytes=int(os.getenv("ATHENAA_SIM_CACHE_BYTES", 256 * 1024 * 1024)),
+    ttl=float(os.getenv("ATHENAA_SIM_CACHE_TTL", 60)),
+)
+
+# Encoded chart JSON, keyed by chart kind plus the simulation key
+chart_cache = LRUCache(
+    max_bytes=int(os.getenv("ATHENAA_CHART_CACHE_BYTES", 32 * 1024 * 1024)),
+    ttl=float(os.getenv("ATHENAA_SIM_CACHE_TTL", 60)),
+    sizeof=len,
+)
+
+# Large simulations are sharded across independent SeedSequence streams
+MC_WORKERS = min(int(os.getenv("ATHENAA_MC_WORKERS", 0)) or os.cpu_count() or 1, 16)
+PARALLEL_MIN_PATHS = int(os.getenv("ATHENAA_MC_PARALLEL_MIN_PATHS", 250_000))
 
 def black_scholes_price(S, K, T, r, sigma):
     return call_price(S, K, T, r, sigma)
 
-def montecarlo_simulate(S, T, r, sigma, n=10000):
-    arr = simulate_price(S, T, r, sigma, n)
-    return np.array(arr)
+def black_scholes_batch(S, K, T, r, sigma):
+    return np.atleast_1d(call_price_batch(S, K, T, r, sigma))
+
+def implied_vol(price, S, K, T, r):
+    vols = np.atleast_1d(implied_vol_batch(price, S, K, T, r))
+    return [None if np.isnan(v) else float(v) for v in vols]
+
+def montecarlo_simulate(S, T, r, sigma, n=10000, seed=None, antithetic=False, moment_matching=False,
+                        workers=None):
+    """Terminal price samples, shared through `simulation_cache`.
+
+    Runs of at least `PARALLEL_MIN_PATHS` paths are sharded across
+    `workers` independent streams (default `MC_WORKERS`); results are
+    reproducible for a given seed and worker count. The returned array is
+    read-only because other requests may hold it.
+    """
+    key = _simulation_key(S, T, r, sigma, n, seed, antithetic, moment_matching, workers)
+    workers = key[-1]
+
+    def simulate():
+        if workers > 1:
+            arr = parallel_simulate(S, T, r, sigma, n, seed=seed, workers=workers,
+                                    antithetic=antithetic, moment_matching=moment_matching)["samples"]
+        else:
+            arr = np.array(simulate_price(S, T, r, sigma, n, seed=seed, antithetic=antithetic,
+                                          moment_matching=moment_matching))
+        arr.setflags(write=False)
+        return arr
+
+    return simulation_cache.get_or_compute(key, simulate)
+
+def montecarlo_price(payoff, S, K, T, r, sigma, n=10000, seed=None, antithetic=False,
+                     moment_matching=False, control_variate=True):
+    return price_option(_payoff(payoff, K), S, T, r, sigma, n, seed=seed, antithetic=antithetic,
+                        moment_matching=moment_matching,
+                        control_strike=K if control_variate else None)
+
+def _payoff(kind, K):
+    if kind == "put":
+        return lambda ST: np.maximum(K - ST, 0.0)
+    if kind == "digital":
+        return lambda ST: (ST > K).astype(np.float64)
+    return lambda ST: np.maximum(ST - K, 0.0)
+
+def montecarlo_var(samples, S):
+    returns = (samples - S) / S
+    levels = risk.var_es(returns, (0.95, 0.99))
+    (var_95, es_95), (var_99, es_99) = levels[0.95], levels[0.99]
+    return {
+        "var_95": float(var_95),
+        "var_99": float(var_99),
+        "expected_shortfall_95": float(es_95),
+        "expected_shortfall_99": float(es_99),
+        "mean_return": float(returns.mean()),
+        "std_return": float(returns.std())
+    }
+
+def _simulation_key(S, T, r, sigma, n, seed, antithetic, moment_matching, workers):
+    if workers is None:
+        workers = MC_WORKERS if n >= PARALLEL_MIN_PATHS else 1
+    return (S, T, r, sigma, n, seed, antithetic, moment_matching, workers)
+
+def montecarlo_chart(kind, S, T, r, sigma, n=10000, seed=None, antithetic=False, moment_matching=False,
+                     workers=None, output="records"):
+    """Encoded "timeseries" (LTTB-downsampled) or "distribution" (pre-binned) chart.
+
+    `output` "records" is the Plotly figure as JSON, "columns" the trace
+    arrays as JSON and "arrow" the trace arrays as an Arrow IPC stream.
+    """
+    build = {"timeseries": plotting.timeseries_payload, "distribution": plotting.histogram_payload}[kind]
+    key = (kind, output) + _simulation_key(S, T, r, sigma, n, seed, antithetic, moment_matching, workers)
+
+    def render():
+        samples = montecarlo_simulate(S, T, r, sigma, n, seed=seed, antithetic=antithetic,
+                                      moment_matching=moment_matching, workers=workers)
+        payload = build(samples)
+        if output == "records":
+            return dumps(payload)
+        columns = plotting.trace_columns(payload)
+        return arrow_ipc(columns) if output == "arrow" else dumps(columns)
+
+    return chart_cache.get_or_compute(key, render)
+
+def path_price(payoff, S, K, T, r, sigma, n_paths, n_steps, barrier=None, seed=None, float32=False):
+    if payoff == "up_and_out":
+        if barrier is None:
+            raise ValueError("barrier is required for up_and_out")
+        fn = partial(paths.up_and_out_call, K=K, barrier=barrier)
+    elif payoff == "lookback":
+        fn = partial(paths.lookback_call, S=S)
+    else:
+        fn = partial(paths.asian_call, K=K)
+    return paths.price_path_payoff(fn, S, T, r, sigma, n_paths, n_steps, seed=seed,
+                                   dtype=np.float32 if float32 else np.float64)
+
+def path_risk(S, T, r, sigma, n_paths, n_steps, confidence=0.95, seed=None, float32=False):
+    chunks = paths.generate_paths(S, T, r, sigma, n_paths, n_steps, seed=seed,
+                                  dtype=np.float32 if float32 else np.float64)
+    return risk.path_risk(chunks, S, confidence)
@@ -0,0 +1,151 @@
+"""Executors for CPU-bound work so async routes never block the event loop.
+
+The shared `numpy_executor` is a thread pool for NumPy/SciPy kernels, which
+release the GIL. Size: ATHENAA_COMPUTE_THREADS (default: CPU count). It
+limits how many jobs may be in flight (ATHENAA_COMPUTE_MAX_INFLIGHT,
+default 4x the worker count) and applies a per-request timeout
+(ATHENAA_COMPUTE_TIMEOUT seconds, default 30).
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class ComputeBusy(Exception):
+    """Raised when an executor already has its maximum number of jobs in flight."""
+
+
+class ComputeTimeout(Exception):
+    """Raised when a job does not finish within its timeout."""
+
+
+class ComputeExecutor:
+    """A thread or process pool with an in-flight limit and per-call timeouts.
+
+    A slot is held until the underlying job actually finishes, so work
+    abandoned by a timed-out request still counts against the limit.
+    """
+
+    def __init__(self, name, max_workers, kind="thread", max_inflight=None, timeout=None):
+        if kind not in ("thread", "process"):
+            raise ValueError("kind must be 'thread' or 'process'")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_inflight = max_inflight or max_workers * 4
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def run(self, fn, *args, timeout=None, **kwargs):
+        """Run `fn(*args, **kwargs)` on the pool and await its result."""
+        with self._lock:
+            if self._inflight >= self.max_inflight:
+                self.rejected += 1
+                raise ComputeBusy(f"{self.name} executor is saturated")
+            self._inflight += 1
+        try:
+            future = self._get_executor().submit(fn, *args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._inflight -= 1
+                self.failed += 1
+            raise
+        future.add_done_callback(self._release)
+
+        timeout = self.timeout if timeout is None else timeout
+        waiter = asyncio.wrap_future(future)
+        try:
+            done, _ = await asyncio.wait({waiter}, timeout=timeout)
+        except asyncio.CancelledError:
+            waiter.cancel()
+            raise
+        if not done:
+            with self._lock:
+                # flagged before the cancel below can release the slot, so the
+                # job counts as timed out only, whatever it later does
+                abandoned = not future.done()
+                if abandoned:
+                    future.abandoned = True
+                    self.timed_out += 1
+            if abandoned:
+                # drops the job if it is still queued
+                waiter.cancel()
+                raise ComputeTimeout(f"{self.name} job exceeded {timeout}s")
+        return await waiter
+
+    def stats(self):
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_inflight": self.max_inflight,
+                "inflight": self._inflight,
+                "queued": max(0, self._inflight - self.max_workers),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    # spawn, not fork: the server process already runs threads
+                    self._executor = ProcessPoolExecutor(
+                        self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        self.max_workers, thread_name_prefix=f"athenaa-{self.name}")
+            return self._executor
+
+    def _release(self, future):
+        with self._lock:
+            self._inflight -= 1
+            if getattr(future, "abandoned", False):
+                return
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+_TIMEOUT = float(os.getenv("ATHENAA_COMPUTE_TIMEOUT", 30))
+_THREADS = _env_int("ATHENAA_COMPUTE_THREADS", os.cpu_count() or 1)
+
+numpy_executor = ComputeExecutor(
+    "numpy", _THREADS, kind="thread",
+    max_inflight=_env_int("ATHENAA_COMPUTE_MAX_INFLIGHT", 0) or None, timeout=_TIMEOUT,
+)
+
+
+async def run_numpy(fn, *args, **kwargs):
+    """Run a GIL-releasing NumPy job on the shared thread pool."""
+    return await numpy_executor.run(fn, *args, **kwargs)
+
+
+def stats():
+    return {"numpy": numpy_executor.stats()}
+
+
+def shutdown():
+    numpy_executor.shutdown(wait=False)
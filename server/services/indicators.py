@@ -0,0 +1,63 @@
+"""Indicator series for `/market/indicators`, cached per (symbol, period, params)."""
+import os
+
+import numpy as np
+
+from quant import indicators
+from server.services import compute as executors
+from server.services import market_client
+from server.utils.cache import LRUCache
+
+indicator_cache = LRUCache(
+    int(os.getenv("ATHENAA_INDICATOR_CACHE_BYTES", 64 * 1024 * 1024)),
+    ttl=float(os.getenv("ATHENAA_INDICATOR_TTL", 300)),
+    sizeof=lambda payload: sum(getattr(v, "nbytes", 64) for v in payload.values()),
+)
+
+
+def compute(columns, sma=None, ema=None, rsi=None, macd=None, bollinger=None, atr=None):
+    """Requested indicators over OHLC column arrays, as {name: array}."""
+    close = np.asarray(columns["close"], dtype=np.float64)
+    out = {}
+    if sma:
+        out["sma"] = indicators.sma(close, sma)
+    if ema:
+        out["ema"] = indicators.ema(close, ema)
+    if rsi:
+        out["rsi"] = indicators.rsi(close, rsi)
+    if macd:
+        result = indicators.macd(close, *macd)
+        out.update({"macd": result["macd"], "macd_signal": result["signal"], "macd_hist": result["hist"]})
+    if bollinger:
+        period, width = bollinger
+        result = indicators.bollinger(close, int(period), width)
+        out.update({"bb_middle": result["middle"], "bb_upper": result["upper"], "bb_lower": result["lower"]})
+    if atr:
+        out["atr"] = indicators.atr(columns["high"], columns["low"], close, atr)
+    return out
+
+
+def series(columns, **params):
+    """Dates plus the requested indicator series over OHLC column arrays."""
+    payload = compute(columns, **params)
+    payload["date"] = np.datetime_as_string(columns["date"], unit="D")
+    return payload
+
+
+async def symbol_indicators(symbol, period="1y", sma=None, ema=None, rsi=None, macd=None, bollinger=None,
+                            atr=None):
+    """Dates plus indicator series for a symbol's history, or None if it has no data.
+
+    History is awaited through `market_client` (retries, breaker, I/O pool);
+    only the NumPy kernels run on the compute executor.
+    """
+    params = dict(sma=sma, ema=ema, rsi=rsi, macd=macd, bollinger=bollinger, atr=atr)
+    key = (symbol, period) + tuple(sorted(params.items()))
+    payload = indicator_cache.get(key)
+    if payload is None:
+        columns = await market_client.history_columns(symbol, period)
+        if columns is None:
+            return None
+        payload = await executors.run_numpy(series, columns, **params)
+        indicator_cache.set(key, payload)
+    return payload
@@ -0,0 +1,81 @@
+"""Async facade over `server.services.market_data` for `async def` routes.
+
+The providers (yfinance in particular) are blocking, so every call runs on
+a dedicated, bounded thread pool and is awaited with a timeout; the event
+loop keeps serving other requests while Yahoo is slow. Retries with
+jittered backoff, the per-host concurrency cap and the circuit breaker
+live one level down, around each provider call (`market_data.upstream`),
+so cache hits never touch them.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from server.services import market_data
+
+MARKET_THREADS = int(os.getenv("ATHENAA_MARKET_THREADS", 16))
+MARKET_TIMEOUT = float(os.getenv("ATHENAA_MARKET_TIMEOUT", 15))
+
+
+class MarketTimeout(Exception):
+    """The market data call did not finish within the client timeout."""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(MARKET_THREADS, thread_name_prefix="athenaa-market")
+        return _pool
+
+
+async def run(fn, *args, timeout=None, **kwargs):
+    """Await blocking `fn(*args, **kwargs)` on the market pool, bounded by `timeout` seconds."""
+    limit = MARKET_TIMEOUT if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_executor(), lambda: fn(*args, **kwargs))
+    try:
+        return await asyncio.wait_for(future, limit)
+    except asyncio.TimeoutError:
+        raise MarketTimeout(f"market data request timed out after {limit}s")
+
+
+async def price(symbol, timeout=None):
+    return await run(market_data.fetch_stock_price, symbol, timeout=timeout)
+
+
+async def prices(symbols, timeout=None):
+    return await run(market_data.fetch_prices, list(symbols), timeout=timeout)
+
+
+async def info(symbol, timeout=None):
+    return await run(market_data.fetch_stock_info, symbol, timeout=timeout)
+
+
+async def sectors(symbols, timeout=None):
+    return await run(market_data.fetch_sectors, list(symbols), timeout=timeout)
+
+
+async def history(symbol, period="1y", timeout=None):
+    return await run(market_data.fetch_historical_ohlc, symbol, period, timeout=timeout)
+
+
+async def history_columns(symbol, period="1y", timeout=None):
+    return await run(market_data.fetch_historical_columns, symbol, period, timeout=timeout)
+
+
+async def dividends(symbol, timeout=None):
+    return await run(market_data.fetch_dividend_history, symbol, timeout=timeout)
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -1,48 +1,212 @@
-import yfinance as yf
+"""Market data access with a tiered cache in front of the active provider.
+
+Quotes live in memory for a few seconds. Fundamentals, dividends and OHLC
+history are kept for hours, optionally mirrored to disk so they survive
+restarts (ATHENAA_MARKET_CACHE_DIR), and served stale while a background
+refresh runs. History is append-only: a refresh downloads only the bars
+since the last cached one. With ATHENAA_OHLC_DIR set, history lives in a
+columnar on-disk store (`server.services.ohlc_store`) instead.
+"""
+import os
+import threading
+import time
+
 import pandas as pd
 
+from server.services import tick_archive
+from server.services.ohlc_store import OHLCStore
+from server.services.providers import get_provider, period_start, slice_period
+from server.utils.cache import DiskStore, LRUCache, TieredCache
+from server.utils.resilience import CircuitBreaker, Upstream
+from server.utils.singleflight import SingleFlight
+
+QUOTE_TTL = float(os.getenv("ATHENAA_QUOTE_TTL", 1.0))
+INFO_TTL = float(os.getenv("ATHENAA_INFO_TTL", 6 * 3600))
+HISTORY_TTL = float(os.getenv("ATHENAA_HISTORY_TTL", 3600))
+STALE_TTL = float(os.getenv("ATHENAA_MARKET_STALE_TTL", 24 * 3600))
+CACHE_BYTES = int(os.getenv("ATHENAA_MARKET_CACHE_BYTES", 128 * 1024 * 1024))
+CACHE_DIR = os.getenv("ATHENAA_MARKET_CACHE_DIR") or None
+OHLC_DIR = os.getenv("ATHENAA_OHLC_DIR") or None
+
+_disk = DiskStore(os.path.join(CACHE_DIR, "market_cache.sqlite3")) if CACHE_DIR else None
+
+quote_cache = LRUCache(8 * 1024 * 1024, ttl=QUOTE_TTL)
+info_cache = TieredCache("info", CACHE_BYTES // 8, INFO_TTL, STALE_TTL, disk=_disk)
+dividend_cache = TieredCache("dividends", CACHE_BYTES // 8, INFO_TTL, STALE_TTL, disk=_disk)
+history_cache = TieredCache("history", CACHE_BYTES, HISTORY_TTL, STALE_TTL, disk=_disk)
+
+ohlc_store = OHLCStore(OHLC_DIR) if OHLC_DIR else None
+
+HOST_CONCURRENCY = int(os.getenv("ATHENAA_MARKET_HOST_CONCURRENCY", 8))
+RETRIES = int(os.getenv("ATHENAA_MARKET_RETRIES", 2))
+BACKOFF = float(os.getenv("ATHENAA_MARKET_BACKOFF", 0.25))
+BREAKER_THRESHOLD = int(os.getenv("ATHENAA_MARKET_BREAKER_THRESHOLD", 5))
+BREAKER_RESET = float(os.getenv("ATHENAA_MARKET_BREAKER_RESET", 30))
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+# Concurrent quote requests for the same symbol share one upstream call
+quote_flights = SingleFlight()
+history_flights = SingleFlight()
+
+
+def upstream(provider=None):
+    """The `Upstream` (concurrency cap, retries, breaker) for a provider's host."""
+    provider = provider or get_provider()
+    with _upstreams_lock:
+        host = _upstreams.get(provider.name)
+        if host is None:
+            host = _upstreams[provider.name] = Upstream(
+                provider.name, max_concurrency=HOST_CONCURRENCY, retries=RETRIES, backoff=BACKOFF,
+                breaker=CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET),
+            )
+        return host
+
+
+def _upstream_call(method, *args, **kwargs):
+    provider = get_provider()
+    return upstream(provider).call(getattr(provider, method), *args, **kwargs)
+
+
+def _download_prices(symbols):
+    try:
+        return _upstream_call("prices", symbols)
+    except:
+        return {}
+
+
+def fetch_prices(symbols):
+    """Fetch current prices for many symbols in one upstream round trip.
+
+    Returns {symbol: price or None}. Recently fetched quotes come from the
+    quote cache; symbols already being fetched by another caller are not
+    requested again, their in-flight result is shared.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    prices = {}
+    missing = []
+    for symbol in symbols:
+        price = quote_cache.get(symbol)
+        if price is None:
+            missing.append(symbol)
+        else:
+            prices[symbol] = price
+    if missing:
+        fetched = quote_flights.do_many(missing, _download_prices)
+        for symbol, price in fetched.items():
+            if price is not None:
+                quote_cache.set(symbol, price)
+        tick_archive.record(fetched)
+        prices.update(fetched)
+    return {symbol: prices.get(symbol) for symbol in symbols}
+
 
 def fetch_stock_price(symbol: str):
     """Fetch current stock price."""
+    return fetch_prices([symbol]).get(symbol)
+
+
+def _load_history(symbol, period):
+    data = _upstream_call("history", symbol, period=period)
+    if data.empty:
+        return None
+    return {"frame": data, "start": period_start(period)}
+
+
+def _extend_history(symbol, cached):
+    """Append the bars published since the last cached one (which is re-fetched)."""
+    frame = cached["frame"]
+    new = _upstream_call("history", symbol, start=frame.index[-1].date())
+    if not new.empty:
+        frame = pd.concat([frame[frame.index < new.index[0]], new])
+    return {"frame": frame, "start": cached["start"]}
+
+
+def _sync_store(store, symbol, period):
+    """Bring the store up to date for `period`: full download once, then new bars only."""
+    if not store.covers(symbol, period):
+        data = _upstream_call("history", symbol, period="max")
+        if not data.empty:
+            store.write(symbol, data, start=None, replace=True)
+        return
+    meta = store.meta(symbol)
+    if time.time() - meta["refreshed_at"] >= HISTORY_TTL:
+        store.write(symbol, _upstream_call("history", symbol, start=store.last_date(symbol)))
+
+
+def fetch_historical_frame(symbol: str, period="1y"):
+    """Fetch OHLC history as a DataFrame indexed by Date, or None if unavailable."""
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period="1d")
-        if data.empty:
+        if ohlc_store is not None:
+            history_flights.do(symbol, lambda: _sync_store(ohlc_store, symbol, period))
+            return ohlc_store.frame(symbol, period)
+        wanted = period_start(period)
+
+        def covers(cached):
+            return cached["start"] is None or (wanted is not None and cached["start"] <= wanted)
+
+        cached = history_cache.get(
+            symbol,
+            lambda: _load_history(symbol, period),
+            refresh=lambda old: _extend_history(symbol, old),
+            accept=covers,
+        )
+        if cached is None:
             return None
-        return float(data["Close"].iloc[-1])
+        return slice_period(cached["frame"], period)
     except:
         return None
 
 
+def fetch_historical_columns(symbol: str, period="1y"):
+    """OHLC history as {"date", "open", "high", "low", "close", "volume"} arrays, or None.
+
+    With the on-disk store these are memory-mapped slices (no copy); dates
+    are datetime64[D].
+    """
+    if ohlc_store is not None:
+        try:
+            history_flights.do(symbol, lambda: _sync_store(ohlc_store, symbol, period))
+            return ohlc_store.columns(symbol, period)
+        except:
+            return None
+    data = fetch_historical_frame(symbol, period)
+    if data is None:
+        return None
+    index = data.index.tz_localize(None) if data.index.tz is not None else data.index
+    columns = {"date": index.values.astype("datetime64[D]")}
+    for name in ("Open", "High", "Low", "Close", "Volume"):
+        columns[name.lower()] = data[name].to_numpy()
+    return columns
+
+
 def fetch_historical_ohlc(symbol: str, period="1y"):
     """Fetch OHLC historical data. Period: '1mo', '3mo', '6mo', '1y', '5y', 'max'."""
+    data = fetch_historical_frame(symbol, period)
+    if data is None:
+        return None
+    # Return as list of dicts for JSON serialization
+    data = data.reset_index()
+    data["Date"] = data["Date"].astype(str)
+    return data[["Date", "Open", "High", "Low", "Close", "Volume"]].to_dict("records")
+
+
+def _load_dividends(symbol):
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period=period)
-        if data.empty:
-            return None
-        # Return as list of dicts for JSON serialization
-        data = data.reset_index()
-        data["Date"] = data["Date"].astype(str)
-        return data[["Date", "Open", "High", "Low", "Close", "Volume"]].to_dict("records")
+        return _upstream_call("dividends", symbol).to_dict()
     except:
         return None
 
 
 def fetch_dividend_history(symbol: str):
     """Fetch dividend history."""
-    try:
-        ticker = yf.Ticker(symbol)
-        return ticker.dividends.to_dict()
-    except:
-        return {}
+    return dividend_cache.get(symbol, lambda: _load_dividends(symbol)) or {}
 
 
-def fetch_stock_info(symbol: str):
-    """Fetch basic stock info: sector, market cap, P/E ratio, etc."""
+def _load_info(symbol):
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = _upstream_call("info", symbol)
         return {
             "symbol": symbol,
             "name": info.get("longName", ""),
@@ -55,3 +219,36 @@ def fetch_stock_info(symbol: str):
         }
     except:
         return None
+
+
+def fetch_stock_info(symbol: str):
+    """Fetch basic stock info: sector, market cap, P/E ratio, etc."""
+    return info_cache.get(symbol, lambda: _load_info(symbol))
+
+
+def fetch_sectors(symbols):
+    """{symbol: sector} from the (cached) fundamentals; None when unknown."""
+    sectors = {}
+    for symbol in dict.fromkeys(symbols):
+        info = fetch_stock_info(symbol)
+        sectors[symbol] = (info or {}).get("sector") or None
+    return sectors
+
+
+def cache_stats():
+    """Hit ratios and sizes for each market data cache tier."""
+    return {
+        "quotes": quote_cache.stats(),
+        "info": info_cache.stats(),
+        "dividends": dividend_cache.stats(),
+        "history": history_cache.stats(),
+        "disk": _disk.path if _disk is not None else None,
+        "upstreams": [u.stats() for u in list(_upstreams.values())],
+    }
+
+
+def clear_caches():
+    """Drop every cached quote, fundamental and bar (memory and disk)."""
+    quote_cache.clear()
+    for cache in (info_cache, dividend_cache, history_cache):
+        cache.clear()
@@ -0,0 +1,161 @@
+"""Columnar on-disk store of daily OHLCV bars, one directory per symbol.
+
+Each column is a raw little-endian array file (`date.bin` as datetime64[D],
+`open.bin` ... `volume.bin`) that only ever grows: a refresh rewrites the
+overlapping last bar in place and appends the new ones. Reads memory-map
+the files, so slicing a period touches no network and copies nothing until
+the caller builds a DataFrame. `meta.json` records how far back the store
+reaches and when it was last refreshed.
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from server.services.providers import OHLCV_COLUMNS, period_start
+
+COLUMNS = {
+    "date": np.dtype("<M8[D]"),
+    "open": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "low": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<i8"),
+}
+
+
+class OHLCStore:
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def meta(self, symbol):
+        """{"start": ISO date or None (full history), "refreshed_at": epoch seconds}, or None."""
+        try:
+            with open(self._path(symbol, "meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def covers(self, symbol, period):
+        """True when the stored bars reach back far enough for `period`."""
+        meta = self.meta(symbol)
+        if meta is None:
+            return False
+        if meta["start"] is None:
+            return True
+        wanted = period_start(period)
+        return wanted is not None and pd.Timestamp(meta["start"]).date() <= wanted
+
+    def columns(self, symbol, period="max"):
+        """Memory-mapped column slices for `period`, counted back from the last bar.
+
+        Returns a dict of read-only arrays keyed like `COLUMNS`, or None when
+        the symbol has no stored bars.
+        """
+        n = self._length(symbol)
+        if not n:
+            return None
+        cols = {name: np.memmap(self._path(symbol, name + ".bin"), dtype=dtype, mode="r", shape=(n,))
+                for name, dtype in COLUMNS.items()}
+        dates = cols["date"]
+        if period == "1d":
+            first = n - 1
+        elif period == "max":
+            first = 0
+        else:
+            start = period_start(period, dates[-1].astype(object))
+            first = int(np.searchsorted(dates, np.datetime64(start, "D")))
+        return {name: col[first:] for name, col in cols.items()}
+
+    def frame(self, symbol, period="max"):
+        """`columns` as an OHLCV DataFrame indexed by Date, or None."""
+        cols = self.columns(symbol, period)
+        if cols is None:
+            return None
+        index = pd.DatetimeIndex(cols["date"].astype("datetime64[ns]"), name="Date")
+        return pd.DataFrame({name.capitalize(): cols[name] for name in COLUMNS if name != "date"},
+                            index=index)[OHLCV_COLUMNS]
+
+    def last_date(self, symbol):
+        n = self._length(symbol)
+        if not n:
+            return None
+        dates = np.memmap(self._path(symbol, "date.bin"), dtype=COLUMNS["date"], mode="r", shape=(n,))
+        return dates[-1].astype(object)
+
+    def write(self, symbol, frame, start=None, replace=False):
+        """Merge `frame` into the store, keeping bars before its first date.
+
+        With `replace=True` the symbol is rewritten from `frame` alone and
+        `start` (a date, or None for full history) becomes its coverage.
+        """
+        new = self._to_columns(frame)
+        with self._lock:
+            os.makedirs(self._path(symbol), exist_ok=True)
+            meta = self.meta(symbol)
+            n = 0 if replace else self._length(symbol)
+            if n and len(new["date"]):
+                dates = np.fromfile(self._path(symbol, "date.bin"), dtype=COLUMNS["date"], count=n)
+                keep = int(np.searchsorted(dates, new["date"][0]))
+            else:
+                keep = n
+            if replace or keep + len(new["date"]) < n:
+                # the new bars would shrink the history: rewrite every column atomically
+                self._rewrite(symbol, keep, new)
+            else:
+                # overwrite the overlapping tail in place, then append; date goes last
+                # so concurrent readers never see a date without its prices
+                for name in sorted(COLUMNS, key=lambda c: c == "date"):
+                    with open(self._path(symbol, name + ".bin"), "r+b" if n else "wb") as f:
+                        f.seek(keep * COLUMNS[name].itemsize)
+                        f.write(new[name].tobytes())
+            if replace or meta is None:
+                coverage = start.isoformat() if start is not None else None
+            else:
+                coverage = meta["start"]
+            self._write_meta(symbol, {"start": coverage, "refreshed_at": time.time()})
+
+    def _rewrite(self, symbol, keep, new):
+        for name, dtype in COLUMNS.items():
+            path = self._path(symbol, name + ".bin")
+            head = np.fromfile(path, dtype=dtype, count=keep) if keep else np.empty(0, dtype)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(head.tobytes())
+                f.write(new[name].tobytes())
+            os.replace(tmp, path)
+
+    def _write_meta(self, symbol, meta):
+        path = self._path(symbol, "meta.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+    def _length(self, symbol):
+        sizes = []
+        for name, dtype in COLUMNS.items():
+            try:
+                sizes.append(os.path.getsize(self._path(symbol, name + ".bin")) // dtype.itemsize)
+            except FileNotFoundError:
+                return 0
+        return min(sizes)
+
+    def _to_columns(self, frame):
+        index = frame.index
+        if getattr(index, "tz", None) is not None:
+            index = index.tz_localize(None)
+        cols = {"date": index.values.astype(COLUMNS["date"])}
+        for name in OHLCV_COLUMNS:
+            values = frame[name].to_numpy(dtype=np.float64, na_value=np.nan)
+            if name == "Volume":
+                values = np.nan_to_num(values)
+            cols[name.lower()] = np.ascontiguousarray(values.astype(COLUMNS[name.lower()]))
+        return cols
+
+    def _path(self, symbol, *parts):
+        return os.path.join(self.root, symbol.upper(), *parts)
@@ -0,0 +1,79 @@
+"""bcrypt password hashing on a dedicated, bounded executor.
+
+A bcrypt hash or check costs ~250 ms of CPU at the default cost, so it
+never runs on the event loop or the shared request threadpool. Jobs go to
+`hashing_executor` (ATHENAA_BCRYPT_THREADS workers, default 4). Once
+ATHENAA_BCRYPT_MAX_INFLIGHT jobs are queued or running (default 4x the
+workers), new ones fail fast with `ComputeBusy`, answered as 503.
+
+The cost factor is ATHENAA_BCRYPT_ROUNDS (default 12). Hashes made with a
+different cost are replaced on the next successful login.
+"""
+import os
+
+import bcrypt
+
+from server.services.compute import ComputeExecutor
+
+BCRYPT_ROUNDS = int(os.getenv("ATHENAA_BCRYPT_ROUNDS", 12))
+# bcrypt only reads the first 72 bytes; longer secrets are truncated, as passlib did
+MAX_PASSWORD_BYTES = 72
+
+_THREADS = int(os.getenv("ATHENAA_BCRYPT_THREADS", 4))
+
+hashing_executor = ComputeExecutor(
+    "bcrypt", _THREADS, kind="thread",
+    max_inflight=int(os.getenv("ATHENAA_BCRYPT_MAX_INFLIGHT", 0)) or None,
+    timeout=float(os.getenv("ATHENAA_BCRYPT_TIMEOUT", 10)),
+)
+
+
+def _secret(password):
+    return password.encode("utf-8")[:MAX_PASSWORD_BYTES]
+
+
+def hash_password(password: str, rounds=None) -> str:
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds or BCRYPT_ROUNDS)).decode("ascii")
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(_secret(plain_password), hashed_password.encode("ascii"))
+    except ValueError:
+        return False
+
+
+def needs_rehash(hashed_password: str, rounds=None) -> bool:
+    """True if the hash was made with a cost other than the configured one."""
+    try:
+        cost = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return cost != (rounds or BCRYPT_ROUNDS)
+
+
+def verify_and_update(plain_password: str, hashed_password: str):
+    """(matches, new_hash). `new_hash` is set when a matching hash should be replaced."""
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, hash_password(plain_password)
+    return True, None
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash `password` on the hashing executor."""
+    return await hashing_executor.run(hash_password, password)
+
+
+async def verify_and_update_async(plain_password: str, hashed_password: str):
+    """`verify_and_update` on the hashing executor."""
+    return await hashing_executor.run(verify_and_update, plain_password, hashed_password)
+
+
+def stats():
+    return {"rounds": BCRYPT_ROUNDS, **hashing_executor.stats()}
+
+
+def shutdown():
+    hashing_executor.shutdown(wait=False)
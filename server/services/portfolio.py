@@ -1,21 +1,167 @@
-from server.models.schemas import PortfolioResponse, Position
-from typing import List, Dict
+"""Portfolio reads and writes with a per-user read cache.
 
-# simple in-memory store for now
-_store: Dict[str, List[Position]] = {}
+A portfolio is loaded together with its positions in one joined query and
+cached per user as a plain snapshot, `{"id": portfolio_id, "positions":
+[(symbol, qty, avg_price), ...]}`. Writes go through `save`, which writes
+only the rows that changed, commits and replaces the cached snapshot, so
+reads after a write never hit the database. The cache is per process; other workers see a change after
+ATHENAA_PORTFOLIO_CACHE_TTL seconds (default 300).
+"""
+import os
+import sys
+from collections import deque
 
-def create_portfolio(user_id: str, positions: List[Position]) -> PortfolioResponse:
-    _store[user_id] = positions
-    return PortfolioResponse(user_id=user_id, positions=positions)
+import numpy as np
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session, joinedload
+
+from quant import portfolio as portfolio_engine
+from server.models import database
+from server.utils.cache import LRUCache
+
+PORTFOLIO_CACHE_TTL = float(os.getenv("ATHENAA_PORTFOLIO_CACHE_TTL", 300))
+PORTFOLIO_CACHE_BYTES = int(os.getenv("ATHENAA_PORTFOLIO_CACHE_BYTES", 16 * 1024 * 1024))
+
+
+def _snapshot_size(snapshot):
+    positions = snapshot["positions"]
+    return sys.getsizeof(snapshot) + sys.getsizeof(positions) + sum(
+        sys.getsizeof(p) + sys.getsizeof(p[0]) + 48 for p in positions)
 
-def get_portfolio(user_id: str) -> PortfolioResponse:
-    p = _store.get(user_id)
-    if not p:
-        return None
-    return PortfolioResponse(user_id=user_id, positions=p)
 
-def update_portfolio(user_id: str, positions: List[Position]) -> PortfolioResponse:
-    if user_id not in _store:
+portfolio_cache = LRUCache(PORTFOLIO_CACHE_BYTES, ttl=PORTFOLIO_CACHE_TTL, sizeof=_snapshot_size)
+
+
+def _snapshot(portfolio):
+    return {
+        "id": portfolio.id,
+        "positions": [(p.symbol, p.qty, p.avg_price) for p in portfolio.positions],
+    }
+
+
+def load(db: Session, user_id: int):
+    """The user's portfolio snapshot, or None if they have none."""
+    snapshot = portfolio_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+    portfolio = (
+        db.query(database.Portfolio)
+        .options(joinedload(database.Portfolio.positions))
+        .filter(database.Portfolio.user_id == user_id)
+        .order_by(database.Portfolio.id)
+        .first()
+    )
+    if portfolio is None:
         return None
-    _store[user_id] = positions
-    return PortfolioResponse(user_id=user_id, positions=positions)
+    snapshot = _snapshot(portfolio)
+    portfolio_cache.set(user_id, snapshot)
+    return snapshot
+
+
+def columns(snapshot):
+    """The snapshot's lots in `quant.portfolio.encode` layout: (names, index, qty, avg_price).
+
+    Built once per cached snapshot and kept alongside it; unknown avg_price is NaN.
+    """
+    cached = snapshot.get("columns")
+    if cached is not None:
+        return cached
+    positions = snapshot["positions"]
+    if positions:
+        symbols, qty, avg_price = zip(*positions)
+    else:
+        symbols, qty, avg_price = (), (), ()
+    cached = snapshot["columns"] = portfolio_engine.encode(
+        np.array(symbols, dtype=str), np.array(qty, dtype=np.float64), np.array(avg_price, dtype=np.float64))
+    return cached
+
+
+def diff(current, positions):
+    """Changes that turn `current` rows into `positions`.
+
+    `current` are (id, symbol, qty, avg_price) rows, `positions` are
+    (symbol, qty, avg_price). Lots are matched by symbol in order, so an
+    unchanged lot costs nothing. Returns (inserts, updates, deletes):
+    mappings for new rows, {"id", "qty", "avg_price"} mappings for
+    changed rows, and the ids of rows to remove.
+    """
+    existing = {}
+    for row_id, symbol, qty, avg_price in current:
+        existing.setdefault(symbol, deque()).append((row_id, qty, avg_price))
+    inserts, updates = [], []
+    for symbol, qty, avg_price in positions:
+        rows = existing.get(symbol)
+        if rows:
+            row_id, old_qty, old_avg_price = rows.popleft()
+            if (old_qty, old_avg_price) != (qty, avg_price):
+                updates.append({"id": row_id, "qty": qty, "avg_price": avg_price})
+        else:
+            inserts.append({"symbol": symbol, "qty": qty, "avg_price": avg_price})
+    deletes = [row[0] for rows in existing.values() for row in rows]
+    return inserts, updates, deletes
+
+
+def save(db: Session, user_id: int, positions, portfolio_id=None):
+    """Create (portfolio_id=None) or update the user's positions in one transaction.
+
+    `positions` are (symbol, qty, avg_price) tuples describing the whole
+    portfolio. Only the rows that differ are written, each kind of change
+    as one executemany. Returns the new snapshot.
+    """
+    positions = [tuple(p) for p in positions]
+    Position = database.Position
+    try:
+        if portfolio_id is None:
+            portfolio = database.Portfolio(user_id=user_id)
+            db.add(portfolio)
+            db.flush()
+            portfolio_id = portfolio.id
+            current = []
+        else:
+            current = (
+                db.query(Position.id, Position.symbol, Position.qty, Position.avg_price)
+                .filter(Position.portfolio_id == portfolio_id)
+                .order_by(Position.id)
+                .all()
+            )
+        inserts, updates, deletes = diff(current, positions)
+        if deletes:
+            db.execute(delete(Position).where(Position.id.in_(deletes)))
+        if updates:
+            db.execute(update(Position), updates)
+        if inserts:
+            db.execute(insert(Position), [{**row, "portfolio_id": portfolio_id} for row in inserts])
+        db.commit()
+    except BaseException:
+        db.rollback()
+        portfolio_cache.invalidate(user_id)
+        raise
+    snapshot = {"id": portfolio_id, "positions": positions}
+    portfolio_cache.set(user_id, snapshot)
+    return snapshot
+
+
+def set_position(db: Session, user_id: int, snapshot, symbol, qty, avg_price=None):
+    """Set one symbol's holding (all of its lots) to `qty`; qty 0 removes it.
+
+    Without `avg_price` the symbol keeps the qty-weighted average price of
+    its lots with a known price. The merged lot takes the place of the
+    symbol's first lot; a new symbol goes last.
+    """
+    current = snapshot["positions"]
+    lots = [p for p in current if p[0] == symbol]
+    positions = [p for p in current if p[0] != symbol]
+    if qty:
+        if avg_price is None:
+            priced = [(q, px) for _, q, px in lots if px is not None]
+            total_qty = sum(q for q, _ in priced)
+            if total_qty:
+                avg_price = sum(q * px for q, px in priced) / total_qty
+        at = next((i for i, p in enumerate(current) if p[0] == symbol), len(current))
+        positions.insert(at, (symbol, qty, avg_price))
+    return save(db, user_id, positions, portfolio_id=snapshot["id"])
+
+
+def invalidate(user_id: int):
+    portfolio_cache.invalidate(user_id)
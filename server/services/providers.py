@@ -0,0 +1,292 @@
+"""Market data providers behind `server.services.market_data`.
+
+`YFinanceProvider` talks to Yahoo Finance. `LocalProvider` never touches
+the network: it serves CSV/Parquet fixtures when present and otherwise
+deterministic synthetic GBM bars and ticks, with optional injected latency
+so the server's throughput can be load-tested offline.
+
+The active provider is chosen by ATHENAA_MARKET_PROVIDER ("yfinance" or
+"local"); `set_provider` swaps it at runtime (e.g. in tests).
+"""
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Calendar days covered by each yfinance-style period ("max" is unbounded)
+PERIOD_DAYS = {
+    "1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183,
+    "1y": 366, "2y": 731, "5y": 1827, "10y": 3653,
+}
+
+
+def period_start(period, end=None):
+    """First calendar date covered by `period` ending at `end`; None for 'max'."""
+    end = end or date.today()
+    if period == "max":
+        return None
+    if period == "ytd":
+        return date(end.year, 1, 1)
+    if period not in PERIOD_DAYS:
+        raise ValueError(f"Unsupported period: {period}")
+    return end - timedelta(days=PERIOD_DAYS[period])
+
+
+def slice_period(frame, period):
+    """Rows of a daily OHLCV frame covered by `period`, counted back from its last bar."""
+    if frame.empty or period == "max":
+        return frame
+    if period == "1d":
+        return frame.iloc[-1:]
+    first = period_start(period, frame.index[-1].date())
+    return frame[frame.index >= pd.Timestamp(first, tz=frame.index.tz)]
+
+
+class MarketDataProvider(ABC):
+    """Source of quotes, OHLC history, dividends and fundamentals.
+
+    `history` returns a DataFrame indexed by a DatetimeIndex named "Date"
+    with Open/High/Low/Close/Volume columns (empty when unknown).
+    `info` returns a yfinance-style info dict.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def history(self, symbol, period="1y", start=None):
+        ...
+
+    @abstractmethod
+    def info(self, symbol):
+        ...
+
+    @abstractmethod
+    def dividends(self, symbol):
+        ...
+
+    def price(self, symbol):
+        """Latest price, or None if the symbol has no data."""
+        data = self.history(symbol, period="1d")
+        if data.empty:
+            return None
+        return float(data["Close"].iloc[-1])
+
+    def prices(self, symbols):
+        """Latest prices for many symbols as {symbol: price or None}.
+
+        The default asks for each symbol in turn; providers with a bulk
+        endpoint override it to make one round trip.
+        """
+        result = {}
+        for symbol in symbols:
+            try:
+                result[symbol] = self.price(symbol)
+            except Exception:
+                result[symbol] = None
+        return result
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def history(self, symbol, period="1y", start=None):
+        ticker = yf.Ticker(symbol)
+        if start is not None:
+            return ticker.history(start=start)
+        return ticker.history(period=period)
+
+    def info(self, symbol):
+        return yf.Ticker(symbol).info
+
+    def prices(self, symbols):
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        data = yf.download(symbols, period="5d", progress=False, threads=False,
+                           group_by="column", auto_adjust=True)
+        closes = data["Close"] if not data.empty else pd.DataFrame()
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(symbols[0])
+        result = dict.fromkeys(symbols)
+        for symbol in symbols:
+            if symbol in closes.columns:
+                series = closes[symbol].dropna()
+                if len(series):
+                    result[symbol] = float(series.iloc[-1])
+        return result
+
+    def dividends(self, symbol):
+        return yf.Ticker(symbol).dividends
+
+
+class LocalProvider(MarketDataProvider):
+    """Offline provider with fixtures, synthetic GBM data and latency injection.
+
+    If `fixtures_dir` contains `<SYMBOL>.parquet` or `<SYMBOL>.csv` (with a
+    Date column plus OHLCV), history is served from it. Otherwise each
+    symbol gets a reproducible synthetic daily GBM series derived from
+    `seed` and the symbol name. `price` adds a small intraday move that
+    changes every `tick_seconds`, also deterministic. Every call sleeps
+    `latency_ms` (+/- `jitter_ms`) to mimic a remote API.
+    """
+
+    name = "local"
+    SECTORS = ["Technology", "Healthcare", "Financial Services", "Energy",
+               "Consumer Cyclical", "Industrials", "Utilities"]
+    MAX_YEARS = 20
+
+    def __init__(self, seed=0, latency_ms=0.0, jitter_ms=0.0, fixtures_dir=None, tick_seconds=1.0):
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fixtures_dir = fixtures_dir
+        self.tick_seconds = tick_seconds
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def history(self, symbol, period="1y", start=None):
+        self._sleep()
+        frame = self._frame(symbol)
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start)]
+        return slice_period(frame, period)
+
+    def info(self, symbol):
+        self._sleep()
+        rng = self._rng(symbol, "info")
+        frame = self._frame(symbol)
+        year = frame[frame.index >= frame.index[-1] - pd.Timedelta(days=365)]
+        return {
+            "longName": f"{symbol} Synthetic Corp.",
+            "sector": self.SECTORS[self._symbol_seed(symbol) % len(self.SECTORS)],
+            "marketCap": int(rng.uniform(1e9, 2e12)),
+            "trailingPE": round(float(rng.uniform(8, 60)), 2),
+            "dividendYield": round(float(rng.uniform(0, 0.04)), 4),
+            "fiftyTwoWeekHigh": float(year["High"].max()),
+            "fiftyTwoWeekLow": float(year["Low"].min()),
+        }
+
+    def dividends(self, symbol):
+        self._sleep()
+        frame = self._frame(symbol)
+        # one payment per quarter, on that quarter's last trading day
+        quarterly = frame["Close"].groupby(frame.index.to_period("Q")).tail(1)
+        rate = self._rng(symbol, "dividends").uniform(0, 0.01)
+        return (quarterly * rate).round(4).rename("Dividends")
+
+    def price(self, symbol):
+        self._sleep()
+        return self._tick(symbol)
+
+    def prices(self, symbols):
+        # one simulated round trip for the whole batch, like a bulk download
+        self._sleep()
+        return {symbol: self._tick(symbol) for symbol in symbols}
+
+    def _tick(self, symbol):
+        frame = self._frame(symbol)
+        if frame.empty:
+            return None
+        tick = int(time.time() / self.tick_seconds)
+        move = self._rng(symbol, f"tick-{tick}").standard_normal() * 0.002
+        return float(frame["Close"].iloc[-1] * math.exp(move))
+
+    def _frame(self, symbol):
+        with self._lock:
+            frame = self._frames.get(symbol)
+        if frame is None:
+            frame = self._load_fixture(symbol)
+            if frame is None:
+                frame = self._synthesize(symbol)
+            with self._lock:
+                self._frames[symbol] = frame
+        return frame
+
+    def _load_fixture(self, symbol):
+        if not self.fixtures_dir:
+            return None
+        for ext, reader in ((".parquet", pd.read_parquet), (".csv", pd.read_csv)):
+            path = os.path.join(self.fixtures_dir, symbol + ext)
+            if os.path.exists(path):
+                frame = reader(path)
+                if "Date" in frame.columns:
+                    frame = frame.set_index(pd.to_datetime(frame["Date"])).drop(columns="Date")
+                frame.index.name = "Date"
+                return frame[OHLCV_COLUMNS].sort_index()
+        return None
+
+    def _synthesize(self, symbol):
+        rng = self._rng(symbol, "history")
+        end = pd.Timestamp(date.today())
+        dates = pd.bdate_range(end=end, periods=252 * self.MAX_YEARS, name="Date")
+        n = len(dates)
+        mu, sigma = rng.uniform(0.0, 0.15), rng.uniform(0.15, 0.45)
+        dt = 1 / 252
+        log_returns = (mu - 0.5 * sigma**2) * dt + sigma * math.sqrt(dt) * rng.standard_normal(n)
+        # anchor the walk so the latest close is a realistic present-day price
+        log_path = np.cumsum(log_returns)
+        close = rng.uniform(20, 500) * np.exp(log_path - log_path[-1])
+        open_ = np.r_[close[0], close[:-1]] * np.exp(rng.normal(0, 0.002, n))
+        spread = np.abs(rng.normal(0, 0.01, n))
+        return pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + spread),
+            "Low": np.minimum(open_, close) * (1 - spread),
+            "Close": close,
+            "Volume": rng.integers(1_000_000, 50_000_000, n),
+        }, index=dates)
+
+    def _symbol_seed(self, symbol):
+        return zlib.crc32(symbol.encode())
+
+    def _rng(self, symbol, purpose):
+        return np.random.default_rng([self.seed, self._symbol_seed(symbol), zlib.crc32(purpose.encode())])
+
+    def _sleep(self):
+        if self.latency_ms or self.jitter_ms:
+            delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+            time.sleep(max(delay, 0.0) / 1000.0)
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def provider_from_env():
+    kind = os.getenv("ATHENAA_MARKET_PROVIDER", "yfinance")
+    if kind == "local":
+        return LocalProvider(
+            seed=int(os.getenv("ATHENAA_MARKET_SEED", 0)),
+            latency_ms=float(os.getenv("ATHENAA_MARKET_LATENCY_MS", 0)),
+            jitter_ms=float(os.getenv("ATHENAA_MARKET_JITTER_MS", 0)),
+            fixtures_dir=os.getenv("ATHENAA_MARKET_FIXTURES") or None,
+        )
+    if kind == "yfinance":
+        return YFinanceProvider()
+    raise ValueError(f"Unknown ATHENAA_MARKET_PROVIDER: {kind}")
+
+
+def get_provider():
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = provider_from_env()
+        return _provider
+
+
+def set_provider(provider):
+    """Replace the active provider; returns the previous one."""
+    global _provider
+    with _provider_lock:
+        previous, _provider = _provider, provider
+        return previous
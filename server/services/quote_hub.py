@@ -0,0 +1,131 @@
+"""Shared quote fan-out for `/market/stream`.
+
+One background task per event loop polls every distinct subscribed symbol
+once per interval, keeps the latest tick in memory and pushes a snapshot
+to each subscriber's bounded queue. A slow consumer's queue drops its
+oldest snapshot instead of growing, so it always receives the freshest
+prices. Each poll is one batched quote request for all symbols, so upstream
+load is independent of the number of clients.
+"""
+import asyncio
+import os
+import time
+import weakref
+
+from server.services import market_data
+
+STREAM_INTERVAL = float(os.getenv("ATHENAA_STREAM_INTERVAL", 2.0))
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("ATHENAA_STREAM_QUEUE_SIZE", 4))
+
+
+class Subscription:
+    """One client's view of the hub: its symbols and a bounded snapshot queue."""
+
+    def __init__(self, symbols, queue_size):
+        self.symbols = tuple(symbols)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, snapshot):
+        if self.queue.full():
+            # drop the stale snapshot; the consumer only needs the latest prices
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(snapshot)
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class QuoteHub:
+    def __init__(self, fetch=None, interval=STREAM_INTERVAL, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.fetch = fetch or market_data.fetch_prices  # symbols -> {symbol: price}
+        self.interval = interval
+        self.queue_size = queue_size
+        self.latest = {}  # symbol -> {"price": float | None, "timestamp": float}
+        self._subscriptions = set()
+        self._task = None
+        self.polls = 0
+        self.fetches = 0
+
+    def subscribe(self, symbols):
+        sub = Subscription(symbols, self.queue_size)
+        self._subscriptions.add(sub)
+        if all(s in self.latest for s in sub.symbols):
+            sub.offer(self._snapshot(sub))
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return sub
+
+    def unsubscribe(self, sub):
+        self._subscriptions.discard(sub)
+
+    def symbols(self):
+        return sorted({s for sub in self._subscriptions for s in sub.symbols})
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscriptions),
+            "symbols": self.symbols(),
+            "polls": self.polls,
+            "upstream_fetches": self.fetches,
+            "dropped": sum(sub.dropped for sub in self._subscriptions),
+        }
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def poll_once(self):
+        """Fetch every subscribed symbol once and publish to all subscribers."""
+        symbols = self.symbols()
+        if not symbols:
+            return
+        prices = await asyncio.to_thread(self._safe_fetch, symbols)
+        now = time.time()
+        for symbol in symbols:
+            self.latest[symbol] = {"price": prices.get(symbol), "timestamp": now}
+        self.polls += 1
+        self.fetches += len(symbols)
+        for sub in list(self._subscriptions):
+            # a client that joined mid-poll waits for a poll that covers all its symbols
+            if all(s in self.latest for s in sub.symbols):
+                sub.offer(self._snapshot(sub))
+
+    async def _run(self):
+        while self._subscriptions:
+            started = time.monotonic()
+            await self.poll_once()
+            await asyncio.sleep(max(self.interval - (time.monotonic() - started), 0.0))
+
+    def _safe_fetch(self, symbols):
+        try:
+            return self.fetch(symbols)
+        except Exception:
+            return {}
+
+    def _snapshot(self, sub):
+        return {s: self.latest.get(s, {}).get("price") for s in sub.symbols}
+
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def get_hub():
+    """The hub bound to the running event loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = QuoteHub()
+    return hub
+
+
+async def shutdown():
+    hub = _hubs.get(asyncio.get_running_loop())
+    if hub is not None:
+        await hub.stop()
@@ -0,0 +1,205 @@
+"""Background archive of fetched quotes in the `stock_snapshots` table.
+
+`record` only enqueues; a writer thread drains the queue and inserts each
+batch with a single executemany. When the queue is full new ticks are
+dropped (and counted) rather than slowing the quote path down. The same
+thread periodically thins old ticks to one per symbol per bucket and
+deletes ticks past the retention window. Each thinning pass resumes from
+the bucket holding the previous cutoff, so already thinned ticks are not
+read again; a tick recorded with a timestamp older than that is left as is.
+"""
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import delete, select
+
+from server.models import database
+
+ENABLED = os.getenv("ATHENAA_TICK_ARCHIVE", "1") != "0"
+BATCH_SIZE = int(os.getenv("ATHENAA_TICK_BATCH", 500))
+FLUSH_INTERVAL = float(os.getenv("ATHENAA_TICK_FLUSH_INTERVAL", 1.0))
+QUEUE_SIZE = int(os.getenv("ATHENAA_TICK_QUEUE_SIZE", 100_000))
+RETENTION_DAYS = float(os.getenv("ATHENAA_TICK_RETENTION_DAYS", 30))
+DOWNSAMPLE_AFTER_HOURS = float(os.getenv("ATHENAA_TICK_DOWNSAMPLE_AFTER_HOURS", 24))
+DOWNSAMPLE_SECONDS = int(os.getenv("ATHENAA_TICK_DOWNSAMPLE_SECONDS", 60))
+MAINTENANCE_INTERVAL = float(os.getenv("ATHENAA_TICK_MAINTENANCE_INTERVAL", 3600))
+
+snapshots = database.StockSnapshot.__table__
+
+
+def utcnow():
+    """Naive UTC datetime, matching how `StockSnapshot.timestamp` is stored."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class TickArchive:
+    def __init__(self, engine=None, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 queue_size=QUEUE_SIZE, maintenance_interval=MAINTENANCE_INTERVAL):
+        self.engine = engine or database.engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maintenance_interval = maintenance_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._last_maintenance = time.monotonic()
+        self._downsampled = None  # (bucket_seconds, cutoff) of the last pass
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def record(self, prices, timestamp=None):
+        """Queue one tick per symbol with a price; never blocks."""
+        timestamp = timestamp or utcnow()
+        for symbol, price in prices.items():
+            if price is None:
+                continue
+            try:
+                self._queue.put_nowait({"symbol": symbol, "price": float(price), "timestamp": timestamp})
+            except queue.Full:
+                with self._lock:
+                    self.dropped += 1
+        self._ensure_started()
+
+    def flush(self):
+        """Write everything queued so far, including batches the writer thread holds."""
+        while self._write_batch():
+            pass
+        self._queue.join()
+
+    def stop(self):
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=5)
+        self.flush()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+    def downsample(self, older_than, bucket_seconds=DOWNSAMPLE_SECONDS):
+        """Keep only the last tick per symbol per `bucket_seconds` before `older_than`.
+
+        Only ticks from the bucket holding the previous pass's cutoff onward
+        are read.
+        """
+        stmt = (
+            select(snapshots.c.id, snapshots.c.symbol, snapshots.c.timestamp)
+            .where(snapshots.c.timestamp < older_than)
+            .order_by(snapshots.c.symbol, snapshots.c.timestamp, snapshots.c.id)
+        )
+        previous = self._downsampled
+        if previous is not None and previous[0] == bucket_seconds:
+            if older_than <= previous[1]:
+                return 0
+            stmt = stmt.where(snapshots.c.timestamp >= _bucket_start(previous[1], bucket_seconds))
+        with self.engine.begin() as conn:
+            thinned = self._thin(conn, conn.execute(stmt).all(), bucket_seconds)
+        self._downsampled = (bucket_seconds, older_than)
+        return thinned
+
+    def _thin(self, conn, rows, bucket_seconds):
+        """Delete all but the last of `rows` per symbol and bucket; returns how many went."""
+        if not rows:
+            return 0
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        symbols = np.array([row[1] for row in rows], dtype=object)
+        seconds = np.array([row[2] for row in rows], dtype="datetime64[s]").astype(np.int64)
+        buckets = seconds // bucket_seconds
+        # rows are sorted by (symbol, timestamp): a row survives if it ends its bucket
+        last = np.ones(len(rows), dtype=bool)
+        last[:-1] = (symbols[1:] != symbols[:-1]) | (buckets[1:] != buckets[:-1])
+        doomed = ids[~last].tolist()
+        for start in range(0, len(doomed), 500):
+            conn.execute(delete(snapshots).where(snapshots.c.id.in_(doomed[start:start + 500])))
+        return len(doomed)
+
+    def prune(self, older_than):
+        """Delete ticks recorded before `older_than`."""
+        with self.engine.begin() as conn:
+            return conn.execute(delete(snapshots).where(snapshots.c.timestamp < older_than)).rowcount
+
+    def maintain(self, now=None):
+        """Apply the retention and downsampling policy."""
+        now = now or utcnow()
+        pruned = self.prune(now - timedelta(days=RETENTION_DAYS))
+        thinned = self.downsample(now - timedelta(hours=DOWNSAMPLE_AFTER_HOURS))
+        return {"pruned": pruned, "downsampled": thinned}
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="athenaa-ticks", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._write_batch(timeout=self.flush_interval)
+            if time.monotonic() - self._last_maintenance >= self.maintenance_interval:
+                self._last_maintenance = time.monotonic()
+                try:
+                    self.maintain()
+                except Exception:
+                    self.errors += 1
+
+    def _write_batch(self, timeout=None):
+        try:
+            rows = [self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()]
+        except queue.Empty:
+            return False
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(snapshots.insert(), rows)
+            self.written += len(rows)
+        except Exception:
+            self.errors += 1
+        finally:
+            for _ in rows:
+                self._queue.task_done()
+        return True
+
+
+def _bucket_start(timestamp, bucket_seconds):
+    """Start of the `bucket_seconds` bucket holding `timestamp`, as `downsample` buckets it."""
+    seconds = int(np.datetime64(timestamp, "s").astype(np.int64))
+    return (np.datetime64(seconds - seconds % bucket_seconds, "s")).astype(datetime)
+
+
+def query_ticks(db, symbol, start=None, end=None, limit=5000):
+    """Ticks for `symbol` in [start, end], oldest first (served by the symbol/timestamp index)."""
+    stmt = select(snapshots.c.timestamp, snapshots.c.price).where(snapshots.c.symbol == symbol)
+    if start is not None:
+        stmt = stmt.where(snapshots.c.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(snapshots.c.timestamp <= end)
+    stmt = stmt.order_by(snapshots.c.timestamp).limit(limit)
+    return db.execute(stmt).all()
+
+
+archive = TickArchive() if ENABLED else None
+
+
+def record(prices, timestamp=None):
+    if archive is not None:
+        archive.record(prices, timestamp)
+
+
+def shutdown():
+    if archive is not None:
+        archive.stop()
@@ -0,0 +1,306 @@
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from server.utils.singleflight import SingleFlight
+
+
+def nbytes(value):
+    """Approximate size of a cached value; NumPy arrays and DataFrames report their buffers."""
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+        return int(value.memory_usage(index=True).sum())
+    size = getattr(value, "nbytes", None)
+    if size is not None:
+        return int(size)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by total byte size, with TTL expiry.
+
+    Entries older than `ttl` seconds are treated as misses and dropped.
+    When inserting would exceed `max_bytes`, least recently used entries
+    are evicted first. Values larger than `max_bytes` are not cached.
+    Concurrent `get_or_compute` misses on one key share a single computation.
+    """
+
+    def __init__(self, max_bytes, ttl=None, sizeof=nbytes):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._data = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        size = self.sizeof(value)
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            while self._data and self._bytes + size > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+            self._data[key] = (value, size, expires_at)
+            self._bytes += size
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for `key`, computing and storing it on a miss.
+
+        Callers that miss while `key` is already being computed wait for
+        that computation instead of starting their own.
+        """
+        value = self.get(key)
+        if value is None:
+            value = self._flights.do(key, lambda: self._compute(key, compute))
+        return value
+
+    def _compute(self, key, compute):
+        # a flight that finished just before this one started may have stored it
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[2] is None or entry[2] > time.monotonic()):
+                return entry[0]
+        value = compute()
+        self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "coalesced": self._flights.shared,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+
+class DiskStore:
+    """Pickled key/value store in a single SQLite file, shared by threads.
+
+    Values are stored with the wall-clock time they were fetched so that a
+    restarted process can tell how old they are.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, fetched_at REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        """Return `(value, fetched_at)` or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fetched_at FROM entries WHERE key = ?", (repr(key),)
+            ).fetchone()
+        if row is None:
+            return None
+        return pickle.loads(row[0]), row[1]
+
+    def set(self, key, value, fetched_at):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, fetched_at) VALUES (?, ?, ?)",
+                (repr(key), blob, fetched_at),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+
+_refresh_pool = None
+_refresh_pool_lock = threading.Lock()
+
+
+def _refresher():
+    global _refresh_pool
+    with _refresh_pool_lock:
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(4, thread_name_prefix="athenaa-refresh")
+        return _refresh_pool
+
+
+def shutdown():
+    """Stop background revalidation threads."""
+    global _refresh_pool
+    with _refresh_pool_lock:
+        pool, _refresh_pool = _refresh_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class TieredCache:
+    """Memory LRU in front of an optional `DiskStore`, with stale-while-revalidate.
+
+    An entry younger than `ttl` seconds is served as is. Between `ttl` and
+    `ttl + stale_ttl` it is still served, and a background refresh replaces
+    it; older entries are reloaded synchronously. `None` results are never
+    cached, so failed fetches are retried on the next request.
+    """
+
+    def __init__(self, name, max_bytes, ttl, stale_ttl=0.0, disk=None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.disk = disk
+        self.memory = LRUCache(max_bytes, ttl=ttl + stale_ttl, sizeof=lambda entry: nbytes(entry[0]))
+        self._refreshing = set()
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def get(self, key, load, refresh=None, accept=None):
+        """Return the value for `key`, calling `load()` on a miss.
+
+        `refresh(old_value)` builds the replacement for a stale entry
+        (default: `load()`), e.g. to fetch only what changed. `accept(value)`
+        can reject a cached value that does not cover the request.
+        """
+        entry = self._lookup(key)
+        if entry is not None and (accept is None or accept(entry[0])):
+            value, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                self._count("hits")
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                self._revalidate(key, value, load, refresh)
+                return value
+        self._count("misses")
+        return self._flights.do(key, lambda: self._load(key, load))
+
+    def set(self, key, value, fetched_at=None):
+        entry = (value, fetched_at or time.time())
+        self.memory.set(key, entry, ttl=max(self.ttl + self.stale_ttl - (time.time() - entry[1]), 0.0))
+        if self.disk is not None:
+            self.disk.set((self.name, key), value, entry[1])
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "memory": self.memory.stats(),
+            }
+
+    def _load(self, key, load):
+        value = load()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def _lookup(self, key):
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get((self.name, key))
+            if entry is not None:
+                self._count("disk_hits")
+                remaining = self.ttl + self.stale_ttl - (time.time() - entry[1])
+                if remaining <= 0:
+                    return None
+                self.memory.set(key, entry, ttl=remaining)
+        return entry
+
+    def _revalidate(self, key, value, load, refresh):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                fresh = refresh(value) if refresh is not None else load()
+                if fresh is not None:
+                    self.set(key, fresh)
+                    self._count("refreshes")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        try:
+            _refresher().submit(run)
+        except RuntimeError:
+            # interpreter shutting down: keep serving the stale value
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
@@ -1,35 +1,95 @@
-import plotly.graph_objects as go
-import pandas as pd
-
-def timeseries_plotly(arr):
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(y=arr, mode='lines', name='simulated'))
-    fig.update_layout(title='Monte Carlo Simulation', xaxis_title='sample', yaxis_title='price')
-    return fig
-
-def distribution_histogram(arr):
-    fig = go.Figure()
-    fig.add_trace(go.Histogram(x=arr, nbinsx=50, name='distribution'))
-    fig.update_layout(title='Price Distribution', xaxis_title='price', yaxis_title='frequency')
-    return fig
-
-def candlestick_chart(ohlc_data, symbol):
-    """Create candlestick chart from OHLC data."""
-    df = pd.DataFrame(ohlc_data)
-    df['Date'] = pd.to_datetime(df['Date'])
-    
-    fig = go.Figure(data=[go.Candlestick(
-        x=df['Date'],
-        open=df['Open'],
-        high=df['High'],
-        low=df['Low'],
-        close=df['Close']
-    )])
-    
-    fig.update_layout(
-        title=f'{symbol} OHLC',
-        yaxis_title='Stock Price (USD)',
-        template='plotly_white'
-    )
-    return fig
+"""Plotly-compatible chart payloads built directly as dicts.
 
+Each builder returns `{"data": [...traces], "layout": {...}}`, which
+`Plotly.newPlot` accepts as is, without importing plotly on the server.
+Long series are downsampled with LTTB and distributions are binned here,
+so payload size depends on the chart resolution, not the sample count.
+"""
+import numpy as np
+
+MAX_POINTS = 2000
+HISTOGRAM_BINS = 50
+
+
+def lttb(y, threshold, x=None):
+    """Indices of `threshold` points chosen by Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last points and, from each bucket in between, the
+    point forming the largest triangle with the previously kept point and
+    the mean of the next bucket, which preserves peaks and troughs.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = y.size
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        nxt_lo, nxt_hi = hi, edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean()
+        avg_y = y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev]))
+        prev = lo + int(np.argmax(area))
+        selected[b + 1] = prev
+    return selected
+
+
+def trace_columns(payload):
+    """The first trace's data arrays ({"x", "y", ...}), for column and Arrow output."""
+    trace = payload["data"][0]
+    return {name: value for name, value in trace.items() if isinstance(value, np.ndarray)}
+
+
+def _layout(title, xaxis, yaxis, **extra):
+    return {
+        "title": {"text": title},
+        "xaxis": {"title": {"text": xaxis}},
+        "yaxis": {"title": {"text": yaxis}},
+        **extra,
+    }
+
+
+def timeseries_payload(values, max_points=MAX_POINTS, title="Monte Carlo Simulation"):
+    """Line chart of `values` against their index, downsampled to `max_points`."""
+    values = np.asarray(values, dtype=np.float64)
+    idx = lttb(values, max_points)
+    return {
+        "data": [{"type": "scatter", "mode": "lines", "name": "simulated",
+                  "x": idx, "y": values[idx]}],
+        "layout": _layout(title, "sample", "price"),
+        "points": int(values.size),
+    }
+
+
+def histogram_payload(values, bins=HISTOGRAM_BINS, title="Price Distribution"):
+    """Distribution of `values` binned server-side and drawn as bars."""
+    counts, edges = np.histogram(np.asarray(values, dtype=np.float64), bins=bins)
+    return {
+        "data": [{"type": "bar", "name": "distribution", "x": (edges[:-1] + edges[1:]) / 2,
+                  "y": counts, "width": np.diff(edges)}],
+        "layout": _layout(title, "price", "frequency", bargap=0),
+        "points": int(counts.sum()),
+    }
+
+
+def candlestick_payload(columns, symbol, max_points=MAX_POINTS):
+    """Candlestick chart from OHLC columns ({"date", "open", "high", "low", "close"}).
+
+    Histories longer than `max_points` bars are thinned with LTTB on the
+    close so the overall shape survives.
+    """
+    idx = lttb(columns["close"], max_points)
+    dates = np.asarray(columns["date"]).astype("datetime64[D]")[idx]
+    return {
+        "data": [{
+            "type": "candlestick",
+            "x": np.datetime_as_string(dates, unit="D"),
+            **{field: np.asarray(columns[field])[idx] for field in ("open", "high", "low", "close")},
+        }],
+        "layout": _layout(f"{symbol} OHLC", "Date", "Stock Price (USD)", template="plotly_white"),
+        "points": int(len(columns["close"])),
+    }
@@ -0,0 +1,112 @@
+"""Retry, concurrency limiting and circuit breaking around blocking upstream calls."""
+import random
+import threading
+import time
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an upstream that has been failing."""
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures.
+
+    While open, calls fail fast with `CircuitOpen`. After `reset_timeout`
+    seconds one trial call is let through (half-open); its success closes
+    the breaker, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self._state()
+            if state == "open" or (state == "half_open" and self._trial):
+                raise CircuitOpen("upstream circuit is open")
+            if state == "half_open":
+                self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class Upstream:
+    """Calls into one upstream host with a concurrency cap, retries and a breaker.
+
+    Failed attempts are retried up to `retries` times after a "full jitter"
+    sleep, i.e. uniform in [0, min(max_backoff, backoff * 2**attempt)], so
+    callers that failed together do not retry in lockstep. Each attempt
+    counts towards the circuit breaker.
+    """
+
+    def __init__(self, name, max_concurrency=8, retries=2, backoff=0.25, max_backoff=4.0, breaker=None):
+        self.name = name
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.calls = 0
+        self.retried = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def call(self, fn, *args, **kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                self.breaker.before_call()
+            except CircuitOpen:
+                self.rejected += 1
+                raise
+            try:
+                with self._slots:
+                    self.calls += 1
+                    result = fn(*args, **kwargs)
+            except Exception:
+                self.breaker.record_failure()
+                if attempt == self.retries:
+                    self.failed += 1
+                    raise
+                self.retried += 1
+                time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+            else:
+                self.breaker.record_success()
+                return result
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "breaker": self.breaker.state,
+            "calls": self.calls,
+            "retried": self.retried,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
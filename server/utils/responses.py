@@ -0,0 +1,95 @@
+"""Fast JSON encoding, content negotiation and compression for large payloads.
+
+orjson (optional) serializes NumPy arrays natively and is several times
+faster than the standard library; without it we fall back to `json` with
+a NumPy-aware default. Arrow IPC needs pyarrow and brotli needs the
+`brotli` package; both are optional too.
+"""
+import gzip
+import json
+import re
+from datetime import date, datetime
+
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MIN_COMPRESS_BYTES = 1024
+_NON_FINITE = re.compile(r"(?<=[\[,:])(?:NaN|-?Infinity)(?=[,\]}])")
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Serialize to JSON bytes; NaN and infinities become null either way."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    text = json.dumps(obj, default=_default, separators=(",", ":"))
+    # a plain substring scan is far cheaper than the regex; most bodies have no non-finite values
+    if "NaN" in text or "Infinity" in text:
+        text = _NON_FINITE.sub("null", text)
+    return text.encode()
+
+
+def wants(request: Request, requested=None):
+    """Pick "records", "columns" or "arrow" from `?format=` or the Accept header."""
+    if requested:
+        if requested not in ("records", "columns", "arrow"):
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {requested}")
+        return requested
+    if ARROW_MEDIA_TYPE in request.headers.get("accept", ""):
+        return "arrow"
+    return "records"
+
+
+def arrow_ipc(columns):
+    """Encode a dict of equal-length arrays as an Arrow IPC stream."""
+    if pyarrow is None:
+        raise HTTPException(status_code=406, detail="Arrow output requires pyarrow")
+    table = pyarrow.table({name: np.asarray(values) for name, values in columns.items()})
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encoded_response(request: Request, body: bytes, media_type="application/json"):
+    """Response with brotli or gzip applied when the client accepts it and it pays off."""
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    accepted = request.headers.get("accept-encoding", "")
+    if len(body) >= MIN_COMPRESS_BYTES:
+        if brotli is not None and "br" in accepted:
+            body = brotli.compress(body, quality=4)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def json_response(request: Request, obj):
+    return encoded_response(request, dumps(obj))
@@ -0,0 +1,60 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Coalesce concurrent requests for the same key onto one in-flight call.
+
+    While a key is being fetched, other callers asking for it wait on the
+    same `Future` instead of issuing their own upstream request. Keys are
+    forgotten as soon as their call finishes, so results are never cached
+    here; pair with a TTL cache for that.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        """Return `fn()` for `key`, sharing the result with concurrent callers."""
+        return self.do_many([key], lambda keys: {keys[0]: fn()})[key]
+
+    def do_many(self, keys, fetch_many):
+        """Resolve many keys, fetching only those nobody else is already fetching.
+
+        `fetch_many(keys)` must return a dict covering the keys it was given
+        (missing keys resolve to None). It is called at most once per call.
+        """
+        owned, futures = [], {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self._inflight[key] = Future()
+                    owned.append(key)
+                else:
+                    self.shared += 1
+                futures[key] = future
+            if owned:
+                self.calls += 1
+
+        if owned:
+            try:
+                results = fetch_many(owned)
+            except BaseException as exc:
+                self._finish(owned, futures, error=exc)
+                raise
+            self._finish(owned, futures, results=results)
+        return {key: future.result() for key, future in futures.items()}
+
+    def _finish(self, owned, futures, results=None, error=None):
+        with self._lock:
+            for key in owned:
+                self._inflight.pop(key, None)
+        for key in owned:
+            if error is not None:
+                futures[key].set_exception(error)
+            else:
+                futures[key].set_result(results.get(key))
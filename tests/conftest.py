@@ -1,7 +1,15 @@
+import os
 import pytest
+
+# Keep test quotes out of the real tick archive; tests build their own
+os.environ.setdefault("ATHENAA_TICK_ARCHIVE", "0")
+# Minimum bcrypt cost keeps register/login tests fast
+os.environ.setdefault("ATHENAA_BCRYPT_ROUNDS", "4")
+
 from fastapi.testclient import TestClient
 from server.main import app
 from server.models import database
+from server.services import providers
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -29,6 +37,9 @@ def override_get_db():
         db.close()
 
 
+# Serve market data from the deterministic offline provider instead of Yahoo
+providers.set_provider(providers.LocalProvider())
+
 # Apply the override BEFORE creating the test client
 app.dependency_overrides[database.get_db] = override_get_db
 
@@ -53,3 +64,32 @@ def db_session():
     yield session
     session.close()
 
+
+
+@pytest.fixture
+def temp_db(tmp_path):
+    """Session on a throwaway file database with one seeded user.
+
+    Yields (db, user, statements); `statements` records every SQL string
+    the engine runs. The principal and portfolio caches and the principal
+    generations start empty.
+    """
+    from sqlalchemy import event
+    from server.routers import auth
+    from server.services import portfolio as portfolio_store
+
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'temp.db'}")
+    database.Base.metadata.create_all(bind=file_engine)
+    statements = []
+    event.listen(file_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    session = sessionmaker(bind=file_engine)()
+    user = database.User(username="holder", email="h@example.com", password_hash="x")
+    session.add(user)
+    session.commit()
+    auth.principal_cache.clear()
+    auth._generations.clear()
+    portfolio_store.portfolio_cache.clear()
+    yield session, user, statements
+    portfolio_store.portfolio_cache.clear()
+    session.close()
+    file_engine.dispose()
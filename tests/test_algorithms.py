@@ -77,6 +77,49 @@ class TestBlackScholes:
         assert response.json()["price"] == 10
 
 
+class TestBlackScholesBatch:
+    """Tests for vectorized Black-Scholes chain pricing."""
+    
+    def test_batch_matches_scalar(self):
+        """Test batch prices agree with the scalar pricer."""
+        from quant.blackscholes import call_price
+        strikes = [80, 90, 100, 110, 120]
+        payload = {"S": 100, "K": strikes, "T": 1, "r": 0.05, "sigma": 0.2}
+        response = client.post("/algorithms/black_scholes/batch", json=payload)
+        assert response.status_code == 200
+        prices = response.json()["prices"]
+        assert len(prices) == len(strikes)
+        for K, price in zip(strikes, prices):
+            assert abs(price - call_price(100, K, 1, 0.05, 0.2)) < 1e-10
+    
+    def test_batch_edge_cases(self):
+        """Test zero time and zero volatility are priced as (discounted) intrinsic."""
+        from quant.blackscholes import call_price, call_price_batch
+        S = [110, 110, 90, 110]
+        T = [0, 1, 1, 0]
+        sigma = [0.2, 0, 0, 0]
+        prices = call_price_batch(S, 100, T, 0.05, sigma)
+        expected = [call_price(s, 100, t, 0.05, v) for s, t, v in zip(S, T, sigma)]
+        assert prices.tolist() == expected
+    
+    def test_batch_scalar_inputs(self):
+        """Test all-scalar inputs, including the masked T == 0 case, return a 0-d array."""
+        from quant.blackscholes import call_price, call_price_batch
+        price = call_price_batch(100, 100, 1, 0.05, 0.2)
+        assert price.shape == ()
+        assert abs(float(price) - call_price(100, 100, 1, 0.05, 0.2)) < 1e-10
+        assert float(call_price_batch(110, 100, 0, 0.05, 0.2)) == 10
+    
+    def test_batch_invalid_input(self):
+        """Test negative expiry and mismatched lengths are rejected."""
+        bad_T = {"S": 100, "K": [100, 110], "T": [1, -1], "r": 0.05, "sigma": 0.2}
+        response = client.post("/algorithms/black_scholes/batch", json=bad_T)
+        assert response.status_code == 400
+        mismatched = {"S": [100, 101, 102], "K": [100, 110], "T": 1, "r": 0.05, "sigma": 0.2}
+        response = client.post("/algorithms/black_scholes/batch", json=mismatched)
+        assert response.status_code == 400
+
+
 class TestGreeks:
     """Tests for Greeks calculation."""
     
@@ -129,6 +172,76 @@ class TestGreeks:
         delta_high = resp_high.json()["delta"]
         
         assert delta_high > delta_low
+    
+    def test_all_greeks_matches_individual(self):
+        """Test the fused kernel agrees with each Greek function, scalar and array."""
+        import numpy as np
+        from quant import greeks
+        cases = [(100, 100, 1, 0.05, 0.2), (110, 100, 0, 0.05, 0.2), (90, 100, 1, 0.05, 0)]
+        batched = greeks.all_greeks(*[np.array(col) for col in zip(*cases)])
+        for i, args in enumerate(cases):
+            single = greeks.all_greeks(*args)
+            for name in ("delta", "gamma", "vega", "theta", "rho"):
+                expected = getattr(greeks, name)(*args)
+                assert abs(single[name] - expected) < 1e-12
+                assert abs(batched[name][i] - expected) < 1e-12
+
+
+class TestImpliedVol:
+    """Tests for the implied volatility solver."""
+    
+    def test_round_trip(self):
+        """Test solved vols reprice the chain they came from."""
+        import numpy as np
+        from quant.blackscholes import call_price_batch
+        from quant.impliedvol import implied_vol_batch
+        rng = np.random.default_rng(7)
+        K = rng.uniform(60, 160, 2000)
+        T = rng.uniform(0.05, 2, 2000)
+        sigma = rng.uniform(0.05, 1.0, 2000)
+        prices = call_price_batch(100, K, T, 0.03, sigma)
+        vols = implied_vol_batch(prices, 100, K, T, 0.03)
+        solved = ~np.isnan(vols)
+        assert solved.mean() > 0.95
+        repriced = call_price_batch(100, K[solved], T[solved], 0.03, vols[solved])
+        assert np.max(np.abs(repriced - prices[solved])) < 1e-6
+    
+    def test_deep_in_the_money_round_trip(self):
+        """Test calls whose time value is a sliver of the price (or the price is tiny) recover their vol."""
+        import numpy as np
+        from quant.blackscholes import call_price_batch
+        from quant.impliedvol import implied_vol_batch
+        K = np.array([80.95, 36.89, 153.93])
+        T = np.array([0.485, 0.592, 0.022])
+        sigma = np.array([0.057, 0.209, 0.455])
+        prices = call_price_batch(100, K, T, 0.03, sigma)
+        vols = implied_vol_batch(prices, 100, K, T, 0.03)
+        assert np.max(np.abs(vols - sigma)) < 1e-6
+    
+    def test_endpoint(self):
+        """Test the batch endpoint, including an arbitrage-violating price."""
+        payload = {"price": [10.450583572185565, 150], "S": 100, "K": 100, "T": 1, "r": 0.05}
+        response = client.post("/algorithms/implied_vol/batch", json=payload)
+        assert response.status_code == 200
+        vols = response.json()["implied_vols"]
+        assert abs(vols[0] - 0.2) < 1e-8
+        assert vols[1] is None
+
+
+class TestNormal:
+    """Tests for the internal normal distribution functions."""
+    
+    def test_matches_scipy(self):
+        """Test scalar and vectorized CDF/PDF agree with scipy.stats.norm."""
+        import numpy as np
+        from scipy.stats import norm
+        from quant import normal
+        x = np.linspace(-12, 12, 2001)
+        assert np.max(np.abs(normal.cdf_array(x) - norm.cdf(x))) < 1e-12
+        assert np.max(np.abs(normal.pdf_array(x) - norm.pdf(x))) < 1e-12
+        for v in x[::50]:
+            assert abs(normal.cdf(v) - norm.cdf(v)) < 1e-12
+            assert abs(normal.pdf(v) - norm.pdf(v)) < 1e-12
 
 
 class TestMonteCarlo:
@@ -172,6 +285,284 @@ class TestMonteCarlo:
         
         # VaR99 should be worse than VaR95
         assert data["var_99"] < data["var_95"]
+    
+    def test_monte_carlo_seed_reproducible(self):
+        """Test a seeded simulation returns identical samples."""
+        payload = {"S": 100, "T": 1, "r": 0.05, "sigma": 0.2, "n": 1000, "seed": 42}
+        first = client.post("/algorithms/monte_carlo/simulate", json=payload).json()
+        second = client.post("/algorithms/monte_carlo/simulate", json=payload).json()
+        assert first["sample"] == second["sample"]
+        assert first["std_error"] > 0
+    
+    def test_variance_reduction(self):
+        """Test antithetic draws and the control variate shrink the standard error."""
+        from quant.montecarlo import price_option
+        digital = lambda ST: (ST > 100).astype(float)
+        plain = price_option(digital, 100, 1, 0.05, 0.2, n=20000, seed=1)
+        reduced = price_option(digital, 100, 1, 0.05, 0.2, n=20000, seed=1,
+                               antithetic=True, control_strike=100)
+        assert reduced["std_error"] < 0.6 * plain["std_error"]
+        assert abs(reduced["price"] - plain["price"]) < 4 * plain["std_error"]
+    
+    def test_antithetic_odd_paths(self):
+        """Test antithetic runs with an odd path count, serial and sharded, pair adjacent draws."""
+        import numpy as np
+        from quant.montecarlo import simulate_price, standard_error
+        for workers in (1, 4):
+            payload = {"S": 100, "T": 1, "r": 0.05, "sigma": 0.2, "n": 10001, "seed": 5,
+                       "antithetic": True, "workers": workers}
+            response = client.post("/algorithms/monte_carlo/simulate", json=payload)
+            assert response.status_code == 200
+            assert response.json()["std_error"] > 0
+        samples = simulate_price(100, 1, 0.05, 0.2, 5, seed=1, antithetic=True)
+        log_returns = np.log(samples / 100)
+        drift = 2 * (0.05 - 0.5 * 0.2**2)
+        assert np.allclose(log_returns[0:4:2] + log_returns[1:4:2], drift)
+        assert standard_error(samples, antithetic=True) == standard_error(samples[:4], antithetic=True)
+    
+    def test_monte_carlo_price_endpoint(self):
+        """Test a call priced with its own control variate matches Black-Scholes."""
+        payload = {"S": 100, "K": 100, "T": 1, "r": 0.05, "sigma": 0.2, "n": 2000, "seed": 3}
+        response = client.post("/algorithms/monte_carlo/price", json=payload)
+        assert response.status_code == 200
+        data = response.json()
+        assert abs(data["price"] - data["bs_call_price"]) < 1e-9
+
+
+class TestPathEngine:
+    """Tests for chunked multi-step path simulation."""
+    
+    def test_chunks_bounded_and_reproducible(self):
+        """Test chunk shapes, float32 mode and seeding."""
+        import numpy as np
+        from quant.paths import generate_paths
+        blocks = list(generate_paths(100, 1, 0.05, 0.2, 1000, 12, chunk_size=300, seed=5,
+                                     dtype=np.float32))
+        assert [b.shape for b in blocks] == [(300, 12)] * 3 + [(100, 12)]
+        assert all(b.dtype == np.float32 for b in blocks)
+        again = next(generate_paths(100, 1, 0.05, 0.2, 1000, 12, chunk_size=300, seed=5,
+                                    dtype=np.float32))
+        assert np.array_equal(blocks[0], again)
+    
+    def test_european_payoff_matches_black_scholes(self):
+        """Test a terminal payoff over paths prices like the closed form."""
+        import numpy as np
+        from quant.blackscholes import call_price
+        from quant.paths import price_path_payoff
+        result = price_path_payoff(lambda p: np.maximum(p[:, -1] - 100, 0.0),
+                                   100, 1, 0.05, 0.2, 50000, 4, chunk_size=7000, seed=9)
+        assert abs(result["price"] - call_price(100, 100, 1, 0.05, 0.2)) < 4 * result["std_error"]
+    
+    def test_path_endpoints(self):
+        """Test exotic pricing and path risk endpoints."""
+        from quant.blackscholes import call_price
+        vanilla = call_price(100, 100, 1, 0.05, 0.2)
+        base = {"S": 100, "T": 1, "r": 0.05, "sigma": 0.2, "n_paths": 2000, "n_steps": 50, "seed": 1}
+        asian = client.post("/algorithms/monte_carlo/paths/price", json={**base, "K": 100}).json()
+        barrier = client.post("/algorithms/monte_carlo/paths/price",
+                              json={**base, "K": 100, "payoff": "up_and_out", "barrier": 120}).json()
+        # averaging and knock-out both make the option cheaper than the vanilla call
+        assert 0 < asian["price"] < vanilla
+        assert 0 < barrier["price"] < vanilla
+        missing = client.post("/algorithms/monte_carlo/paths/price",
+                              json={**base, "K": 100, "payoff": "up_and_out"})
+        assert missing.status_code == 400
+        risk = client.post("/algorithms/monte_carlo/paths/risk", json=base).json()
+        assert risk["expected_shortfall"] <= risk["var"] < 0
+        assert 0 < risk["mean_max_drawdown"] < 1
+    
+    def test_path_request_validation(self, monkeypatch):
+        """Test out-of-range path counts are rejected and engine errors map to 400."""
+        from server.services import algorithms as algo_svc
+        base = {"S": 100, "T": 1, "r": 0.05, "sigma": 0.2}
+        for bad in ({"n_paths": 0}, {"n_steps": 0}, {"n_paths": 10**9}, {"confidence": 1.5}):
+            response = client.post("/algorithms/monte_carlo/paths/risk", json={**base, **bad})
+            assert response.status_code == 422
+        
+        def broken(*args, **kwargs):
+            raise ValueError("n_steps must be >= 1")
+        
+        monkeypatch.setattr(algo_svc, "path_risk", broken)
+        response = client.post("/algorithms/monte_carlo/paths/risk", json=base)
+        assert response.status_code == 400
+
+
+class TestParallelMonteCarlo:
+    """Tests for the SeedSequence-sharded Monte Carlo runner."""
+    
+    def test_reproducible_and_merged(self):
+        """Test identical output per (seed, workers) and exact merged moments."""
+        import numpy as np
+        from quant.parallel import parallel_simulate, shard_sizes
+        assert shard_sizes(10, 3) == [4, 3, 3]
+        first = parallel_simulate(100, 1, 0.05, 0.2, 30001, seed=4, workers=3)
+        second = parallel_simulate(100, 1, 0.05, 0.2, 30001, seed=4, workers=3)
+        assert np.array_equal(first["samples"], second["samples"])
+        assert len(first["samples"]) == 30001
+        assert abs(first["mean"] - first["samples"].mean()) < 1e-9
+        assert abs(first["std"] - first["samples"].std()) < 1e-9
+        other = parallel_simulate(100, 1, 0.05, 0.2, 30001, seed=4, workers=2)
+        assert not np.array_equal(first["samples"], other["samples"])
+    
+    def test_antithetic_shards_keep_pairs(self):
+        """Test sharded antithetic runs keep whole pairs and match the serial std_error."""
+        import numpy as np
+        from quant.montecarlo import simulate_price, standard_error
+        from quant.parallel import parallel_simulate
+        sharded = parallel_simulate(100, 1, 0.05, 0.2, 200001, seed=6, workers=4, antithetic=True)["samples"]
+        log_returns = np.log(sharded[:-1] / 100)
+        assert np.allclose(log_returns[0::2] + log_returns[1::2], 2 * (0.05 - 0.5 * 0.2**2))
+        serial = simulate_price(100, 1, 0.05, 0.2, 200001, seed=6, antithetic=True)
+        assert standard_error(sharded, antithetic=True) == pytest.approx(
+            standard_error(serial, antithetic=True), rel=0.05)
+        assert standard_error(sharded, antithetic=True) < 0.5 * standard_error(sharded)
+    
+    def test_endpoint_with_workers(self):
+        """Test a pinned worker count gives reproducible VaR."""
+        from server.services.algorithms import simulation_cache
+        payload = {"S": 100, "T": 1, "r": 0.05, "sigma": 0.2, "n": 4000, "seed": 2, "workers": 4}
+        first = client.post("/algorithms/monte_carlo/var", json=payload).json()
+        simulation_cache.clear()
+        second = client.post("/algorithms/monte_carlo/var", json=payload).json()
+        assert first == second
+
+
+class TestRiskMeasures:
+    """Tests for single-pass VaR/ES and the streaming quantile sketch."""
+    
+    def test_var_es_matches_percentile(self):
+        """Test the partition-based VaR/ES equals the sort-and-mask definition, ties included."""
+        import numpy as np
+        from quant import risk
+        rng = np.random.default_rng(0)
+        for returns in (rng.standard_normal(10001), np.round(rng.standard_normal(5000), 1)):
+            levels = risk.var_es(returns, (0.9, 0.95, 0.99))
+            for c, (var, es) in levels.items():
+                expected_var = np.percentile(returns, (1 - c) * 100)
+                assert abs(var - expected_var) < 1e-12
+                assert abs(es - returns[returns <= expected_var].mean()) < 1e-12
+    
+    def test_digest_merges_close_to_exact(self):
+        """Test digests built per chunk and merged track exact tail quantiles."""
+        import numpy as np
+        from quant.sketch import TDigest
+        rng = np.random.default_rng(1)
+        values = rng.standard_normal(200000)
+        merged = TDigest()
+        for chunk in np.array_split(values, 7):
+            merged.merge(TDigest().update(chunk))
+        assert merged.count == values.size
+        for q in (0.01, 0.05, 0.5):
+            exact = np.percentile(values, q * 100)
+            assert abs(merged.quantile(q) - exact) < 0.01
+            assert abs(merged.tail_mean(q) - values[values <= exact].mean()) < 0.01
+
+
+class TestSimulationCache:
+    """Tests for the shared Monte Carlo simulation cache."""
+    
+    def test_views_share_one_simulation(self):
+        """Test the four Monte Carlo views reuse a single cached simulation."""
+        from server.services.algorithms import simulation_cache
+        simulation_cache.clear()
+        payload = {"S": 100, "T": 1, "r": 0.05, "sigma": 0.2, "n": 2000, "seed": 11}
+        before = client.get("/algorithms/monte_carlo/cache").json()
+        for view in ("simulate", "var", "distribution", "plot"):
+            assert client.post(f"/algorithms/monte_carlo/{view}", json=payload).status_code == 200
+        after = client.get("/algorithms/monte_carlo/cache").json()
+        assert after["misses"] - before["misses"] == 1
+        assert after["hits"] - before["hits"] == 3
+        assert after["entries"] == 1
+    
+    def test_concurrent_misses_compute_once(self):
+        """Test concurrent misses on one key share a single computation."""
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from server.utils.cache import LRUCache
+        cache = LRUCache(max_bytes=10_000)
+        calls = []
+        lock = threading.Lock()
+        
+        def compute():
+            with lock:
+                calls.append(1)
+            time.sleep(0.05)
+            return b"simulation"
+        
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda _: cache.get_or_compute("k", compute), range(8)))
+        assert results == [b"simulation"] * 8
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] >= 1
+    
+    def test_byte_bound_and_ttl(self):
+        """Test LRU eviction by size and expiry by TTL."""
+        import time
+        import numpy as np
+        from server.utils.cache import LRUCache
+        cache = LRUCache(max_bytes=2 * 800)
+        cache.set("a", np.zeros(100))
+        cache.set("b", np.zeros(100))
+        cache.get("a")
+        cache.set("c", np.zeros(100))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None and cache.get("c") is not None
+        assert cache.stats()["evictions"] == 1
+        
+        short = LRUCache(max_bytes=10_000, ttl=0.01)
+        short.set("x", np.zeros(10))
+        time.sleep(0.02)
+        assert short.get("x") is None
+        assert short.stats()["expirations"] == 1
+
+
+class TestComputeExecutor:
+    """Tests for the CPU-bound work executor."""
+    
+    def test_timeout_and_saturation(self):
+        """Test jobs past their timeout and beyond the in-flight limit are rejected."""
+        import asyncio
+        import time
+        from server.services.compute import ComputeExecutor, ComputeBusy, ComputeTimeout
+        executor = ComputeExecutor("test", max_workers=1, max_inflight=1, timeout=0.05)
+        
+        async def scenario():
+            with pytest.raises(ComputeTimeout):
+                await executor.run(time.sleep, 0.3)
+            # the abandoned job still holds the only slot
+            with pytest.raises(ComputeBusy):
+                await executor.run(sum, [1, 2])
+            await asyncio.sleep(0.4)
+            with pytest.raises(TypeError):
+                await executor.run(sum, [1, "a"])
+            return await executor.run(sum, [1, 2])
+        
+        assert asyncio.run(scenario()) == 3
+        stats = executor.stats()
+        assert stats["timed_out"] == 1 and stats["rejected"] == 1
+        # the timed-out job is not also counted as completed
+        assert stats["completed"] == 1 and stats["failed"] == 1
+        executor.shutdown()
+    
+    def test_queued_timeouts_are_not_failures(self):
+        """Test jobs that time out while still queued count as timed out only."""
+        import asyncio
+        import time
+        from server.services.compute import ComputeExecutor, ComputeTimeout
+        executor = ComputeExecutor("test", max_workers=1, max_inflight=3, timeout=0.05)
+        
+        async def scenario():
+            results = await asyncio.gather(*(executor.run(time.sleep, 0.2) for _ in range(3)),
+                                           return_exceptions=True)
+            assert all(isinstance(result, ComputeTimeout) for result in results)
+            await asyncio.sleep(0.3)
+        
+        asyncio.run(scenario())
+        stats = executor.stats()
+        assert stats["timed_out"] == 3 and stats["failed"] == 0 and stats["completed"] == 0
+        assert stats["inflight"] == 0
+        executor.shutdown()
 
 
 class TestRoot:
@@ -189,3 +580,168 @@ class TestRoot:
         """Test API documentation endpoint."""
         response = client.get("/docs")
         assert response.status_code == 200
+
+
+class TestIndicators:
+    """Tests for the vectorized technical indicators."""
+    
+    def _prices(self):
+        import numpy as np
+        rng = np.random.default_rng(0)
+        return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 300)))
+    
+    def test_sma_and_bollinger_match_rolling_windows(self):
+        """Test cumulative-sum windows match direct window statistics."""
+        import numpy as np
+        from quant import indicators
+        x = self._prices()
+        windows = np.lib.stride_tricks.sliding_window_view(x, 20)
+        sma = indicators.sma(x, 20)
+        bands = indicators.bollinger(x, 20, 2.0)
+        assert np.isnan(sma[:19]).all()
+        assert np.allclose(sma[19:], windows.mean(axis=1))
+        assert np.allclose(bands["upper"][19:], windows.mean(axis=1) + 2 * windows.std(axis=1))
+    
+    def test_ema_and_rsi_match_recursions(self):
+        """Test the IIR filters reproduce the textbook recursions."""
+        import numpy as np
+        from quant import indicators
+        x = self._prices()
+        alpha, y = 2 / 11, x[:10].mean()
+        expected = [y]
+        for v in x[10:]:
+            y = alpha * v + (1 - alpha) * y
+            expected.append(y)
+        assert np.allclose(indicators.ema(x, 10)[9:], expected)
+        
+        change = np.diff(x)
+        gain, loss = np.maximum(change[:14], 0).mean(), np.maximum(-change[:14], 0).mean()
+        for c in change[14:]:
+            gain = (gain * 13 + max(c, 0)) / 14
+            loss = (loss * 13 + max(-c, 0)) / 14
+        rsi = indicators.rsi(x, 14)
+        assert np.isnan(rsi[:14]).all()
+        assert rsi[-1] == pytest.approx(100 - 100 / (1 + gain / loss))
+        assert indicators.rsi(np.linspace(1, 2, 30), 14)[-1] == 100.0
+    
+    def test_macd_and_atr(self):
+        """Test MACD components align and ATR is positive after warm-up."""
+        import numpy as np
+        from quant import indicators
+        x = self._prices()
+        result = indicators.macd(x, 12, 26, 9)
+        assert np.allclose(result["hist"][40:], result["macd"][40:] - result["signal"][40:])
+        assert np.isnan(result["signal"][:33]).all() and not np.isnan(result["signal"][33:]).any()
+        atr = indicators.atr(x * 1.01, x * 0.99, x, 14)
+        assert np.isnan(atr[:13]).all() and (atr[13:] > 0).all()
+        with pytest.raises(ValueError):
+            indicators.macd(x, 26, 12, 9)
+    
+    def test_indicators_endpoint(self):
+        """Test the endpoint returns aligned, cached series."""
+        from server.services.indicators import indicator_cache
+        response = client.get("/market/indicators/AAPL?period=6mo&sma=10&bollinger=20,2&atr=14")
+        assert response.status_code == 200
+        data = response.json()
+        n = len(data["date"])
+        assert {"sma", "bb_upper", "bb_lower", "atr"} <= set(data)
+        assert all(len(data[k]) == n for k in ("sma", "bb_middle", "atr"))
+        assert data["sma"][8] is None and data["sma"][9] is not None
+        hits = indicator_cache.hits
+        client.get("/market/indicators/AAPL?period=6mo&sma=10&bollinger=20,2&atr=14")
+        assert indicator_cache.hits == hits + 1
+        defaults = client.get("/market/indicators/AAPL").json()
+        assert {"sma", "ema", "rsi", "macd", "macd_signal"} <= set(defaults)
+        assert client.get("/market/indicators/AAPL?macd=26,12,9").status_code == 400
+    
+    def test_history_fetched_outside_compute_pool(self, monkeypatch):
+        """Test history is awaited via market_client and only the kernels hit the compute pool."""
+        import numpy as np
+        from server.services import indicators, market_client
+        fetched, jobs = [], []
+        
+        async def history_columns(symbol, period="1y", timeout=None):
+            fetched.append(symbol)
+            return {"date": np.arange(30).astype("datetime64[D]"), "close": np.linspace(1, 2, 30)}
+        
+        async def run_numpy(fn, *args, **kwargs):
+            jobs.append(fn)
+            return fn(*args, **kwargs)
+        
+        monkeypatch.setattr(market_client, "history_columns", history_columns)
+        monkeypatch.setattr(indicators.executors, "run_numpy", run_numpy)
+        indicators.indicator_cache.clear()
+        data = client.get("/market/indicators/FAKE?sma=5").json()
+        assert fetched == ["FAKE"] and jobs == [indicators.series]
+        assert len(data["sma"]) == 30
+
+
+class TestChartPayloads:
+    """Tests for the plotly-free chart payload builders."""
+    
+    def test_lttb_keeps_endpoints_and_extremes(self):
+        """Test LTTB returns sorted indices including the ends and the global peak."""
+        import numpy as np
+        from server.utils.plotting import lttb
+        y = np.sin(np.linspace(0, 20, 100_000))
+        y[54_321] = 5.0
+        idx = lttb(y, 500)
+        assert len(idx) == 500
+        assert idx[0] == 0 and idx[-1] == len(y) - 1
+        assert (np.diff(idx) > 0).all()
+        assert 54_321 in idx
+        assert list(lttb(y[:10], 500)) == list(range(10))
+    
+    def test_histogram_payload_is_prebinned(self):
+        """Test the distribution payload carries counts, not samples."""
+        import numpy as np
+        from server.utils.plotting import histogram_payload
+        values = np.random.default_rng(0).normal(size=1_000_000)
+        trace = histogram_payload(values)["data"][0]
+        assert trace["type"] == "bar"
+        assert len(trace["x"]) == len(trace["y"]) == 50
+        assert trace["y"].sum() == 1_000_000
+    
+    def test_plot_endpoint_small_and_cached(self):
+        """Test a large simulation plot ships kilobytes and is rendered once."""
+        from server.services.algorithms import chart_cache
+        body = {"S": 100, "T": 1, "r": 0.05, "sigma": 0.2, "n": 200_000, "seed": 11}
+        first = client.post("/algorithms/monte_carlo/plot", json=body)
+        hits = chart_cache.hits
+        second = client.post("/algorithms/monte_carlo/plot", json=body)
+        assert first.status_code == 200
+        assert len(first.content) < 100_000
+        assert first.json() == second.json()
+        assert len(first.json()["data"][0]["y"]) == 2000
+        assert first.json()["points"] == 200_000
+        assert chart_cache.hits == hits + 1
+        dist = client.post("/algorithms/monte_carlo/distribution", json=body).json()
+        assert sum(dist["data"][0]["y"]) == 200_000
+    
+    def test_chart_format_negotiation(self):
+        """Test chart routes honour ?format= and the Arrow Accept header."""
+        from server.utils import responses
+        body = {"S": 100, "T": 1, "r": 0.05, "sigma": 0.2, "n": 5000, "seed": 3}
+        columns = client.post("/algorithms/monte_carlo/distribution?format=columns", json=body).json()
+        assert set(columns) == {"x", "y", "width"} and sum(columns["y"]) == 5000
+        plot = client.post("/algorithms/monte_carlo/plot?format=columns", json=body).json()
+        assert set(plot) == {"x", "y"} and len(plot["y"]) == 2000
+        arrow = client.post("/algorithms/monte_carlo/plot", json=body,
+                            headers={"Accept": responses.ARROW_MEDIA_TYPE})
+        if responses.pyarrow is None:
+            assert arrow.status_code == 406
+        else:
+            assert arrow.headers["content-type"] == responses.ARROW_MEDIA_TYPE
+        assert client.post("/algorithms/monte_carlo/plot?format=xml", json=body).status_code == 400
+    
+    def test_candlestick_chart_endpoint(self):
+        """Test the candlestick payload is built from OHLC columns and honours ?format=."""
+        response = client.get("/market/history/AAPL/chart?period=3mo")
+        assert response.status_code == 200
+        trace = response.json()["data"][0]
+        assert trace["type"] == "candlestick"
+        assert len(trace["x"]) == len(trace["close"]) > 0
+        columns = client.get("/market/history/AAPL/chart?period=3mo&format=columns").json()
+        assert set(columns) == {"x", "open", "high", "low", "close"}
+        assert columns["close"] == trace["close"]
+        assert client.get("/market/history/AAPL/chart?format=xml").status_code == 400
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 from tests.conftest import client
 
@@ -55,3 +56,519 @@ class TestStockHistory:
             assert response.status_code == 200
             data = response.json()
             assert data["period"] == period
+
+
+class TestProviders:
+    """Tests for the pluggable market data providers."""
+    
+    def test_local_provider_deterministic(self):
+        """Test synthetic history is reproducible and well-formed."""
+        from server.services.providers import LocalProvider
+        first = LocalProvider(seed=3).history("MSFT", period="6mo")
+        second = LocalProvider(seed=3).history("MSFT", period="6mo")
+        assert first.equals(second)
+        assert list(first.columns) == ["Open", "High", "Low", "Close", "Volume"]
+        assert (first["High"] >= first[["Open", "Close"]].max(axis=1)).all()
+        assert (first["Low"] <= first[["Open", "Close"]].min(axis=1)).all()
+    
+    def test_fixture_and_latency(self, tmp_path):
+        """Test CSV fixtures take precedence and latency is injected."""
+        import time
+        from server.services.providers import LocalProvider
+        (tmp_path / "FIX.csv").write_text(
+            "Date,Open,High,Low,Close,Volume\n"
+            "2024-01-02,10,11,9,10.5,100\n"
+            "2024-01-03,10.5,12,10,11.5,200\n"
+        )
+        provider = LocalProvider(fixtures_dir=str(tmp_path), latency_ms=20)
+        start = time.perf_counter()
+        data = provider.history("FIX", period="max")
+        assert time.perf_counter() - start >= 0.02
+        assert data["Close"].tolist() == [10.5, 11.5]
+        assert provider.history("FIX", period="1d")["Close"].tolist() == [11.5]
+    
+    def test_stock_info(self):
+        """Test info is routed through the provider."""
+        response = client.get("/market/info/AAPL")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["symbol"] == "AAPL"
+        assert data["52_week_low"] <= data["52_week_high"]
+
+
+class TestQuoteHub:
+    """Tests for the shared quote fan-out hub."""
+    
+    def test_fetches_once_per_symbol_for_many_clients(self):
+        """Test upstream load is O(symbols), not O(clients x symbols)."""
+        import asyncio
+        from server.services.quote_hub import QuoteHub
+        calls = []
+        
+        def fetch(symbols):
+            calls.append(list(symbols))
+            return {s: 100.0 for s in symbols}
+        
+        async def scenario():
+            hub = QuoteHub(fetch=fetch, interval=60)
+            subs = [hub.subscribe(["AAPL", "MSFT"]) for _ in range(50)]
+            subs.append(hub.subscribe(["AAPL"]))
+            snapshot = await subs[0].get(timeout=1)
+            single = await subs[-1].get(timeout=1)
+            await hub.stop()
+            return snapshot, single
+        
+        snapshot, single = asyncio.run(scenario())
+        assert calls == [["AAPL", "MSFT"]]
+        assert snapshot == {"AAPL": 100.0, "MSFT": 100.0}
+        assert single == {"AAPL": 100.0}
+    
+    def test_slow_consumer_drops_stale_ticks(self):
+        """Test a full subscriber queue keeps only the newest snapshots."""
+        import asyncio
+        from server.services.quote_hub import QuoteHub
+        prices = iter(range(1, 100))
+        
+        async def scenario():
+            hub = QuoteHub(fetch=lambda symbols: {"AAPL": float(next(prices))}, interval=60, queue_size=2)
+            sub = hub.subscribe(["AAPL"])
+            await hub.stop()
+            for _ in range(5):
+                await hub.poll_once()
+            return [(await sub.get(timeout=1))["AAPL"] for _ in range(2)], sub.dropped
+        
+        received, dropped = asyncio.run(scenario())
+        assert received == [4.0, 5.0]
+        assert dropped == 3
+
+
+class TestBatchQuotes:
+    """Tests for batched quote fetching and in-flight coalescing."""
+    
+    def test_fetch_prices_single_round_trip(self):
+        """Test many symbols are fetched with one provider call."""
+        from server.services import market_data, providers
+        calls = []
+        
+        class CountingProvider(providers.LocalProvider):
+            def prices(self, symbols):
+                calls.append(list(symbols))
+                return super().prices(symbols)
+        
+        previous = providers.set_provider(CountingProvider())
+        market_data.clear_caches()
+        try:
+            symbols = [f"SYM{i}" for i in range(40)]
+            prices = market_data.fetch_prices(symbols)
+        finally:
+            providers.set_provider(previous)
+        assert len(calls) == 1
+        assert set(prices) == set(symbols)
+        assert all(p > 0 for p in prices.values())
+    
+    def test_singleflight_shares_inflight_call(self):
+        """Test concurrent callers for the same key share one call."""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from server.utils.singleflight import SingleFlight
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+        
+        def fetch_many(keys):
+            calls.append(list(keys))
+            started.set()
+            release.wait(5)
+            return {k: k.lower() for k in keys}
+        
+        with ThreadPoolExecutor(4) as pool:
+            first = pool.submit(flights.do_many, ["AAPL", "MSFT"], fetch_many)
+            started.wait(5)
+            others = [pool.submit(flights.do_many, ["AAPL"], fetch_many) for _ in range(3)]
+            while flights.shared < 3:
+                threading.Event().wait(0.01)
+            release.set()
+            results = [first.result()] + [f.result() for f in others]
+        assert calls == [["AAPL", "MSFT"]]
+        assert results[0] == {"AAPL": "aapl", "MSFT": "msft"}
+        assert all(r == {"AAPL": "aapl"} for r in results[1:])
+    
+    def test_singleflight_propagates_errors(self):
+        """Test a failed fetch raises for the caller and frees the key."""
+        from server.utils.singleflight import SingleFlight
+        flights = SingleFlight()
+        
+        def boom(keys):
+            raise RuntimeError("upstream down")
+        
+        with pytest.raises(RuntimeError):
+            flights.do("AAPL", lambda: boom(None))
+        assert flights.do("AAPL", lambda: 1.0) == 1.0
+
+
+class TestMarketCache:
+    """Tests for the tiered market data cache."""
+    
+    def _counting_provider(self, calls):
+        from server.services import providers
+        
+        class CountingProvider(providers.LocalProvider):
+            def history(self, symbol, period="1y", start=None):
+                calls.append((period, start))
+                return super().history(symbol, period=period, start=start)
+            
+            def info(self, symbol):
+                calls.append("info")
+                return super().info(symbol)
+        
+        return CountingProvider()
+    
+    def _swap(self, provider):
+        from server.services import market_data, providers
+        previous = providers.set_provider(provider)
+        market_data.clear_caches()
+        return previous
+    
+    def test_repeat_views_served_from_memory(self):
+        """Test info and narrower history periods hit the cache."""
+        from server.services import market_data
+        calls = []
+        previous = self._swap(self._counting_provider(calls))
+        try:
+            year = market_data.fetch_historical_frame("CACHE", "1y")
+            month = market_data.fetch_historical_frame("CACHE", "1mo")
+            first = client.get("/market/info/CACHE").json()
+            second = client.get("/market/info/CACHE").json()
+        finally:
+            self._swap(previous)
+        assert calls == [("1y", None), "info"]
+        assert month.index[0] >= year.index[0] and month.index[-1] == year.index[-1]
+        assert 15 <= len(month) <= 24
+        assert first == second
+    
+    def test_stale_history_refreshed_incrementally(self):
+        """Test stale history is served immediately and extended in the background."""
+        import time
+        from server.services import market_data
+        from server.utils.cache import TieredCache
+        calls = []
+        previous = self._swap(self._counting_provider(calls))
+        original = market_data.history_cache
+        market_data.history_cache = TieredCache("history", 1 << 24, ttl=0.0, stale_ttl=60)
+        try:
+            first = market_data.fetch_historical_frame("SWR", "6mo")
+            again = market_data.fetch_historical_frame("SWR", "6mo")
+            deadline = time.time() + 5
+            while market_data.history_cache.refreshes == 0 and time.time() < deadline:
+                time.sleep(0.01)
+            stats = market_data.history_cache.stats()
+        finally:
+            market_data.history_cache = original
+            self._swap(previous)
+        assert again.equals(first)
+        assert calls[0] == ("6mo", None)
+        assert calls[1][1] == first.index[-1].date()
+        assert stats["stale_hits"] == 1 and stats["refreshes"] == 1
+    
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """Test a new cache over the same disk store reuses fetched values."""
+        from server.utils.cache import DiskStore, TieredCache
+        loads = []
+        path = str(tmp_path / "cache.sqlite3")
+        TieredCache("info", 1 << 20, ttl=60, disk=DiskStore(path)).get("AAPL", lambda: loads.append(1) or {"pe": 30})
+        restarted = TieredCache("info", 1 << 20, ttl=60, disk=DiskStore(path))
+        assert restarted.get("AAPL", lambda: loads.append(1) or None) == {"pe": 30}
+        assert len(loads) == 1
+        assert restarted.stats()["disk_hits"] == 1
+    
+    def test_cache_stats_endpoint(self):
+        """Test the cache stats endpoint reports every tier."""
+        client.get("/market/info/AAPL")
+        client.get("/market/info/AAPL")
+        response = client.get("/market/cache")
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data) >= {"quotes", "info", "dividends", "history"}
+        assert data["info"]["hits"] >= 1
+
+
+class TestOHLCStore:
+    """Tests for the columnar on-disk OHLC store."""
+    
+    def test_append_and_slice(self, tmp_path):
+        """Test bars are appended after the last stored date and periods slice from disk."""
+        from server.services.ohlc_store import OHLCStore
+        from server.services.providers import LocalProvider
+        full = LocalProvider(seed=1).history("STORE", period="2y")
+        store = OHLCStore(str(tmp_path))
+        store.write("STORE", full.iloc[:-10], replace=True)
+        assert store.last_date("STORE") == full.index[-11].date()
+        # the refresh re-sends the last stored bar, revised, plus the new ones
+        update = full.iloc[-11:].copy()
+        update.iloc[0, update.columns.get_loc("Close")] += 1.0
+        store.write("STORE", update)
+        stored = store.frame("STORE")
+        assert len(stored) == len(full)
+        assert stored["Close"].iloc[-11] == full["Close"].iloc[-11] + 1.0
+        assert stored["Volume"].tolist() == full["Volume"].tolist()
+        month = store.columns("STORE", "1mo")
+        assert isinstance(month["close"], np.memmap)
+        assert month["date"][-1] == np.datetime64(full.index[-1].date())
+        assert len(month["close"]) == len(LocalProvider(seed=1).history("STORE", period="1mo"))
+    
+    def test_history_reads_from_store(self, tmp_path):
+        """Test only the first request downloads; later periods and refreshes are incremental."""
+        from server.services import market_data, providers
+        from server.services.ohlc_store import OHLCStore
+        calls = []
+        
+        class CountingProvider(providers.LocalProvider):
+            def history(self, symbol, period="1y", start=None):
+                calls.append((period, start))
+                return super().history(symbol, period=period, start=start)
+        
+        previous = providers.set_provider(CountingProvider())
+        original = market_data.ohlc_store
+        market_data.ohlc_store = OHLCStore(str(tmp_path))
+        try:
+            year = market_data.fetch_historical_frame("DISK", "1y")
+            month = market_data.fetch_historical_frame("DISK", "1mo")
+            market_data.ohlc_store._write_meta("DISK", {"start": None, "refreshed_at": 0})
+            market_data.fetch_historical_frame("DISK", "5y")
+        finally:
+            market_data.ohlc_store = original
+            providers.set_provider(previous)
+        assert calls[0] == ("max", None)
+        assert calls[1][1] == year.index[-1].date()
+        assert len(calls) == 2
+        assert month.index[-1] == year.index[-1] and len(month) < len(year)
+
+
+class TestTickArchive:
+    """Tests for the StockSnapshot tick archive."""
+    
+    @pytest.fixture
+    def tick_engine(self, tmp_path):
+        from sqlalchemy import create_engine
+        from server.models import database
+        engine = create_engine(f"sqlite:///{tmp_path / 'ticks.db'}")
+        database.Base.metadata.create_all(bind=engine)
+        yield engine
+        engine.dispose()
+    
+    def test_batched_writes_and_range_query(self, tick_engine):
+        """Test queued ticks are written by the background thread and read back by range."""
+        import time
+        from datetime import datetime, timedelta
+        from sqlalchemy.orm import Session
+        from server.services.tick_archive import TickArchive, query_ticks
+        archive = TickArchive(engine=tick_engine, flush_interval=0.01)
+        t0 = datetime(2024, 1, 2, 15, 30)
+        for i in range(10):
+            archive.record({"AAPL": 100.0 + i, "MSFT": 300.0, "BAD": None}, t0 + timedelta(seconds=i))
+        deadline = time.time() + 5
+        while archive.written < 20 and time.time() < deadline:
+            time.sleep(0.01)
+        archive.stop()
+        with Session(tick_engine) as db:
+            rows = query_ticks(db, "AAPL", t0 + timedelta(seconds=2), t0 + timedelta(seconds=5))
+        assert archive.stats()["written"] == 20
+        assert [price for _, price in rows] == [102.0, 103.0, 104.0, 105.0]
+    
+    def test_downsample_and_prune(self, tick_engine):
+        """Test old ticks are thinned to one per bucket and expired ticks deleted."""
+        from datetime import datetime, timedelta
+        from sqlalchemy.orm import Session
+        from server.services.tick_archive import TickArchive, query_ticks
+        archive = TickArchive(engine=tick_engine)
+        t0 = datetime(2024, 1, 2, 15, 30)
+        for i in range(180):
+            archive.record({"AAPL": float(i)}, t0 + timedelta(seconds=i))
+        archive.flush()
+        assert archive.downsample(t0 + timedelta(seconds=120), bucket_seconds=60) == 118
+        with Session(tick_engine) as db:
+            prices = [price for _, price in query_ticks(db, "AAPL")]
+        assert prices[:2] == [59.0, 119.0] and len(prices) == 62
+        assert archive.prune(t0 + timedelta(seconds=150)) == 32
+    
+    def test_downsample_resumes_from_last_cutoff(self, tick_engine):
+        """Test repeated passes read only newly aged ticks and thin like a single pass."""
+        from datetime import datetime, timedelta
+        from sqlalchemy.orm import Session
+        from server.services.tick_archive import TickArchive, query_ticks
+        archive = TickArchive(engine=tick_engine)
+        t0 = datetime(2024, 1, 2, 15, 30)
+        for i in range(240):
+            archive.record({"AAPL": float(i)}, t0 + timedelta(seconds=i))
+        archive.flush()
+        assert archive.downsample(t0 + timedelta(seconds=90), bucket_seconds=60) == 59 + 29
+        read = []
+        thin = archive._thin
+        archive._thin = lambda conn, rows, bucket_seconds: read.append(len(rows)) or thin(conn, rows, bucket_seconds)
+        # resumes at the 60s bucket: its survivor plus ticks 90-149
+        assert archive.downsample(t0 + timedelta(seconds=150), bucket_seconds=60) == 30 + 29
+        assert read == [61]
+        with Session(tick_engine) as db:
+            prices = [price for _, price in query_ticks(db, "AAPL")]
+        assert prices[:3] == [59.0, 119.0, 149.0] and len(prices) == 240 - 147
+        assert archive.downsample(t0 + timedelta(seconds=150), bucket_seconds=60) == 0
+    
+    def test_migrate_replaces_symbol_index(self, tick_engine):
+        """Test startup migration swaps the old symbol index for the (symbol, timestamp) one."""
+        from sqlalchemy import inspect, text
+        from server.models import database
+        with tick_engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_stock_snapshots_symbol_timestamp"))
+            conn.execute(text("CREATE INDEX ix_stock_snapshots_symbol ON stock_snapshots (symbol)"))
+        database.migrate(tick_engine)
+        database.migrate(tick_engine)
+        names = {index["name"] for index in inspect(tick_engine).get_indexes("stock_snapshots")}
+        assert names == {"ix_stock_snapshots_symbol_timestamp", "ix_stock_snapshots_timestamp"}
+    
+    def test_ticks_endpoint(self, tick_engine):
+        """Test the range endpoint reads ticks through the database dependency."""
+        from datetime import datetime, timedelta
+        from sqlalchemy.orm import sessionmaker
+        from server.main import app
+        from server.models import database
+        from server.services.tick_archive import TickArchive
+        archive = TickArchive(engine=tick_engine)
+        t0 = datetime(2024, 1, 2, 15, 30)
+        archive.record({"AAPL": 1.0}, t0)
+        archive.record({"AAPL": 2.0}, t0 + timedelta(minutes=1))
+        archive.flush()
+        Session = sessionmaker(bind=tick_engine)
+        
+        def tick_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+        
+        previous = app.dependency_overrides.get(database.get_db)
+        app.dependency_overrides[database.get_db] = tick_db
+        try:
+            response = client.get("/market/ticks/aapl", params={"from": "2024-01-02T15:30:30"})
+        finally:
+            app.dependency_overrides[database.get_db] = previous
+        assert response.status_code == 200
+        assert response.json() == {
+            "symbol": "AAPL",
+            "ticks": [{"timestamp": "2024-01-02T15:31:00", "price": 2.0}],
+        }
+
+
+class TestHistoryFormats:
+    """Tests for content negotiation on the history endpoints."""
+    
+    def test_columns_matches_records(self):
+        """Test the column-oriented shape carries the same bars as records."""
+        records = client.get("/market/history/AAPL?period=3mo").json()["data"]
+        response = client.get("/market/history/AAPL?period=3mo&format=columns")
+        assert response.status_code == 200
+        columns = response.json()["data"]
+        assert set(columns) == {"date", "open", "high", "low", "close", "volume"}
+        assert len(columns["close"]) == len(records)
+        assert columns["date"][0] == records[0]["Date"][:10]
+        assert columns["close"] == [bar["Close"] for bar in records]
+        assert columns["volume"] == [bar["Volume"] for bar in records]
+    
+    def test_gzip_when_accepted(self):
+        """Test large responses are compressed only when the client accepts it."""
+        compressed = client.get("/market/history/AAPL?period=1y", headers={"Accept-Encoding": "gzip"})
+        plain = client.get("/market/history/AAPL?period=1y", headers={"Accept-Encoding": "identity"})
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert "content-encoding" not in plain.headers
+        assert compressed.json() == plain.json()
+    
+    def test_arrow_and_unknown_formats(self):
+        """Test Arrow is negotiated via Accept and unknown formats are rejected."""
+        from server.utils import responses
+        response = client.get("/market/history/AAPL?period=1mo",
+                              headers={"Accept": responses.ARROW_MEDIA_TYPE})
+        if responses.pyarrow is None:
+            assert response.status_code == 406
+        else:
+            assert response.headers["content-type"] == responses.ARROW_MEDIA_TYPE
+            table = responses.pyarrow.ipc.open_stream(response.content).read_all()
+            assert table.column_names == ["date", "open", "high", "low", "close", "volume"]
+        assert client.get("/market/history/AAPL?format=xml").status_code == 400
+    
+    def test_dumps_handles_numpy_and_nan(self):
+        """Test the JSON encoder serializes arrays and maps NaN to null."""
+        import json
+        from server.utils.responses import dumps
+        payload = {"a": np.array([1.5, np.nan]), "b": np.int64(3), "c": "NaN"}
+        assert json.loads(dumps(payload)) == {"a": [1.5, None], "b": 3, "c": "NaN"}
+
+
+class TestResilience:
+    """Tests for upstream retries, circuit breaking and the async client."""
+    
+    def test_retry_with_backoff_then_success(self):
+        """Test transient failures are retried and counted."""
+        from server.utils.resilience import Upstream
+        attempts = []
+        
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("reset")
+            return 42
+        
+        upstream = Upstream("test", retries=2, backoff=0.001)
+        assert upstream.call(flaky) == 42
+        assert upstream.stats()["retried"] == 2
+        assert upstream.breaker.state == "closed"
+    
+    def test_breaker_opens_and_half_opens(self):
+        """Test the breaker fails fast when open and recovers after a trial call."""
+        import time
+        from server.utils.resilience import CircuitBreaker, CircuitOpen, Upstream
+        upstream = Upstream("test", retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.05))
+        
+        def down():
+            raise TimeoutError("upstream down")
+        
+        for _ in range(2):
+            with pytest.raises(TimeoutError):
+                upstream.call(down)
+        assert upstream.breaker.state == "open"
+        with pytest.raises(CircuitOpen):
+            upstream.call(lambda: 1)
+        time.sleep(0.06)
+        assert upstream.breaker.state == "half_open"
+        assert upstream.call(lambda: 1) == 1
+        assert upstream.breaker.state == "closed"
+        assert upstream.stats()["rejected"] == 1
+    
+    def test_async_client_does_not_block_loop(self):
+        """Test slow upstream calls leave the event loop free and honour the timeout."""
+        import asyncio
+        import time
+        from server.services import market_client
+        
+        def slow(delay):
+            time.sleep(delay)
+            return delay
+        
+        async def scenario():
+            ticks = 0
+            
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+            
+            task = asyncio.create_task(ticker())
+            result = await market_client.run(slow, 0.2)
+            with pytest.raises(market_client.MarketTimeout):
+                await market_client.run(slow, 0.5, timeout=0.05)
+            task.cancel()
+            return result, ticks
+        
+        result, ticks = asyncio.run(scenario())
+        assert result == 0.2
+        assert ticks >= 10
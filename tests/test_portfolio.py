@@ -111,3 +111,349 @@ class TestPortfolio:
         # Verify total_cost calculation
         expected_cost = (10 * 150) + (5 * 300)  # 3000
         assert data["total_cost"] == expected_cost
+
+
+class TestAuthPrincipal:
+    """Token verification served from the principal cache."""
+
+    def test_cached_principal_skips_the_database(self, temp_db):
+        """A repeated token is answered from the cache without SQL."""
+        from server.routers import auth
+        db, user, statements = temp_db
+        token = auth.create_user_token(user)
+        first = auth.get_principal(token, db)
+        assert first == (user.id, "holder", True)
+        statements.clear()
+        assert auth.get_principal(f"Bearer {token}", db) == first
+        assert statements == []
+
+    def test_profile_update_and_deactivation_invalidate(self, temp_db):
+        """Renaming or deactivating a user stops its cached principals at once."""
+        from fastapi import HTTPException
+        from server.routers import auth
+        db, user, statements = temp_db
+        token = auth.create_user_token(user)
+        auth.get_principal(token, db)
+
+        user.username = "renamed"
+        db.commit()
+        auth.invalidate_user(user)
+        with pytest.raises(HTTPException) as exc:
+            auth.get_principal(token, db)
+        assert exc.value.status_code == 401
+
+        token = auth.create_user_token(user)
+        auth.get_principal(token, db)
+        user.is_active = False
+        db.commit()
+        auth.invalidate_user(user)
+        with pytest.raises(HTTPException) as exc:
+            auth.get_principal(token, db)
+        assert exc.value.status_code == 400
+        with pytest.raises(HTTPException):
+            auth.get_principal(auth.create_user_token(user), db)
+
+    def test_invalidation_is_per_user(self, temp_db, monkeypatch):
+        """Invalidating one user leaves other cached principals alone and old entries are forgotten."""
+        from server.routers import auth
+        db, user, statements = temp_db
+        other = database.User(username="other", email="o@example.com", password_hash="x")
+        db.add(other)
+        db.commit()
+        db.refresh(other)
+        monkeypatch.setattr(auth, "PRINCIPAL_TTL", 0)
+        token = auth.create_user_token(user)
+        auth.get_principal(token, db)
+        statements.clear()
+        auth.invalidate_user(other)
+        assert auth.get_principal(token, db).id == user.id
+        assert statements == []
+
+        auth.invalidate_user(user)
+        auth.invalidate_user(other)
+        assert list(auth._generations) == [other.id, "other"]
+
+    def test_get_user_from_token_uses_the_principal(self, temp_db):
+        """get_user_from_token resolves through the principal cache."""
+        from server.routers import auth
+        db, user, statements = temp_db
+        token = auth.create_user_token(user)
+        auth.get_principal(token, db)
+        statements.clear()
+        assert auth.get_user_from_token(token, db).id == user.id
+        assert statements == []
+
+    def test_legacy_token_resolves_by_username(self, temp_db):
+        """Tokens without a uid claim are resolved by username."""
+        from server.routers import auth
+        db, user, statements = temp_db
+        token = auth.create_access_token({"sub": "holder"})
+        assert auth.get_principal(token, db).id == user.id
+
+
+class TestPasswordHashing:
+    """bcrypt hashing on the bounded executor."""
+
+    @pytest.fixture
+    def auth_sessions(self, temp_db, monkeypatch):
+        """Point the auth routes' sessions at `temp_db` instead of the repository database."""
+        from sqlalchemy.orm import sessionmaker
+        from server.routers import auth
+        db, user, statements = temp_db
+        monkeypatch.setattr(auth, "SessionLocal", sessionmaker(bind=db.get_bind()))
+
+    def test_rehash_when_cost_changes(self):
+        """A hash with an old cost is replaced after a successful check."""
+        from server.services import passwords
+        old = passwords.hash_password("hunter2", rounds=5)
+        assert passwords.verify_and_update("wrong", old) == (False, None)
+        verified, new_hash = passwords.verify_and_update("hunter2", old)
+        assert verified and new_hash.split("$")[2] == f"{passwords.BCRYPT_ROUNDS:02d}"
+        assert passwords.verify_and_update("hunter2", new_hash) == (True, None)
+
+    def test_long_passwords_are_truncated(self):
+        """Only the first 72 bytes of a password count, as with passlib."""
+        from server.services import passwords
+        hashed = passwords.hash_password("x" * 100)
+        assert passwords.verify_password("x" * 72, hashed)
+
+    def test_database_work_stays_off_the_event_loop(self, auth_sessions, monkeypatch):
+        """Register and login run their queries on the threadpool, not the event loop."""
+        import asyncio
+        import uuid
+        from server.routers import auth
+        on_loop = []
+
+        def watch(fn):
+            def wrapper(*args):
+                try:
+                    asyncio.get_running_loop()
+                    on_loop.append(fn.__name__)
+                except RuntimeError:
+                    pass
+                return fn(*args)
+            return wrapper
+
+        for name in ("_check_available", "_create_user", "_find_user"):
+            monkeypatch.setattr(auth, name, watch(getattr(auth, name)))
+        name = f"loop_{uuid.uuid4().hex[:8]}"
+        assert client.post("/auth/register", json={
+            "username": name, "email": f"{name}@example.com", "password": "secret123"}).status_code == 200
+        assert client.post("/auth/login", json={"username": name, "password": "secret123"}).status_code == 200
+        assert on_loop == []
+
+    def test_register_login_and_saturation(self, auth_sessions, monkeypatch):
+        """Login answers 503 while the hashing executor is full."""
+        import asyncio
+        import threading
+        import time
+        import uuid
+        from server.services import passwords
+        from server.services.compute import ComputeExecutor
+        name = f"hash_{uuid.uuid4().hex[:8]}"
+        response = client.post("/auth/register", json={
+            "username": name, "email": f"{name}@example.com", "password": "secret123"})
+        assert response.status_code == 200
+        assert client.post("/auth/login", json={"username": name, "password": "secret123"}).status_code == 200
+        assert client.post("/auth/login", json={"username": name, "password": "nope"}).status_code == 401
+
+        # fill a small executor with jobs that block until released
+        executor = ComputeExecutor("bcrypt", 1, max_inflight=2, timeout=10)
+        monkeypatch.setattr(passwords, "hashing_executor", executor)
+        gate = threading.Event()
+
+        async def occupy():
+            await asyncio.gather(*(executor.run(gate.wait) for _ in range(executor.max_inflight)))
+
+        holder = threading.Thread(target=asyncio.run, args=(occupy(),))
+        holder.start()
+        try:
+            deadline = time.monotonic() + 5
+            while executor.stats()["inflight"] < executor.max_inflight and time.monotonic() < deadline:
+                time.sleep(0.01)
+            response = client.post("/auth/login", json={"username": name, "password": "secret123"})
+        finally:
+            gate.set()
+            holder.join()
+            executor.shutdown()
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        stats = client.get("/auth/hashing").json()
+        assert stats["rejected"] == 1 and stats["completed"] == 2
+
+
+class TestPortfolioRepository:
+    """Portfolio reads in one query, served from the write-through cache."""
+
+    @pytest.fixture
+    def repo_db(self, temp_db):
+        """`temp_db` plus a token whose principal is already cached."""
+        from server.routers import auth
+        db, user, statements = temp_db
+        token = auth.create_user_token(user)
+        auth.get_principal(token, db)
+        statements.clear()
+        return db, token, statements
+
+    def test_read_is_one_query_then_cached(self, repo_db):
+        """A cold load is one joined query; later loads come from the cache."""
+        from server.services import portfolio as portfolio_store
+        db, token, statements = repo_db
+        user_id = db.query(database.User.id).scalar()
+        portfolio = database.Portfolio(user_id=user_id, positions=[
+            database.Position(symbol="AAPL", qty=10, avg_price=150),
+            database.Position(symbol="MSFT", qty=5, avg_price=300),
+        ])
+        db.add(portfolio)
+        db.commit()
+        statements.clear()
+
+        snapshot = portfolio_store.load(db, user_id)
+        assert snapshot["positions"] == [("AAPL", 10, 150), ("MSFT", 5, 300)]
+        assert len(statements) == 1
+        assert portfolio_store.load(db, user_id) is snapshot
+        assert len(statements) == 1
+
+    def test_routes_write_through(self, repo_db):
+        """Route writes replace the cached snapshot, so reads need no SQL."""
+        import asyncio
+        from fastapi import HTTPException
+        from server.models.schemas import PortfolioCreateRequest
+        from server.routers import portfolio
+        db, token, statements = repo_db
+        create = PortfolioCreateRequest(user_id="ignored", positions=[{"symbol": "AAPL", "qty": 10, "avg_price": 150}])
+        asyncio.run(portfolio.create_portfolio(create, token, db))
+        update = PortfolioCreateRequest(user_id="ignored", positions=[
+            {"symbol": "AAPL", "qty": 15, "avg_price": 155}, {"symbol": "TSLA", "qty": 5, "avg_price": 250}])
+        asyncio.run(portfolio.update_portfolio(update, token, db))
+
+        statements.clear()
+        response = asyncio.run(portfolio.get_user_portfolio(token, db))
+        assert [(p.symbol, p.qty) for p in response.positions] == [("AAPL", 15), ("TSLA", 5)]
+        assert statements == []
+        rows = db.query(database.Position.symbol, database.Position.qty).order_by(database.Position.id).all()
+        assert [tuple(r) for r in rows] == [("AAPL", 15), ("TSLA", 5)]
+
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(portfolio.create_portfolio(create, token, db))
+        assert exc.value.status_code == 400
+
+    def test_migrate_adds_position_index(self, repo_db):
+        """Startup migration adds the portfolio_id index to an existing positions table."""
+        from sqlalchemy import inspect, text
+        db, token, statements = repo_db
+        engine = db.get_bind()
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_positions_portfolio_id"))
+        database.migrate(engine)
+        names = {index["name"] for index in inspect(engine).get_indexes("positions")}
+        assert "ix_positions_portfolio_id" in names
+
+    def test_diff_touches_only_changed_lots(self):
+        """Lots are matched by symbol in order; only real changes are written."""
+        from server.services.portfolio import diff
+        current = [(1, "AAPL", 10.0, 150.0), (2, "AAPL", 5.0, 160.0), (3, "MSFT", 5.0, 300.0), (4, "TSLA", 1.0, 200.0)]
+        inserts, updates, deletes = diff(current, [("AAPL", 10.0, 150.0), ("AAPL", 6.0, 160.0), ("NVDA", 2.0, 400.0)])
+        assert inserts == [{"symbol": "NVDA", "qty": 2.0, "avg_price": 400.0}]
+        assert updates == [{"id": 2, "qty": 6.0, "avg_price": 160.0}]
+        assert sorted(deletes) == [3, 4]
+
+    def test_large_update_and_patch_are_bulk(self, repo_db):
+        """A one-lot change to a large book is a single UPDATE."""
+        import asyncio
+        from server.models.schemas import PortfolioCreateRequest, PositionUpdate
+        from server.routers import portfolio
+        db, token, statements = repo_db
+        lots = [{"symbol": f"S{i}", "qty": 1, "avg_price": 10} for i in range(2000)]
+        asyncio.run(portfolio.create_portfolio(PortfolioCreateRequest(user_id="ignored", positions=lots), token, db))
+
+        lots[7] = {"symbol": "S7", "qty": 3, "avg_price": 10}
+        statements.clear()
+        asyncio.run(portfolio.update_portfolio(PortfolioCreateRequest(user_id="ignored", positions=lots), token, db))
+        writes = [s for s in statements if not s.lstrip().upper().startswith("SELECT")]
+        assert len(writes) == 1 and writes[0].lstrip().upper().startswith("UPDATE")
+
+        response = asyncio.run(portfolio.update_position("S7", PositionUpdate(qty=0), token, db))
+        assert len(response.positions) == 1999
+        response = asyncio.run(portfolio.update_position("NEW", PositionUpdate(qty=4, avg_price=5), token, db))
+        assert response.positions[-1].symbol == "NEW"
+        assert db.query(database.Position).count() == 2000
+        assert db.query(database.Position.qty).filter(database.Position.symbol == "NEW").scalar() == 4
+
+    def test_patch_merges_lots_in_place(self, repo_db):
+        """Merged lots keep their weighted avg_price and their place in the book."""
+        import asyncio
+        from server.models.schemas import PortfolioCreateRequest, PositionUpdate
+        from server.routers import portfolio
+        db, token, statements = repo_db
+        create = PortfolioCreateRequest(user_id="ignored", positions=[
+            {"symbol": "MSFT", "qty": 5, "avg_price": 300}, {"symbol": "AAPL", "qty": 10, "avg_price": 150},
+            {"symbol": "TSLA", "qty": 2, "avg_price": 250}, {"symbol": "AAPL", "qty": 30, "avg_price": 170}])
+        asyncio.run(portfolio.create_portfolio(create, token, db))
+
+        response = asyncio.run(portfolio.update_position("AAPL", PositionUpdate(qty=50), token, db))
+        assert [(p.symbol, p.qty, p.avg_price) for p in response.positions] == [
+            ("MSFT", 5, 300), ("AAPL", 50, 165), ("TSLA", 2, 250)]
+
+    def test_analytics_shape(self, repo_db):
+        """Analytics values each holding at the current price."""
+        import asyncio
+        from server.models.schemas import PortfolioCreateRequest
+        from server.routers import portfolio
+        from server.services import market_data
+        db, token, statements = repo_db
+        create = PortfolioCreateRequest(user_id="ignored", positions=[
+            {"symbol": "AAPL", "qty": 10, "avg_price": 150}, {"symbol": "MSFT", "qty": 5, "avg_price": 300}])
+        asyncio.run(portfolio.create_portfolio(create, token, db))
+
+        data = asyncio.run(portfolio.portfolio_analytics(token, db))
+        prices = market_data.fetch_prices(["AAPL", "MSFT"])
+        assert data["total_cost"] == 3000
+        assert data["total_value"] == pytest.approx(10 * prices["AAPL"] + 5 * prices["MSFT"])
+        assert data["holdings"]["AAPL"] == {
+            "qty": 10, "avg_price": 150, "current_price": prices["AAPL"], "cost": 1500,
+            "value": pytest.approx(10 * prices["AAPL"]), "gain_loss": pytest.approx(10 * prices["AAPL"] - 1500),
+            "gain_loss_pct": pytest.approx((10 * prices["AAPL"] - 1500) / 15),
+        }
+        assert sum(data["allocation"].values()) == pytest.approx(100)
+        assert sum(data["sector_exposure"].values()) == pytest.approx(100)
+
+
+class TestPortfolioAnalytics:
+    """Vectorized portfolio valuation."""
+
+    def test_matches_per_lot_arithmetic(self):
+        """Merged lots, missing prices and unknown cost match hand arithmetic."""
+        import numpy as np
+        from quant.portfolio import analytics, encode
+        book = encode(["AAPL", "MSFT", "AAPL", "XYZ", "TSLA"], [10, 5, 10, 3, 2], [150, 300, 170, 10, np.nan])
+        result = analytics(
+            *book,
+            {"AAPL": 200.0, "MSFT": 250.0, "XYZ": None, "TSLA": 100.0},
+            {"AAPL": "Technology", "MSFT": "Technology", "TSLA": "Consumer Cyclical"},
+        )
+        assert result["symbol"].tolist() == ["AAPL", "MSFT", "TSLA"]
+        assert result["qty"].tolist() == [20, 5, 2]
+        assert result["avg_price"][0] == 160 and result["avg_price"][1] == 300
+        assert np.isnan(result["avg_price"][2])
+        assert result["cost"].tolist() == [3200, 1500, 0]
+        assert result["total_cost"] == 4700 and result["total_value"] == 5450
+        assert result["gain_loss_pct"].tolist() == [25, pytest.approx(-100 / 6), 0]
+        assert result["weight"].sum() == pytest.approx(100)
+        assert result["sector_exposure"]["Consumer Cyclical"] == pytest.approx(200 / 5450 * 100)
+
+    def test_large_book_and_validation(self):
+        """A 100k-lot book values correctly; mismatched columns are rejected."""
+        import numpy as np
+        from quant.portfolio import analytics, encode
+        rng = np.random.default_rng(0)
+        symbols = np.array([f"S{i}" for i in rng.integers(0, 5000, 100_000)])
+        qty = rng.integers(1, 100, symbols.size).astype(float)
+        avg = rng.uniform(10, 100, symbols.size)
+        prices = {f"S{i}": 50.0 for i in range(5000)}
+        result = analytics(*encode(symbols, qty, avg), prices)
+        assert result["total_cost"] == pytest.approx((qty * avg).sum())
+        assert result["total_value"] == pytest.approx(qty.sum() * 50)
+        assert result["sector_exposure"] == {"Unknown": pytest.approx(100)}
+        with pytest.raises(ValueError):
+            encode(["A"], [1, 2], [1])